@@ -0,0 +1,38 @@
+"""
+Benchmarks of the drawing backends.
+"""
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+from xpoint import Canvas2DMPL, PolyLine
+
+from .bench_point import make_deep
+
+
+class Draw2D:
+    params = [100, 1000, 10000, 100000]
+    param_names = ["nparts"]
+    timeout = 1200
+
+    def setup(self, nparts):
+        self.model = make_deep(nparts)
+        self.model.add_part(
+            "path", PolyLine([[ii, 0, 0] for ii in range(nparts)])
+        )
+        self.canvas = Canvas2DMPL()
+        self.canvas.add(self.model)
+
+    def teardown(self, nparts):
+        import matplotlib.pyplot as plt
+
+        plt.close("all")
+
+    def time_canvas2dmpl_draw(self, nparts):
+        self.canvas.draw()
+
+    def time_export_draw(self, nparts):
+        from xpoint.export import Canvas2DExport
+
+        Canvas2DExport().add(self.model).draw()
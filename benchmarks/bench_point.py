@@ -0,0 +1,133 @@
+"""
+Benchmarks of the core Point operations.
+
+Run with `asv run` and compare revisions with `asv compare`, results are
+stored in .asv/results.
+"""
+
+import numpy as np
+
+from xpoint import Point
+from xpoint.batch import collect
+
+
+class PointConstruction:
+    def time_empty(self):
+        Point()
+
+    def time_xyz(self):
+        Point(1, 2, 3)
+
+    def time_matrix(self):
+        Point(np.eye(4))
+
+    def time_kwargs(self):
+        Point(x=1, y=2, z=3, rx=10, ry=20, rz=30)
+
+
+class PointAccess:
+    def setup(self):
+        self.p = Point(x=1, y=2, z=3, rx=10, ry=20, rz=30)
+        self.q = Point(x=-1, rz=5)
+
+    def time_copy(self):
+        self.p.copy()
+
+    def time_location(self):
+        self.p.location
+
+    def time_rotation(self):
+        self.p.rotation
+
+    def time_rotation_matrix(self):
+        self.p.rotation_matrix
+
+    def time_set_rx(self):
+        self.p.rx = 15
+
+    def time_set_location(self):
+        self.p.location = (1, 2, 3)
+
+    def time_pos(self):
+        +self.p
+
+    def time_transform(self):
+        self.p.copy().transform(self.q)
+
+    def time_repr(self):
+        repr(self.p)
+
+
+class PointChains:
+    params = [10, 100, 1000]
+    param_names = ["nsteps"]
+
+    def setup(self, nsteps):
+        self.p = Point()
+
+    def time_arcby(self, nsteps):
+        p = self.p.copy()
+        for _ in range(nsteps):
+            p.arcby(angle=0.1, dx=1.0, axis="z")
+
+    def time_moveby(self, nsteps):
+        p = self.p.copy()
+        for _ in range(nsteps):
+            p.moveby(dx=1.0)
+
+    def time_rotateby(self, nsteps):
+        p = self.p.copy()
+        for _ in range(nsteps):
+            p.rotateby(rz=0.1)
+
+
+def make_flat(nparts):
+    root = Point(name="root")
+    for ii in range(nparts):
+        root.add_part(f"p{ii}", Point(x=ii, name=f"p{ii}"))
+    return root
+
+
+def make_deep(nparts, fanout=10):
+    """Return a tree with nparts leaves and given fanout"""
+    leaves = [Point(x=ii, name=f"p{ii}") for ii in range(nparts)]
+    level = 0
+    while len(leaves) > 1:
+        groups = []
+        for jj in range(0, len(leaves), fanout):
+            group = Point(y=1, name=f"g{level}_{jj}")
+            for kk, part in enumerate(leaves[jj : jj + fanout]):
+                group.add_part(f"c{kk}", part)
+            groups.append(group)
+        leaves = groups
+        level += 1
+    return leaves[0]
+
+
+class PartsTraversal:
+    params = [100, 1000, 10000, 100000]
+    param_names = ["nparts"]
+    timeout = 300
+
+    def setup(self, nparts):
+        self.flat = make_flat(nparts)
+        self.deep = make_deep(nparts)
+
+    def time_getitem(self, nparts):
+        self.flat["p0"]
+
+    def time_getitem_all(self, nparts):
+        for key in self.flat.keys():
+            self.flat[key]
+
+    def time_get_primitives_flat(self, nparts):
+        self.flat.get_primitives()
+
+    def time_get_primitives_deep(self, nparts):
+        self.deep.get_primitives()
+
+    def peakmem_get_primitives_deep(self, nparts):
+        self.deep.get_primitives()
+
+    def time_collect_batches_deep(self, nparts):
+        collect([self.deep])
@@ -6,7 +6,7 @@ l_mbxf=6.27
 mbxf_exit=ip.new.moveto(z=-77.534+l_mbxf/2) # 3) moveto always inplace
 
 mbxf_entry=ip.new.arcby(dz=-7.61,angle=1.4e-3,axis='y',degrees=False)
-rot_center=mbxf_exit.copy().moveby(z=1.2)
+rot_center=mbxf_exit.copy().moveby(dz=1.2)
 
 mbxf=Point(parts={'entry':mbxf_entry,'exit':mbxf_exit})
 
@@ -0,0 +1,98 @@
+import numpy as np
+
+from xpoint import Box, Line, Point, PolyLine, Rectangle, Text
+from xpoint.batch import collect, style_key
+
+
+def make_model():
+    root = Point(x=1, rz=30, name="root")
+    root.add_part("l1", Line([0, 0, 0], [1, 2, 3]))
+    root.add_part("l2", Line([0, 0, 0], [0, 0, -1], rx=20))
+    root.add_part("p1", PolyLine([[0, 0, 0], [1, 0, 0], [1, 1, 0]]))
+    root.add_part("p2", PolyLine([[0, 0, 0], [0, 1, 0]], y=2))
+    root.add_part("box", Box(1, 2, 3, rx=10, z=1))
+    root.add_part("rect", Rectangle(2, 1, ry=45))
+    root.add_part("label", Text("hi", x=1))
+    sub = Point(y=1, name="sub", layer="survey")
+    sub.add_part("l3", Line([0, 0, 0], [1, 0, 0]))
+    sub.add_part("mark", Point(z=2, name="mark"))
+    root.add_part("sub", sub)
+    return root
+
+
+def world(vertices, matrix):
+    return np.asarray(vertices) @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def test_vertices_match_primitives():
+    root = make_model()
+    batches = collect([root])
+    expected = {}
+    for prim, _, matrix, layer in root.iter_primitives(layers=True):
+        expected.setdefault((prim.primitive_kind, layer), []).append(
+            (prim, matrix)
+        )
+    nprims = 0
+    for (kind, _, layer), batch in batches.items():
+        assert batch.kind == kind
+        items = expected[kind, layer]
+        assert batch.primitives == [prim for prim, _ in items]
+        assert np.allclose(batch.matrices, [mm for _, mm in items])
+        for prim, matrix, vertices in zip(
+            batch.primitives, batch.matrices, batch.split()
+        ):
+            if kind in ("points", "texts"):
+                assert np.allclose(vertices, [matrix[:3, 3]])
+            else:
+                assert np.allclose(vertices, world(prim.vertices, matrix))
+        nprims += len(batch)
+    assert nprims == sum(len(items) for items in expected.values())
+    lines = batches["lines", (), None]
+    assert len(lines) == 2
+    prim, matrix = expected["lines", None][0]
+    assert np.allclose(lines.endpoints[0], world(prim.vertices, matrix))
+    assert len(batches["lines", (), "survey"]) == 1
+    assert batches["texts", (), None].texts == ["hi"]
+
+
+def test_separated_and_aabb():
+    batches = collect([make_model()])
+    polys = batches["polylines", (), None]
+    assert list(polys.offsets) == [0, 3, 5]
+    sep = polys.separated()
+    assert sep.shape == (7, 3)
+    assert np.isnan(sep[[3, 6]]).all()
+    assert np.allclose(sep[[0, 1, 2, 4, 5]], polys.vertices)
+    aabb = polys.aabb()
+    for box, vertices in zip(aabb, polys.split()):
+        assert np.allclose(box, [vertices.min(0), vertices.max(0)])
+    shapes = batches["shapes", (), None]
+    for box, prim, matrix in zip(
+        shapes.aabb(), shapes.primitives, shapes.matrices
+    ):
+        corners = world(prim.corners, matrix)
+        assert np.allclose(box, [corners.min(0), corners.max(0)])
+
+
+def test_styles_and_pruning():
+    root = make_model()
+
+    def resolve(prim, style):
+        if prim.primitive_kind == "lines":
+            return None
+        return {"color": "r" if prim.primitive_kind == "shapes" else "k"}
+
+    batches = collect([root], resolve=resolve)
+    kinds = {kind for kind, _, _ in batches}
+    assert "lines" not in kinds
+    assert ("shapes", style_key({"color": "r"}), None) in batches
+    hidden = collect(
+        [root], visible=lambda part, layer: layer != "survey"
+    )
+    assert all(layer is None for _, _, layer in hidden)
+    assert collect([]) == {}
+
+
+def test_style_key():
+    assert style_key({"b": [1, 2], "a": 1}) == (("a", 1), ("b", (1, 2)))
+    assert style_key({"a": 1, "b": 2}) == style_key({"b": 2, "a": 1})
@@ -0,0 +1,155 @@
+import itertools
+
+import numpy as np
+
+from xpoint import Box, Cylinder, Point, Rectangle
+from xpoint.bounds import (
+    aabb_from_obb,
+    aabb_overlap,
+    aabb_pairs,
+    clashes,
+    cull,
+    obb_corners,
+    obb_from_matrices,
+    obb_overlap,
+)
+from xpoint.rotation import rotvec_to_matrix
+
+
+def random_obb(rng, nboxes, spread=5):
+    matrices = np.zeros((nboxes, 4, 4))
+    matrices[:, :3, :3] = rotvec_to_matrix(rng.normal(size=(nboxes, 3)))
+    matrices[:, :3, 3] = rng.uniform(0, spread, (nboxes, 3))
+    matrices[:, 3, 3] = 1
+    half = rng.uniform(0.1, 1, (nboxes, 3))
+    return obb_from_matrices(matrices, half)
+
+
+def brute_pairs(aabb):
+    return np.array(
+        [
+            (ii, jj)
+            for ii, jj in itertools.combinations(range(len(aabb)), 2)
+            if aabb_overlap(aabb[ii], aabb[jj])
+        ]
+    ).reshape(-1, 2)
+
+
+def sat_gap(box1, box2):
+    """Largest gap between the projections of two boxes on the 15 axes,
+    negative when they intersect"""
+    corners = [
+        obb_corners(*[np.array([vv]) for vv in box])[0] for box in (box1, box2)
+    ]
+    axes = list(box1[1].T) + list(box2[1].T)
+    axes += [np.cross(aa, bb) for aa in box1[1].T for bb in box2[1].T]
+    gap = -np.inf
+    for axis in axes:
+        norm = np.linalg.norm(axis)
+        if norm < 1e-9:
+            continue
+        p1, p2 = corners[0] @ axis / norm, corners[1] @ axis / norm
+        gap = max(gap, p2.min() - p1.max(), p1.min() - p2.max())
+    return gap
+
+
+def test_aabb_pairs_brute_force():
+    rng = np.random.default_rng(2)
+    aabb = aabb_from_obb(*random_obb(rng, 300, spread=10))
+    pairs = aabb_pairs(aabb)
+    expected = brute_pairs(aabb)
+    assert set(map(tuple, pairs)) == set(map(tuple, expected))
+    assert len(pairs) == len(expected)
+    assert (pairs[:, 0] < pairs[:, 1]).all()
+    # touching and identical boxes, same lower x
+    unit = np.array([[0, 0, 0], [1, 1, 1]], float)
+    touching = np.array([unit, unit + [1, 0, 0], unit, unit + [0, 2, 0]])
+    assert set(map(tuple, aabb_pairs(touching))) == {(0, 1), (0, 2), (1, 2)}
+    assert aabb_pairs(np.zeros((0, 2, 3))).shape == (0, 2)
+
+
+def test_cull():
+    aabb = np.array([[[0, 0, 0], [1, 1, 1]], [[5, 5, 5], [6, 6, 6]]], float)
+    assert list(cull(aabb, [0.5, 0.5, 0.5], [2, 2, 2])) == [True, False]
+    assert list(cull(aabb, [-1, -1, -1], [10, 10, 10])) == [True, True]
+
+
+def test_obb_overlap_separating_axes():
+    rng = np.random.default_rng(3)
+    c1, a1, h1 = random_obb(rng, 500, spread=2)
+    c2, a2, h2 = random_obb(rng, 500, spread=2)
+    result = obb_overlap(c1, a1, h1, c2, a2, h2)
+    gaps = np.array(
+        [sat_gap((c1[ii], a1[ii], h1[ii]), (c2[ii], a2[ii], h2[ii]))
+         for ii in range(500)]
+    )
+    clear = np.abs(gaps) > 1e-9
+    assert (result[clear] == (gaps[clear] < 0)).all()
+    assert result.any() and not result.all()
+
+
+def test_obb_edge_edge():
+    # an edge along z of the first box faces an edge along y of the second,
+    # they are only separated on x, the cross product of the edges
+    half = np.array([[0.5, 0.5, 0.5]])
+    axes1 = rotvec_to_matrix(np.array([[0, 0, np.pi / 4]]))
+    axes2 = rotvec_to_matrix(np.array([[0, np.pi / 4, 0]]))
+    reach = np.sqrt(0.5)
+    origin = np.zeros((1, 3))
+    for delta, expected in ((-0.01, True), (0.01, False)):
+        center = np.array([[2 * reach + delta, 0, 0]])
+        overlap = obb_overlap(origin, axes1, half, center, axes2, half)
+        gap = sat_gap(
+            (np.zeros(3), axes1[0], half[0]), (center[0], axes2[0], half[0])
+        )
+        assert overlap[0] == expected == (gap < 0)
+
+
+def test_clashes_brute_force():
+    rng = np.random.default_rng(4)
+    centers, axes, half = random_obb(rng, 200, spread=8)
+    pairs = clashes(centers, axes, half)
+    # boxes with disjoint aabb do not clash
+    candidates = brute_pairs(aabb_from_obb(centers, axes, half))
+    expected = {
+        (ii, jj)
+        for ii, jj in candidates
+        if sat_gap(
+            (centers[ii], axes[ii], half[ii]),
+            (centers[jj], axes[jj], half[jj]),
+        )
+        < 0
+    }
+    assert set(map(tuple, pairs)) == expected
+    assert len(expected) > 0
+
+
+def test_obb_from_scaled_matrices():
+    matrix = np.diag([2.0, 3.0, 1.0, 1.0])
+    matrix[:3, 3] = [1, 2, 3]
+    centers, axes, half = obb_from_matrices(matrix, [1, 1, 1])
+    assert np.allclose(centers, [[1, 2, 3]])
+    assert np.allclose(axes, np.eye(3))
+    assert np.allclose(half, [[2, 3, 1]])
+
+
+def test_shape_bounds():
+    root = Point(x=1, rz=30)
+    box = Box(1, 2, 3, rx=10, y=1)
+    root.add_part("box", box)
+    matrix = box.world_matrix
+    corners = box.corners @ matrix[:3, :3].T + matrix[:3, 3]
+    assert np.allclose(box.aabb, [corners.min(0), corners.max(0)])
+    center, axes, half = box.obb
+    assert np.allclose(center, matrix[:3, 3])
+    assert np.allclose(half, [0.5, 1, 1.5])
+    # the cache follows the edits of the parents
+    root.x = 5
+    corners += [4, 0, 0]
+    assert np.allclose(box.aabb, [corners.min(0), corners.max(0)])
+    rect = Rectangle(2, 1)
+    assert np.allclose(rect.aabb, [[-1, -0.5, 0], [1, 0.5, 0]])
+    cyl = Cylinder(1, 4, z=1)
+    assert np.allclose(cyl.aabb, [[-1, -1, -1], [1, 1, 3]])
+    vertices = cyl.vertices
+    assert np.all(np.abs(vertices) <= cyl.half_sizes + 1e-12)
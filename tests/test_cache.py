@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pytest
+
+from xpoint import HelixPattern, Point
+from xpoint.cache import FrameCache, tree_digest
+from xpoint.snapshot import Snapshot
+
+
+def model():
+    root = Point(name="ring")
+    for aa in range(4):
+        arc = Point(x=10 * aa, rz=90 * aa, name=f"arc{aa}", layer="arc")
+        for cc in range(5):
+            cell = Point(z=cc, rx=5 * cc, name=f"cell{cc}")
+            for ee in range(10):
+                cell.add_part(f"e{ee}", Point(z=0.1 * ee, ry=ee))
+            arc.add_part(f"cell{cc}", cell)
+        root.add_part(f"arc{aa}", arc)
+    coil = HelixPattern(Point(name="turn"), 100, radius=1, pitch=0.1)
+    root.add_part("coil", coil)
+    return root
+
+
+def assert_same_snapshot(snapshot, root):
+    ref = Snapshot(root)
+    assert snapshot.paths == ref.paths
+    assert np.array_equal(snapshot.parents, ref.parents)
+    assert np.allclose(snapshot.matrices, ref.matrices)
+    assert snapshot.names == ref.names
+    assert snapshot.layers == ref.layers
+    assert snapshot.classes == ref.classes
+
+
+def test_digest_size():
+    root = model()
+    _, size = tree_digest(root)
+    assert size == len(Snapshot(root))
+
+
+def test_digest_invalidation():
+    root = model()
+    digest, _ = tree_digest(root)
+    arc0, arc1 = root.parts["arc0"], root.parts["arc1"]
+    clean = arc1._digest
+    element = arc0.parts["cell2"].parts["e3"]
+    element.x += 1
+    # the edited part and its ancestors only
+    assert element._digest is None
+    assert arc0._digest is None and root._digest is None
+    assert arc1._digest is clean
+    assert tree_digest(root)[0] != digest
+    assert arc1._digest is clean
+    element.x -= 1
+    assert tree_digest(root)[0] == digest
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda root: root.parts["arc2"].rotateby(rz=3),
+        lambda root: setattr(root.parts["arc2"], "layer", "other"),
+        lambda root: root.parts["arc2"].set_origin("cell1"),
+        lambda root: root.parts["arc2"].add_part("new", Point(y=1)),
+        lambda root: root.parts["arc2"].remove_part("cell0"),
+        lambda root: setattr(root.parts["coil"], "count", 50),
+        lambda root: root.parts["coil"].template.moveby(dx=1),
+    ],
+)
+def test_edits_change_digest(edit):
+    root = model()
+    digest, _ = tree_digest(root)
+    edit(root)
+    assert tree_digest(root)[0] != digest
+
+
+def test_hits_and_misses(tmp_path):
+    root = model()
+    cache = FrameCache(str(tmp_path), min_size=20, levels=2)
+    assert_same_snapshot(cache.snapshot(root), root)
+    assert cache.hits == 0 and cache.misses > 0
+    misses = cache.misses
+    assert_same_snapshot(cache.snapshot(root), root)
+    assert cache.hits == 1 and cache.misses == misses
+    root.parts["arc1"].parts["cell4"].parts["e0"].z = 5
+    assert_same_snapshot(cache.snapshot(root), root)
+    # the root and arc1 are stored again, the other arcs are loaded
+    assert cache.misses == misses + 2
+    assert cache.hits == 1 + 4
+
+
+def test_persistence(tmp_path):
+    root = model()
+    FrameCache(str(tmp_path), min_size=20).snapshot(root)
+    files = [name for name in os.listdir(tmp_path) if name.endswith(".npz")]
+    assert len(files) > 0
+    cache = FrameCache(str(tmp_path), min_size=20)
+    assert_same_snapshot(cache.snapshot(model()), root)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_eviction(tmp_path):
+    root = model()
+    cache = FrameCache(str(tmp_path), min_size=20, levels=2)
+    cache.snapshot(root)
+    size, count = cache.size, len(cache._entries())
+    assert size == sum(ss for _, ss, _ in cache._entries())
+    cache.evict(size // 2)
+    assert 0 < len(cache._entries()) < count
+    assert cache.size <= size // 2
+    # evicted entries are rebuilt
+    assert_same_snapshot(cache.snapshot(root), root)
+    cache.clear()
+    assert cache.size == 0 and cache._entries() == []
+    small = FrameCache(str(tmp_path), maxsize=1, min_size=20)
+    small.snapshot(root)
+    assert small.size <= 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from xpoint import Curve, FramePattern, Point
+from xpoint.cache import tree_digest
+from xpoint.snapshot import Snapshot
+
+
+def make_curve():
+    return Curve().straight(dz=2).arc(angle=-45, dz=1.5, axis="y")
+
+
+def test_place_returns_pattern():
+    curve = make_curve()
+    quad = Point(x=0.1, name="quad")
+    s = np.linspace(0, 3, 1000)
+    quads = curve.place(quad, s, offsets=(0.1, 0, 0), tilts=5)
+    assert isinstance(quads, FramePattern)
+    assert list(curve.parts) == ["quad0"]
+    assert len(quads) == 1000
+    assert quads.template is quad
+    frames = curve.frames(s)
+    shifted = frames[:, :3, 3] + 0.1 * frames[:, :3, 0]
+    assert np.allclose(quads.frames[:, :3, 3], shifted)
+    instance = curve["quad0"][42]
+    assert np.allclose(instance.matrix, quads.frames[42] @ quad.matrix)
+    assert len(Snapshot(curve)) == 1002
+
+
+def test_place_names_continue():
+    curve = make_curve()
+    quad = Point(name="quad")
+    curve.place(quad, [0, 1])
+    curve.place(quad, [2, 3])
+    curve.add_part("quad7", Point())
+    curve.place(quad, [3])
+    assert list(curve.parts) == ["quad0", "quad1", "quad7", "quad8"]
+    assert np.allclose(curve.parts["quad1"].frames, curve.frames([2, 3]))
+    curve.place(Point(), [1], name="other")
+    with pytest.raises(ValueError):
+        curve.place(quad, [1], name="quad0")
+
+
+def test_template_edit_invalidates_digest():
+    curve = make_curve()
+    quad = Point(name="quad")
+    curve.place(quad, np.linspace(0, 3, 10))
+    digest = tree_digest(curve)
+    assert tree_digest(curve) == digest
+    quad.x = 1
+    assert tree_digest(curve) != digest
@@ -0,0 +1,67 @@
+import numpy as np
+
+from xpoint.fit import fit_frames
+from xpoint.rotation import euler_to_matrix
+
+
+def known_frames(nframes=50, nfid=6, seed=0):
+    rng = np.random.default_rng(seed)
+    model = rng.normal(size=(nframes, nfid, 3))
+    rot = euler_to_matrix("zxy", rng.uniform(-90, 90, (nframes, 3)))
+    shift = rng.normal(size=(nframes, 3))
+    scale = 1 + 0.01 * rng.normal(size=nframes)
+    measured = np.einsum("kij,kmj->kmi", rot, model) * scale[:, None, None]
+    measured += shift[:, None]
+    return model, measured, rot, shift, scale
+
+
+def test_rigid():
+    model, _, rot, shift, _ = known_frames()
+    measured = np.einsum("kij,kmj->kmi", rot, model) + shift[:, None]
+    result = fit_frames(model, measured)
+    assert np.allclose(result.matrices[:, :3, :3], rot)
+    assert np.allclose(result.matrices[:, :3, 3], shift)
+    assert np.allclose(result.scale, 1)
+    assert result.rms.max() < 1e-9
+
+
+def test_similarity():
+    model, measured, rot, shift, scale = known_frames()
+    result = fit_frames(model, measured, scaling=True)
+    assert np.allclose(result.scale, scale)
+    assert np.allclose(result.matrices[:, :3, :3], rot * scale[:, None, None])
+    assert np.allclose(result.matrices[:, :3, 3], shift)
+
+
+def test_missing_measurement():
+    model, measured, rot, shift, scale = known_frames()
+    measured[3, 1] = np.nan
+    result = fit_frames(model, measured, scaling=True)
+    assert not result.inliers[3, 1]
+    assert np.isnan(result.residuals[3, 1]).all()
+    assert np.allclose(result.matrices[3, :3, 3], shift[3])
+
+
+def test_reject_outliers():
+    model, measured, rot, shift, scale = known_frames(200)
+    rng = np.random.default_rng(1)
+    measured += 1e-5 * rng.normal(size=measured.shape)
+    outlier = rng.integers(0, 6, len(measured))
+    measured[np.arange(len(measured)), outlier] += 0.1
+    result = fit_frames(model, measured, scaling=True, reject=1e-3)
+    expected = np.ones(measured.shape[:2], bool)
+    expected[np.arange(len(measured)), outlier] = False
+    assert np.array_equal(result.inliers, expected)
+    assert np.allclose(result.scale, scale, atol=1e-4)
+    assert result.max.max() < 1e-3
+
+
+def test_broadcast_measured():
+    model, measured, rot, shift, scale = known_frames(5)
+    # one set of measurements against several candidate models
+    result = fit_frames(model, measured[2], scaling=True)
+    assert len(result) == 5
+    assert np.allclose(result.matrices[2, :3, 3], shift[2])
+    assert result.rms[2] < 1e-9
+    single = fit_frames(model[2], measured[2], scaling=True)
+    assert np.allclose(single.matrices[0], result.matrices[2])
@@ -0,0 +1,65 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from xpoint import Frame, Point
+from xpoint.frame import location_tolerance
+
+
+def test_equal_frames_hash_equal():
+    point = Point(x=1, y=2, z=3, rx=10, ry=20, rz=30)
+    frame = Frame(point)
+    noisy = Frame(point.matrix + 1e-13)
+    assert frame == noisy
+    assert hash(frame) == hash(noisy)
+    assert len({frame, noisy, Frame(point)}) == 1
+    assert {frame: "a"}[noisy] == "a"
+    assert frame != Frame(Point(x=1 + 1e-6, y=2, z=3, rx=10, ry=20, rz=30))
+    assert frame != Frame()
+
+
+def test_cell_boundary():
+    # closer than the tolerance but in different cells
+    left = Frame(Point(x=0.49 * location_tolerance))
+    right = Frame(Point(x=0.51 * location_tolerance))
+    assert left != right
+    assert left.isclose(right)
+
+
+def test_isclose_tolerances():
+    frame = Frame(Point(x=1, rz=30))
+    moved = Frame(Point(x=1 + 1e-4, rz=30))
+    turned = Frame(Point(x=1, rz=30 + 1e-4))
+    assert not frame.isclose(moved)
+    assert frame.isclose(moved, loc_atol=1e-3)
+    assert not frame.isclose(moved, rot_atol=1e-3)
+    assert not frame.isclose(turned, loc_atol=1e-3)
+    assert frame.isclose(turned, rot_atol=1e-5)
+    assert frame.isclose(Point(x=1, rz=30))
+
+
+def test_intern():
+    point = Point(x=5, ry=15)
+    first = Frame.intern(point.matrix)
+    assert Frame.intern(point.matrix + 1e-13) is first
+    assert Frame.intern(Frame(point)) is first
+
+
+def test_immutable():
+    frame = Frame(Point(x=1))
+    with pytest.raises(AttributeError):
+        frame.x = 2
+    with pytest.raises(ValueError):
+        frame.matrix[0, 3] = 2
+    with pytest.raises(ValueError):
+        Frame(np.full((4, 4), np.nan))
+    assert pickle.loads(pickle.dumps(frame)) == frame
+
+
+def test_compose():
+    aa = Frame(Point(x=1, rz=90))
+    bb = Frame(Point(y=2))
+    assert np.allclose((aa @ bb).location, [-1, 0, 0])
+    assert (aa @ aa.inverse()) == Frame()
+    assert np.allclose(aa.apply([[1, 0, 0]]), [[1, 1, 0]])
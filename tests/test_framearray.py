@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from xpoint import FrameArray, Point
+
+
+def frames(nframes=5000, seed=0):
+    # a few km long line of close frames, far from the origin
+    rng = np.random.default_rng(seed)
+    s = np.cumsum(rng.uniform(0.05, 0.15, nframes))
+    locations = np.stack(
+        [2e3 + s, -3e3 + 0.01 * s, 150 + np.sin(s / 50)], axis=-1
+    )
+    angles = rng.uniform(-90, 90, (nframes, 3))
+    names = [f"f{ii}" for ii in range(nframes)]
+    return FrameArray.from_euler(locations, angles, names=names)
+
+
+def error(array, reference):
+    return np.abs(array.matrices - reference.matrices).max()
+
+
+@pytest.fixture
+def arrays():
+    ref = frames()
+    return ref, ref.astype(np.float32, block_size=256)
+
+
+selections = {
+    "slice": slice(100, 3000),
+    "unaligned": slice(37, 4999),
+    "strided": slice(3, None, 7),
+    "sparse": slice(None, None, 1000),
+    "reversed": slice(None, None, -1),
+    "sorted": np.sort(np.random.default_rng(1).choice(5000, 800, False)),
+    "permutation": np.random.default_rng(2).permutation(5000),
+    "mask": np.arange(5000) % 3 == 0,
+}
+
+
+def test_float32_precision(arrays):
+    ref, f32 = arrays
+    assert f32.nbytes < ref.nbytes / 1.9
+    # float32 alone would lose about 0.1 mm at these coordinates
+    assert error(f32, ref) < 1e-5
+
+
+@pytest.mark.parametrize("key", list(selections))
+def test_selection(arrays, key):
+    ref, f32 = arrays
+    idx = selections[key]
+    sub64, sub32 = ref[idx], f32[idx]
+    assert sub64.dtype == np.float64 and sub32.dtype == np.float32
+    assert len(sub32) == len(sub64)
+    assert np.array_equal(sub64.matrices, ref.matrices[idx])
+    # the rows are not rounded again
+    assert np.array_equal(sub32.matrices, f32.matrices[idx])
+    assert error(sub32, sub64) <= error(f32, ref)
+    assert sub32.names == sub64.names == list(np.array(ref.names)[idx])
+    # selecting again keeps the precision
+    again = sub32[::2]
+    assert error(again, sub64[::2]) <= error(f32, ref)
+
+
+def test_point(arrays):
+    ref, f32 = arrays
+    sub = f32[selections["permutation"]]
+    point = sub[10]
+    assert isinstance(point, Point)
+    assert point.name == ref.names[selections["permutation"][10]]
+    assert np.allclose(point.matrix, sub.matrices[10])
+    assert np.allclose(sub[-1].matrix, sub.matrices[-1])
+
+
+def test_concatenate(arrays):
+    ref, f32 = arrays
+    parts64 = [ref[:1000], ref[4000:], ref[1000:4000:3]]
+    parts32 = [f32[:1000], f32[4000:], f32[1000:4000:3]]
+    joined64 = FrameArray.concatenate(parts64)
+    joined32 = FrameArray.concatenate(parts32)
+    assert joined32.dtype == np.float32
+    assert np.array_equal(
+        joined64.matrices, np.concatenate([pp.matrices for pp in parts64])
+    )
+    assert np.array_equal(
+        joined32.matrices, np.concatenate([pp.matrices for pp in parts32])
+    )
+    assert error(joined32, joined64) <= error(f32, ref)
+    assert joined32.names == joined64.names
+    assert len(FrameArray.concatenate([])) == 0
+    with pytest.raises(ValueError):
+        FrameArray.concatenate([ref, f32])
+
+
+def test_transform(arrays):
+    ref, f32 = arrays
+    other = Point(x=-2e3, y=3e3, rz=30)
+    moved64 = ref.transform(other)
+    moved32 = f32.transform(other)
+    assert np.allclose(moved64.matrices, other.matrix @ ref.matrices)
+    # the rows are rotated in float32
+    assert error(moved32, moved64) <= 2 * error(f32, ref)
+
+
+def test_conversions(arrays):
+    ref, _ = arrays
+    angles = ref.euler_angles()
+    back = FrameArray.from_euler(ref.locations, angles)
+    assert np.allclose(back.matrices, ref.matrices)
+    assert ref.quaternions.shape == (len(ref), 4)
+    assert ref.rotvecs.shape == (len(ref), 3)
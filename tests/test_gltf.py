@@ -0,0 +1,141 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from xpoint import Box, Cylinder, LinearPattern, Line, Point
+from xpoint.gltf import export_gltf
+from xpoint.rotation import quat_to_matrix
+
+dtypes = {"SCALAR": 1, "VEC3": 3, "VEC4": 4}
+
+
+def model():
+    # far from the origin, as a large machine
+    root = Point(x=1.5e4, y=-2e3, z=300, rz=15)
+    girder = Point(z=1, rx=3, layer="girders")
+    box = Box(0.4, 0.3, 2, ry=10)
+    box.matrix = box.matrix @ np.diag([1.5, 1, 1, 1])
+    girder.add_part("box", box)
+    girder.add_part("beam", Line([0, 0, -1], [0, 0, 1], x=0.2))
+    root.add_part("girders", LinearPattern(girder, 40, step=(0, 0, 2.5)))
+    root.add_part("pipe", Cylinder(0.05, 3, nsides=8, x=-1, layer="vacuum"))
+    root.add_part("survey", LinearPattern(Point(y=0.3), 5, step=(1, 0, 0)))
+    return root
+
+
+def read_glb(filename):
+    with open(filename, "rb") as fh:
+        data = fh.read()
+    magic, version, length = struct.unpack_from("<4sII", data, 0)
+    assert (magic, version, length) == (b"glTF", 2, len(data))
+    jlen, jtype = struct.unpack_from("<I4s", data, 12)
+    assert jtype == b"JSON"
+    doc = json.loads(data[20 : 20 + jlen])
+    blen, btype = struct.unpack_from("<I4s", data, 20 + jlen)
+    assert btype == b"BIN\0"
+    start = 28 + jlen
+    return doc, data[start : start + blen]
+
+
+def accessor(doc, binary, index):
+    acc = doc["accessors"][index]
+    view = doc["bufferViews"][acc["bufferView"]]
+    start = view["byteOffset"]
+    raw = binary[start : start + view["byteLength"]]
+    values = np.frombuffer(raw, dtype=np.float32).astype(float)
+    return values.reshape(acc["count"], dtypes[acc["type"]])
+
+
+def decoded_vertices(doc, binary):
+    """World vertices of each mesh instance, by layer name"""
+    out = {}
+    for root in doc["scenes"][0]["nodes"]:
+        layer = doc["nodes"][root]
+        for child in layer["children"]:
+            node = doc["nodes"][child]
+            mesh = doc["meshes"][node["mesh"]]["primitives"][0]
+            vertices = accessor(doc, binary, mesh["attributes"]["POSITION"])
+            if "matrix" in node:
+                matrices = np.array(node["matrix"]).reshape(1, 4, 4)
+                matrices = matrices.transpose(0, 2, 1)
+            else:
+                ext = node.get("extensions", {})
+                attrs = ext.get("EXT_mesh_gpu_instancing", {}).get(
+                    "attributes"
+                )
+                if attrs is None:
+                    matrices = np.eye(4)[None]
+                else:
+                    loc = accessor(doc, binary, attrs["TRANSLATION"])
+                    quat = accessor(doc, binary, attrs["ROTATION"])
+                    scale = accessor(doc, binary, attrs["SCALE"])
+                    matrices = np.zeros((len(loc), 4, 4))
+                    matrices[:, :3, :3] = quat_to_matrix(quat)
+                    matrices[:, :3, :3] *= scale[:, None, :]
+                    matrices[:, :3, 3] = loc
+                    matrices[:, 3, 3] = 1
+                matrices[:, :3, 3] += node["translation"]
+            world = vertices @ matrices[:, :3, :3].transpose(0, 2, 1)
+            world += matrices[:, None, :3, 3]
+            out.setdefault(layer["name"], []).extend(world.reshape(-1, 3))
+    return {key: np.array(value) for key, value in out.items()}
+
+
+def expected_vertices(root):
+    out = {}
+    for prim, _, matrix, layer in root.iter_primitives(layers=True):
+        if prim.primitive_kind == "points":
+            vertices = np.zeros((1, 3))
+        else:
+            vertices = np.asarray(prim.vertices, dtype=float)
+        world = vertices @ matrix[:3, :3].T + matrix[:3, 3]
+        name = "default" if layer is None else layer
+        out.setdefault(name, []).extend(world)
+    return {key: np.array(value) for key, value in out.items()}
+
+
+def assert_same_vertices(actual, expected, atol=1e-4):
+    assert actual.keys() == expected.keys()
+    for layer in expected:
+        aa, ee = actual[layer], expected[layer]
+        assert aa.shape == ee.shape, layer
+        dist = np.linalg.norm(aa[:, None] - ee[None], axis=-1)
+        assert dist.min(axis=1).max() < atol, layer
+        assert dist.min(axis=0).max() < atol, layer
+
+
+@pytest.mark.parametrize("instancing", [True, False])
+@pytest.mark.parametrize("chunk_size", [7, 65536])
+def test_glb_vertices(tmp_path, instancing, chunk_size):
+    root = model()
+    filename = export_gltf(
+        root,
+        str(tmp_path / "model.glb"),
+        instancing=instancing,
+        chunk_size=chunk_size,
+        region=20.0,
+    )
+    doc, binary = read_glb(filename)
+    if instancing:
+        assert "EXT_mesh_gpu_instancing" in doc["extensionsUsed"]
+    # each distinct primitive is written once
+    names = [mesh["name"] for mesh in doc["meshes"]]
+    assert names.count("Box") == names.count("Line") == 1
+    assert_same_vertices(
+        decoded_vertices(doc, binary), expected_vertices(root)
+    )
+
+
+def test_gltf_bin_file(tmp_path):
+    root = model()
+    filename = export_gltf(root, str(tmp_path / "model.gltf"))
+    with open(filename) as fh:
+        doc = json.load(fh)
+    assert doc["buffers"][0]["uri"] == "model.bin"
+    binary = (tmp_path / "model.bin").read_bytes()
+    assert len(binary) == doc["buffers"][0]["byteLength"]
+    assert_same_vertices(
+        decoded_vertices(doc, binary), expected_vertices(root)
+    )
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from xpoint import Point, PointNode
+
+
+def make_chain():
+    start = PointNode(Point())
+    d1start = start.moveby(dx=2)
+    d1mid = d1start.arcby(angle=-45, dx=1.5, axis="z")
+    d1end = d1mid.arcby(angle=-45, dx=1.5, axis="z")
+    return start, d1start, d1mid, d1end
+
+
+def test_evaluation_matches_point():
+    start, d1start, d1mid, d1end = make_chain()
+    ref = Point().moveby(dx=2).arcby(angle=-45, dx=1.5, axis="z")
+    ref.arcby(angle=-45, dx=1.5, axis="z")
+    assert np.allclose(d1end.point.matrix, ref.matrix)
+    assert np.allclose(d1end.location, ref.location)
+
+
+def test_dirty_propagation():
+    start, d1start, d1mid, d1end = make_chain()
+    d1end.point
+    assert not any(node.dirty for node in (start, d1start, d1mid, d1end))
+    d1mid.update(angle=-40)
+    assert not start.dirty and not d1start.dirty
+    assert d1mid.dirty and d1end.dirty
+    start.set(Point(y=1))
+    assert all(node.dirty for node in (start, d1start, d1mid, d1end))
+
+
+def test_recompute_only_dirty_nodes():
+    start, d1start, d1mid, d1end = make_chain()
+    d1end.point
+    points = [node.point for node in (d1start, d1mid, d1end)]
+    d1mid.update(angle=-40)
+    assert d1end.point is not points[2]
+    assert d1start.point is points[0]
+    assert d1mid.point is not points[1]
+    ref = Point().moveby(dx=2).arcby(angle=-40, dx=1.5, axis="z")
+    ref.arcby(angle=-45, dx=1.5, axis="z")
+    assert np.allclose(d1end.point.matrix, ref.matrix)
+
+
+def test_dependency_argument():
+    start, d1start, d1mid, d1end = make_chain()
+    target = PointNode(Point(x=5, y=5, z=5))
+    look = d1start.lookat(target)
+    look.point
+    target.set(Point(x=-5, y=5, z=5))
+    assert look.dirty and not d1start.dirty
+    ref = Point().moveby(dx=2).lookat(Point(x=-5, y=5, z=5))
+    assert np.allclose(look.point.matrix, ref.matrix)
+
+
+def test_cycle_raises():
+    start, d1start, d1mid, d1end = make_chain()
+    with pytest.raises(ValueError):
+        d1mid.update(d1end)
+    with pytest.raises(ValueError):
+        d1mid.update(target=d1mid)
+    # the node is unchanged
+    assert d1mid.args == []
+    assert "target" not in d1mid.kwargs
+    assert d1mid.dependencies == [d1start]
+    assert d1end in d1mid.children
+    d1mid.update(angle=-40)
+    assert np.allclose(
+        d1end.point.matrix,
+        Point().moveby(dx=2).arcby(angle=-40, dx=1.5, axis="z")
+        .arcby(angle=-45, dx=1.5, axis="z").matrix,
+    )
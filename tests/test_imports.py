@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+code = """
+import sys
+import xpoint
+from xpoint import Box, HelixPattern, Line, Point, PolyLine
+from xpoint.snapshot import Snapshot
+
+root = Point(x=1, rz=30)
+root.add_part("line", Line([0, 0, 0], [1, 2, 3]))
+root.add_part("back", Line([0, 0, 0], [0, 0, -1]))
+root.add_part("poly", PolyLine([[0, 0, 0], [1, 0, 0], [1, 1, 0]]))
+root.add_part("box", Box(1, 2, 3, rx=10))
+root.add_part("coil", HelixPattern(Point(), 10, radius=1, pitch=0.1))
+root.moveby(dx=1).arcby(10, dz=2).rotateby(rx=10, ry=20, rz=30)
+root.rotate_atob([1, 0, 0], [0, 1, 0]).lookat(5, 5, 5)
+list(root.iter_primitives())
+Snapshot(root)
+root.parts["box"].aabb
+print(sorted(mod for mod in ("scipy", "matplotlib") if mod in sys.modules))
+"""
+
+
+def test_hot_paths_without_scipy_and_matplotlib():
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import threading
+
+from xpoint import Point, instrument
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_profiling_counts_and_restores():
+    init = Point.__init__
+    with instrument.profiling() as report:
+        assert instrument.is_enabled()
+        Point().moveby(dx=1)
+    assert not instrument.is_enabled()
+    assert Point.__init__ is init
+    assert report.stats["point_alloc"][0] >= 1
+    assert report.stats["compose"][0] == 1
+
+
+def test_concurrent_profilers_keep_separate_reports():
+    barrier = threading.Barrier(2)
+    reports = {}
+
+    def run(nn):
+        with instrument.profiling() as report:
+            barrier.wait()
+            for _ in range(nn):
+                Point().moveby(dx=1)
+            barrier.wait()
+        reports[nn] = report
+
+    threads = [threading.Thread(target=run, args=(nn,)) for nn in (3, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert reports[3].stats["compose"][0] == 3
+    assert reports[7].stats["compose"][0] == 7
+    assert not instrument.is_enabled()
+
+
+def test_nested_profiling():
+    with instrument.profiling() as outer:
+        Point().moveby(dx=1)
+        with instrument.profiling() as inner:
+            Point().moveby(dx=1)
+        assert instrument.is_enabled()
+        Point().moveby(dx=1)
+    assert inner.stats["compose"][0] == 1
+    assert outer.stats["compose"][0] == 2
+
+
+code = """
+import sys
+from xpoint import Line, Point, instrument
+instrument.enable()
+print("matplotlib" in sys.modules)
+from xpoint.export import Canvas2DExport
+root = Point()
+root.add_part("line", Line([0, 0, 0], [1, 1, 0]))
+Canvas2DExport().add(root).draw()
+report = instrument.get_report()
+print(report.stats["draw"][0], report.stats["style_resolution"][0] > 0)
+instrument.disable()
+print(hasattr(Canvas2DExport.draw, "_xpoint_event"))
+"""
+
+
+def test_enable_defers_matplotlib_modules():
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=root,
+        env=dict(os.environ, MPLBACKEND="Agg"),
+    )
+    assert out.stdout.split() == ["False", "1", "True", "False"]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from xpoint import Point
+from xpoint.jacobian import DualFrame
+
+params = np.array([2.0, -45, 1.5, 10, 20, 30, 15, 0.4])
+
+
+def chain(p, seq="zxy"):
+    frame = DualFrame(Point(x=0.5, rz=10), nparams=len(p))
+    frame.moveby(dx=p[0], dy=0.3, wrt={"dx": 0})
+    frame.arcby(angle=p[1], dx=p[2], axis="z", wrt={"angle": 1, "dx": 2})
+    frame.rotateby(
+        rx=p[3], ry=p[4], rz=p[5], seq=seq, wrt={"rx": 3, "ry": 4, "rz": 5}
+    )
+    frame.arcby(angle=p[6], dz=p[7], axis="y", wrt={"angle": 6, "dz": 7})
+    return frame
+
+
+@pytest.mark.parametrize("seq", ["zxy", "xyz", "ZXY", "YXZ"])
+def test_finite_differences(seq):
+    tangent = chain(params, seq).tangent
+    eps = 1e-6
+    for ii in range(len(params)):
+        dp = np.zeros(len(params))
+        dp[ii] = eps
+        plus = chain(params + dp, seq).matrix
+        minus = chain(params - dp, seq).matrix
+        assert np.allclose((plus - minus) / (2 * eps), tangent[ii], atol=1e-7)
+
+
+@pytest.mark.parametrize("seq", ["zxy", "xyz", "ZXY"])
+def test_same_as_point(seq):
+    point = Point(x=0.5, rz=10).moveby(dx=params[0], dy=0.3)
+    point.arcby(angle=params[1], dx=params[2], axis="z")
+    point.rotateby(rx=params[3], ry=params[4], rz=params[5], seq=seq)
+    point.arcby(angle=params[6], dz=params[7], axis="y")
+    assert np.allclose(chain(params, seq).matrix, point.matrix)
+
+
+def test_small_arc_angle():
+    # the arc functions are expanded near zero
+    frame = DualFrame(nparams=1).arcby(1e-9, dz=2, axis="x", wrt={"angle": 0})
+    eps = 1e-6
+    plus = DualFrame().arcby(eps, dz=2, axis="x").matrix
+    minus = DualFrame().arcby(-eps, dz=2, axis="x").matrix
+    assert np.allclose((plus - minus) / (2 * eps), frame.tangent[0])
+
+
+def test_transform():
+    frame = chain(params)
+    other = DualFrame(Point(y=1, rx=30), nparams=len(params))
+    other.tangent[0, :3, 3] = [1, 0, 0]
+    result = frame.copy().transform(other)
+    assert np.allclose(result.matrix, other.matrix @ frame.matrix)
+    expected = other.tangent @ frame.matrix + other.matrix @ frame.tangent
+    assert np.allclose(result.tangent, expected)
@@ -0,0 +1,86 @@
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from xpoint.labels import TextCache, add_labels, place_labels
+
+
+def boxes(anchors, extents, shifts):
+    lower = anchors + shifts + extents[:, :2]
+    upper = anchors + shifts + extents[:, 2:]
+    return lower, upper
+
+
+def test_text_cache():
+    cache = TextCache(maxsize=2)
+    path, extent = cache.get("abc")
+    assert extent[2] > extent[0] and extent[3] > extent[1]
+    assert cache.get("abc")[0] is path
+    assert (cache.hits, cache.misses) == (1, 1)
+    _, big = cache.get("abc", size=20)
+    assert np.allclose(big, 2 * extent, rtol=0.1, atol=0.5)
+    cache.get("d")
+    assert len(cache) == 2
+    assert ("abc", "sans-serif", 10) not in cache.data
+    assert np.allclose(cache.get("")[1], 0)
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0
+
+
+def test_place_isolated_labels():
+    anchors = np.array([[0, 0], [100, 0], [0, 100]])
+    extents = np.tile([0, 0, 10, 5], (3, 1))
+    shifts, visible = place_labels(anchors, extents, pad=2)
+    assert visible.all()
+    # first candidate, upper right of the anchor
+    assert np.allclose(shifts, [[2, 2]] * 3)
+
+
+def test_place_without_overlaps():
+    rng = np.random.default_rng(1)
+    anchors = rng.uniform(0, 100, (300, 2))
+    anchors[5] = np.nan
+    widths = rng.uniform(5, 20, 300)
+    extents = np.c_[np.zeros((300, 2)), widths, np.full(300, 4)]
+    shifts, visible = place_labels(anchors, extents)
+    assert not visible[5]
+    assert 0 < visible.sum() < 300
+    lower, upper = boxes(anchors, extents, shifts)
+    lower, upper = lower[visible], upper[visible]
+    overlap = np.all(
+        (lower[:, None] < upper[None]) & (lower[None] < upper[:, None]),
+        axis=-1,
+    )
+    np.fill_diagonal(overlap, False)
+    assert not overlap.any()
+    # the first label has the highest priority
+    assert visible[0] and np.allclose(shifts[0], 2)
+
+
+def test_label_collection():
+    fig = Figure(figsize=(4, 3), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    anchors = np.c_[np.linspace(0, 1, 50), np.zeros(50)]
+    texts = [f"label{ii}" for ii in range(50)]
+    cache = TextCache()
+    labels = add_labels(ax, anchors, texts, cache=cache, color="b")
+    assert cache.misses == 50
+    fig.canvas.draw()
+    placed = labels.placed.sum()
+    assert 0 < placed < 50
+    assert len(labels.get_paths()) == placed
+    # the zoom frees space for more labels
+    ax.set_xlim(0, 0.2)
+    fig.canvas.draw()
+    assert labels.placed[:10].all()
+    assert cache.misses == 50
+    # without autoplace all the labels in view are drawn
+    free = add_labels(ax, anchors, texts, cache=cache, autoplace=False)
+    fig.canvas.draw()
+    assert free.placed[:10].all()
+    assert not free.placed[-10:].any()
+    ax.set_xlim(-0.1, 1.1)
+    fig.canvas.draw()
+    assert free.placed.all()
+    assert cache.hits == 50
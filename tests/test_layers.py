@@ -0,0 +1,101 @@
+from xpoint import Line, LinearPattern, Point
+from xpoint.canvas import Canvas2DBase, LayerFilter
+
+
+def make_model():
+    root = Point(name="root")
+    for ii in range(3):
+        mag = Point(x=ii, name=f"mb{ii}", layer="magnets")
+        mag.add_part("coil", Line([0, 0, 0], [0, 0, 1]))
+        mag.add_part("bpm", Point(y=0.5, name="bpm", layer="instruments"))
+        root.add_part(f"mb{ii}", mag)
+    root.add_part("bpm", Point(y=-1, name="bpm", layer="instruments"))
+    bolt = Point(name="bolt", layer="bolts")
+    root.add_part("bolts", LinearPattern(bolt, 4, step=(0, 0, 1)))
+    return root
+
+
+def walk(root, visible):
+    calls = []
+
+    def counted(part, layer):
+        calls.append(part.name)
+        return visible(part, layer)
+
+    counted.nesting = getattr(visible, "nesting", None)
+    names = [prim.name for prim, _, _ in root.iter_primitives(visible=counted)]
+    return names, calls
+
+
+def test_hide_prunes_subtrees():
+    root = make_model()
+    layers = LayerFilter()
+    names, _ = walk(root, layers.predicate())
+    assert names.count("bpm") == 4
+    assert names.count("bolt") == 4
+    layers.hide("magnets")
+    names, calls = walk(root, layers.predicate())
+    # the parts of the hidden magnets are not visited
+    assert calls.count("bpm") == 1
+    assert names == ["bpm"] + ["bolt"] * 4
+    layers.hide("bolts")
+    names, _ = walk(root, layers.predicate())
+    assert names == ["bpm"]
+    layers.show("magnets", "bolts")
+    names, _ = walk(root, layers.predicate())
+    assert len(names) == 3 * 2 + 1 + 4
+
+
+def test_style_selectors():
+    root = make_model()
+    layers = LayerFilter()
+    style = {".instruments": {"visible": False}}
+    names, _ = walk(root, layers.predicate(style))
+    assert "bpm" not in names
+    override = {".instruments": {"visible": True}}
+    names, _ = walk(root, layers.predicate(style, override))
+    assert names.count("bpm") == 4
+    # selectors changed in place are seen
+    style[".instruments"]["visible"] = True
+    names, _ = walk(root, layers.predicate(style))
+    assert names.count("bpm") == 4
+    layers.hide("instruments")
+    assert not layers.is_visible("instruments", override)
+
+
+def test_cache_follows_versions():
+    layers = LayerFilter()
+    visible = layers.predicate()
+    assert visible(None, "magnets")
+    layers.hide("magnets")
+    # an old predicate keeps its cache, a new one sees the change
+    assert visible(None, "magnets")
+    assert not layers.predicate()(None, "magnets")
+    assert layers.predicate()(None, None)
+
+
+def test_drawn_visibility():
+    root = make_model()
+    layers = LayerFilter()
+    walk(root, layers.predicate())
+    assert layers.nesting["magnets"] == {None}
+    assert layers.nesting["instruments"] == {None, "magnets"}
+    assert layers.drawn_visibility("instruments") is True
+    layers.hide("magnets")
+    # instruments are drawn both inside and outside of the magnets
+    assert layers.drawn_visibility("instruments") is None
+    assert layers.drawn_visibility("magnets") is False
+    layers.hide("instruments")
+    assert layers.drawn_visibility("instruments") is False
+    assert layers.drawn_visibility(None) is True
+
+
+def test_canvas_layers():
+    root = make_model()
+    canvas = Canvas2DBase().add(root)
+    assert canvas.hide_layer("magnets", "bolts") is canvas
+    names, _ = walk(root, canvas.layers.predicate(canvas.style))
+    assert names == ["bpm"]
+    assert canvas.show_layer("bolts") is canvas
+    names, _ = walk(root, canvas.layers.predicate(canvas.style))
+    assert names == ["bpm"] + ["bolt"] * 4
@@ -0,0 +1,121 @@
+import math
+
+import numpy as np
+import pytest
+
+from xpoint.madx import Madx
+
+fodo = """
+n = 8; lc = 10; lq = 1; lb = 3;
+ang := twopi / (2 * n);
+qf: quadrupole, l=lq;
+qd: quadrupole, l=lq;
+mb: sbend, l=lb, angle=ang;
+mk: marker;
+ring: sequence, l=n*lc, refer=centre;
+"""
+for cell in range(8):
+    start = 10 * cell
+    fodo += f"qf, at={start + 1};\n"
+    fodo += f"mb, at={start + 3.5};\n"
+    fodo += f"qd, at={start + 6};\n"
+    fodo += f"mb, at={start + 8.5};\n"
+    if cell == 1:
+        fodo += "mk, at=0.5, from=qf;\n"
+fodo += "mk, at=2, from=qf[2];\nendsequence;\n"
+
+
+def parse(text):
+    return Madx().parse(text.splitlines(True))
+
+
+@pytest.fixture
+def ring():
+    return parse(fodo).sequence("ring")
+
+
+def test_repeated_elements(ring):
+    assert len(ring.index["qf"]) == 8
+    assert len(ring.index["mb"]) == 16
+    assert ring.keys[:5] == ["qf[1]", "mb[1]", "qd[1]", "mb[2]", "qf[2]"]
+    keys = list(ring.parts)
+    assert len(keys) == len(set(keys)) == 34
+    locations = {
+        tuple(np.round(ring.parts[key].matrix[:3, 3], 6)) for key in keys
+    }
+    assert len(locations) == 34
+    assert ring[0].name == "ring/qf[1]"
+    assert np.allclose(ring[0].location, ring["qf[1]"].location)
+
+
+def test_closed_orbit(ring):
+    end = ring.frames(np.array([80.0]))[0]
+    assert np.allclose(end, np.eye(4), atol=1e-9)
+    # the focusing quadrupoles are on a regular octagon
+    locations = np.array(
+        [ring.parts[f"qf[{ii}]"].location for ii in range(1, 9)]
+    )
+    assert np.allclose(locations[:, 1], 0)
+    centre = locations.mean(axis=0)
+    radius = np.linalg.norm(locations - centre, axis=1)
+    assert np.allclose(radius, radius[0])
+
+
+def test_from_occurrence(ring):
+    # from=qf is the last qf read before, from=qf[2] the second one
+    first, second = ring["mk[1]"], ring["mk[2]"]
+    assert ring.centers[ring.positions["mk[1]"]] == pytest.approx(11.5)
+    assert ring.centers[ring.positions["mk[2]"]] == pytest.approx(13)
+    assert not np.allclose(first.location, second.location)
+
+
+def test_unknown_reference():
+    text = fodo.replace("from=qf[2]", "from=qf[9]")
+    with pytest.raises(ValueError):
+        parse(text).sequence("ring")
+    text = fodo.replace("from=qf[2]", "from=qx")
+    with pytest.raises(ValueError):
+        parse(text).sequence("ring")
+
+
+def test_expressions():
+    madx = parse(
+        "a = 2; b := sqrt(a) * -a^2 + 1e-3 + qf->l;"
+        "c := max(a, 3) / 2 - atan2(1, 1) * 4;"
+        "qf: quadrupole, l=a * 1.5;"
+    )
+    assert madx.variable("b") == pytest.approx(-4 * math.sqrt(2) + 3.001)
+    assert madx.variable("c") == pytest.approx(1.5 - math.pi)
+    assert madx.variable("undefined") == 0
+
+
+def test_immediate_assignment():
+    madx = parse("x = 1; x = x + 1; a = 1; b = a; c := a; a = 5;")
+    assert madx.variable("x") == 2
+    assert madx.variable("b") == 1
+    assert madx.variable("c") == 5
+    assert madx.variables["b"] == 1
+
+
+def test_deferred_assignment():
+    madx = parse("lq := 2 * k; qf: quadrupole, l=lq; k = 1;")
+    assert madx.attribute("qf", "l") == 2
+    madx.parse(["k = 3;"])
+    assert madx.attribute("qf", "l") == 6
+
+
+@pytest.mark.parametrize(
+    "expr",
+    [
+        "().__class__.__bases__[0].__subclasses__()",
+        "__import__('os').getcwd()",
+        "(lambda: 1)()",
+        "[1, 2]",
+        "a if a else 1",
+        "sqrt(x=2)",
+    ],
+)
+def test_rejected_expressions(expr):
+    madx = parse(f"a = 1; value := {expr};")
+    with pytest.raises(ValueError):
+        madx.variable("value")
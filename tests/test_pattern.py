@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+from xpoint import (
+    Box,
+    GridPattern,
+    HelixPattern,
+    LinearPattern,
+    Point,
+    PolarPattern,
+)
+from xpoint.pattern import Pattern
+from xpoint.snapshot import Snapshot
+
+
+def turn():
+    template = Point(x=0.1, rz=30, name="turn")
+    template.add_part("box", Box(0.1, 0.2, 0.3, z=0.5))
+    return template
+
+
+patterns = [
+    lambda: LinearPattern(turn(), 5, step=(0, 1, 2)),
+    lambda: GridPattern(turn(), (2, 3, 2), (1, 2, 3)),
+    lambda: HelixPattern(turn(), 12, radius=2, pitch=0.5, axis="y"),
+    lambda: HelixPattern(turn(), 7, radius=1, axis=(1, 1, 0), step=10),
+    lambda: PolarPattern(turn(), 6, radius=3, step=np.pi / 3, degrees=False),
+]
+
+
+def model(make):
+    root = Point(x=1, y=2, rx=20, name="root")
+    coil = make()
+    coil.moveby(dx=5).rotateby(rz=15)
+    root.add_part("coil", coil)
+    return root, coil
+
+
+@pytest.mark.parametrize("make", patterns)
+def test_frames(make):
+    coil = make()
+    assert coil.frames.shape == (len(coil), 4, 4)
+    assert np.allclose(coil.frames[:, 3], [0, 0, 0, 1])
+    rot = coil.frames[:, :3, :3]
+    assert np.allclose(rot @ rot.transpose(0, 2, 1), np.eye(3))
+
+
+@pytest.mark.parametrize("make", patterns)
+def test_instances_match_flatten(make):
+    root, coil = model(make)
+    snapshot = Snapshot(root)
+    world = root.matrix
+    for ii in range(len(coil)):
+        expected = snapshot.matrices[snapshot.index[f"coil/{ii}"]]
+        assert np.allclose(world @ coil[ii].matrix, expected)
+        # through the parent, by key and by attribute
+        assert np.allclose(root["coil"][ii].matrix, expected)
+        assert np.allclose(root.coil[ii].matrix, expected)
+        assert root["coil"][ii].name == f"root/coil/{ii}"
+    assert np.allclose(coil[-1].matrix, coil[len(coil) - 1].matrix)
+    with pytest.raises(IndexError):
+        coil[len(coil)]
+
+
+@pytest.mark.parametrize("make", patterns)
+def test_world_frames(make):
+    root, coil = model(make)
+    coil.set_origin([0.3, 0, 0])
+    expected = root.matrix @ coil.body_matrix @ coil.frames
+    assert np.allclose(coil.world_frames, expected)
+    snapshot = Snapshot(root)
+    assert np.allclose(
+        snapshot.matrices[snapshot.index["coil/0"]],
+        expected[0] @ coil.template.matrix,
+    )
+
+
+def test_copy_keeps_pattern():
+    root, coil = model(patterns[2])
+    copied = root["coil"]
+    assert isinstance(copied, HelixPattern)
+    assert copied.template is coil.template
+    assert len(copied) == len(coil)
+    assert np.allclose(copied.frames, coil.frames)
+    copied.count = 3
+    assert len(coil) == 12
+
+
+def test_primitives():
+    root, coil = model(patterns[1])
+    boxes = [
+        matrix for prim, _, matrix in root.iter_primitives()
+        if isinstance(prim, Box)
+    ]
+    snapshot = Snapshot(root)
+    expected = [
+        snapshot.matrices[snapshot.index[f"coil/{ii}/box"]]
+        for ii in range(len(coil))
+    ]
+    assert np.allclose(boxes, expected)
+
+
+def test_empty():
+    for coil in [
+        HelixPattern(turn(), 0, radius=1),
+        LinearPattern(turn(), 0),
+        GridPattern(turn(), (0, 3), (1, 1)),
+    ]:
+        assert len(coil) == 0
+        assert coil.frames.shape == (0, 4, 4)
+        assert list(coil.iter_primitives()) == []
+        with pytest.raises(IndexError):
+            coil[0]
+
+
+def test_abstract():
+    with pytest.raises(TypeError):
+        Pattern(turn())
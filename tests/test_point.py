@@ -0,0 +1,191 @@
+import numpy as np
+import pytest
+
+from xpoint import Point
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=float)
+    return vector / np.linalg.norm(vector)
+
+
+def assert_rotation(matrix):
+    assert np.allclose(matrix.T @ matrix, np.eye(3))
+    assert np.isclose(np.linalg.det(matrix), 1)
+
+
+@pytest.mark.parametrize("axis", ["x", "y", "z"])
+def test_lookat_axis(axis):
+    point = Point(x=1, y=2, z=3, rx=20, ry=-30, rz=40)
+    target = np.array([-2, 5, 1.5])
+    point.lookat(target, axis=axis)
+    assert_rotation(point.rotation_matrix)
+    assert np.allclose(getattr(point, "d" + axis), unit(target - [1, 2, 3]))
+    assert np.allclose(point.location, [1, 2, 3])
+
+
+def test_lookat_minimal_rotation():
+    point = Point(rx=10, rz=30)
+    # already looking at the target
+    before = point.rotation_matrix.copy()
+    point.lookat(point.dz * 5)
+    assert np.allclose(point.rotation_matrix, before)
+    # the axis orthogonal to both directions does not move
+    target = unit([1, 1, 0.2])
+    normal = unit(np.cross(point.dz, target))
+    local = before.T @ normal
+    point.lookat(target)
+    assert np.allclose(point.dz, target)
+    assert np.allclose(point.rotation_matrix @ local, normal)
+
+
+def test_lookat_up():
+    point = Point(x=1, rz=70, ry=15)
+    point.lookat(5, 4, 3, up="z")
+    direction = unit([4, 4, 3])
+    assert np.allclose(point.dz, direction)
+    # dy is the projection of up orthogonal to the direction
+    up = np.array([0, 0, 1.0])
+    assert np.allclose(point.dy, unit(up - up.dot(direction) * direction))
+    point.lookat(5, 4, 3, axis="x", up=[0, 1, 0], upaxis="z")
+    assert np.allclose(point.dx, unit([4, 4, 3]))
+    assert point.dz[1] > 0 and np.isclose(point.dz @ point.dx, 0)
+
+
+def test_lookat_point_and_scale():
+    point = Point(rx=30)
+    point.matrix = point.matrix @ np.diag([2.0, 2.0, 2.0, 1.0])
+    point.lookat(Point(x=3, y=4))
+    columns = point.matrix[:3, :3]
+    assert np.allclose(np.linalg.norm(columns, axis=0), 2)
+    assert np.allclose(columns[:, 2], [1.2, 1.6, 0])
+
+
+@pytest.mark.parametrize(
+    "a, b",
+    [
+        ([1, 0, 0], [0, 1, 0]),
+        ([1, 2, 3], [-3, 0.5, 2]),
+        ([0, 0, 2], [0, 0, 5]),
+        ([1, 1, 0], [-1, -1, 0]),
+    ],
+)
+def test_rotate_atob(a, b):
+    point = Point(x=1, y=-2, rx=15, ry=25)
+    before = point.matrix.copy()
+    point.rotate_atob(a, b)
+    rot = point.rotation_matrix @ before[:3, :3].T
+    assert_rotation(point.rotation_matrix)
+    assert np.allclose(rot @ unit(a), unit(b))
+    assert np.allclose(point.location, before[:3, 3])
+    axis = np.cross(a, b)
+    if np.linalg.norm(axis) > 1e-9:
+        # minimal rotation, about the normal of a and b
+        assert np.allclose(rot @ axis, axis)
+
+
+def test_rotate_atob_moves_parts():
+    root = Point()
+    child = Point(x=1)
+    root.add_part("child", child)
+    root.rotate_atob([1, 0, 0], [0, 0, 1])
+    assert np.allclose(root["child"].location, [0, 0, 1])
+    assert np.allclose(child.world_matrix[:3, 3], [0, 0, 1])
+
+
+def make_tree():
+    root = Point(x=1, rz=30, name="root")
+    arm = Point(x=2, rx=20, name="arm")
+    arm.add_part("tip", Point(z=1, name="tip"))
+    root.add_part("arm", arm)
+    root.add_part("base", Point(y=-1, name="base"))
+    return root
+
+
+def part_frames(root):
+    return {
+        key: root.body_matrix @ root.part_matrix(key)
+        for key in ("arm", "arm/tip", "base")
+    }
+
+
+def assert_frames(root, frames):
+    for key, matrix in part_frames(root).items():
+        assert np.allclose(matrix, frames[key]), key
+
+
+@pytest.mark.parametrize(
+    "frame",
+    ["arm/tip", [0.5, 0.5, 0], Point(y=2, rz=45), Point(z=3, ry=10).matrix],
+)
+def test_set_origin(frame):
+    root = make_tree()
+    frames = part_frames(root)
+    body = root.body_matrix.copy()
+    root.set_origin(frame)
+    # the parts do not move, the origin is on frame
+    assert_frames(root, frames)
+    assert np.allclose(root.body_matrix, body)
+    assert np.allclose(root.matrix, body @ root._frame_matrix(frame))
+    assert np.allclose(
+        root.parts["arm"].parts["tip"].world_matrix, frames["arm/tip"]
+    )
+    root.set_origin()
+    assert root._body is None
+    assert np.allclose(root.matrix, body)
+    assert_frames(root, frames)
+
+
+def test_set_origin_twice():
+    root = make_tree()
+    frames = part_frames(root)
+    root.set_origin("base")
+    assert np.allclose(root.location, frames["base"][:3, 3])
+    root.set_origin("arm")
+    assert np.allclose(root.matrix, frames["arm"])
+    assert_frames(root, frames)
+
+
+def test_rotate_moves_origin():
+    root = make_tree()
+    frames = part_frames(root)
+    matrix = root.matrix.copy()
+    root.rotate("arm", zrot=90)
+    # rotation about the z axis of the arm, the origin turns with the parts
+    pivot = frames["arm"]
+    move = pivot @ Point(rz=90).matrix @ np.linalg.inv(pivot)
+    assert_frames(root, {key: move @ mm for key, mm in frames.items()})
+    assert np.allclose(part_frames(root)["arm"][:3, 3], pivot[:3, 3])
+    assert np.allclose(root.matrix, move @ matrix)
+    assert root._body is None
+
+
+def test_rotate_keep_origin():
+    moved = make_tree().rotate("arm", xrot=30, yrot=-20)
+    kept = make_tree()
+    matrix = kept.matrix.copy()
+    kept.rotate("arm", xrot=30, yrot=-20, keep_origin=True)
+    # the parts move as without keep_origin, the origin stays
+    assert np.allclose(kept.matrix, matrix)
+    assert_frames(kept, part_frames(moved))
+    assert np.allclose(kept.body_matrix, moved.body_matrix)
+    assert not np.allclose(kept.body_matrix, kept.matrix)
+    # a second rotation composes with the first
+    kept.rotate(zrot=10, keep_origin=True)
+    moved.rotate(zrot=10)
+    assert_frames(kept, part_frames(moved))
+
+
+def test_body_matrix_of_parents():
+    root = make_tree()
+    tip = root.parts["arm"].parts["tip"]
+    world = tip.world_matrix.copy()
+    root.rotate("base", zrot=45, keep_origin=True)
+    assert np.allclose(
+        tip.world_matrix, root.body_matrix @ root.part_matrix("arm/tip")
+    )
+    assert not np.allclose(tip.world_matrix, world)
+    assert np.allclose(root.body.matrix, root.body_matrix)
+    assert root.body.parts is root.parts
+    arm = Point(x=2, rx=20).matrix
+    assert np.allclose(root["arm"].matrix, root.body_matrix @ arm)
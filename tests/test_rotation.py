@@ -0,0 +1,86 @@
+import itertools
+import warnings
+
+import numpy as np
+import pytest
+
+from xpoint import rotation
+
+Rotation = pytest.importorskip("scipy.spatial.transform").Rotation
+
+sequences = [
+    "".join(axes)
+    for axes in itertools.product("xyz", repeat=3)
+    if axes[0] != axes[1] and axes[1] != axes[2]
+]
+sequences += [seq.upper() for seq in sequences]
+
+
+@pytest.fixture(scope="module")
+def rotations():
+    return Rotation.random(500, random_state=3)
+
+
+def test_sequences():
+    assert len(sequences) == 24
+
+
+@pytest.mark.parametrize("seq", sequences)
+def test_euler_scipy(rotations, seq):
+    matrices = rotations.as_matrix()
+    angles = rotations.as_euler(seq, degrees=True)
+    assert np.allclose(
+        rotation.matrix_to_euler(seq, matrices, degrees=True),
+        angles,
+        atol=1e-9,
+    )
+    assert np.allclose(
+        rotation.euler_to_matrix(seq, angles, degrees=True),
+        matrices,
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize("seq", sequences)
+def test_euler_gimbal_lock(seq):
+    symmetric = seq[0].lower() == seq[2].lower()
+    middle = [0, 180] if symmetric else [90, -90]
+    angles = np.array([[10, mm, 20] for mm in middle], dtype=float)
+    matrices = Rotation.from_euler(seq, angles, degrees=True).as_matrix()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        expected = Rotation.from_matrix(matrices).as_euler(seq, degrees=True)
+    result = rotation.matrix_to_euler(
+        seq, matrices, degrees=True, suppress_warnings=True
+    )
+    assert np.allclose(result, expected, atol=1e-6)
+    # the angles still describe the same rotation
+    assert np.allclose(
+        rotation.euler_to_matrix(seq, result, degrees=True),
+        matrices,
+        atol=1e-9,
+    )
+
+
+def test_quat_scipy(rotations):
+    matrices = rotations.as_matrix()
+    quat = rotation.matrix_to_quat(matrices)
+    expected = Rotation.from_matrix(matrices).as_quat()
+    assert np.allclose(quat, expected, atol=1e-12)
+    assert np.allclose(rotation.matrix_to_quat(3 * matrices), quat)
+    assert np.allclose(rotation.quat_to_matrix(quat), matrices, atol=1e-12)
+
+
+def test_rotvec_scipy(rotations):
+    matrices = rotations.as_matrix()
+    rotvec = rotations.as_rotvec()
+    assert np.allclose(rotation.matrix_to_rotvec(matrices), rotvec)
+    assert np.allclose(rotation.rotvec_to_matrix(rotvec), matrices)
+    quat = rotation.rotvec_to_quat(rotvec)
+    assert np.allclose(rotation.quat_to_rotvec(quat), rotvec)
+
+
+def test_identity_shapes():
+    assert np.allclose(rotation.matrix_to_euler("zxy", np.eye(3)), 0)
+    assert rotation.euler_to_matrix("zxy", [0, 0, 0]).shape == (3, 3)
+    assert rotation.rotvec_to_matrix(np.zeros((4, 3))).shape == (4, 3, 3)
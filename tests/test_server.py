@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from xpoint import Point
+from xpoint.server import GeometryClient, GeometryError, GeometryServer
+
+
+def make_model():
+    root = Point(name="root")
+    for ii in range(10):
+        mag = Point(x=ii, name=f"mb{ii}", layer="magnets")
+        mag.add_part("bpm", Point(y=0.5, name="bpm", layer="instruments"))
+        root.add_part(f"mb{ii}", mag)
+    return root
+
+
+def run_with_server(func):
+    async def main():
+        server = GeometryServer(make_model(), batch_delay=0.001)
+        srv = await server.serve(port=0)
+        port = srv.sockets[0].getsockname()[1]
+        try:
+            return await func(server, port)
+        finally:
+            srv.close()
+            await srv.wait_closed()
+
+    return asyncio.run(main())
+
+
+def test_query_batches():
+    async def main():
+        server = GeometryServer(make_model(), batch_delay=0.001)
+        paths = [f"mb{ii}/bpm" for ii in range(10)]
+        results = await asyncio.gather(
+            *[server.query({"op": "world", "path": path}) for path in paths],
+            server.query({"op": "world", "path": "nope"}),
+            server.query(
+                {"op": "near", "location": [3, 0.5, 0], "radius": 0.1}
+            ),
+            server.query({"op": "bogus"}),
+            server.query(["not", "a", "dict"]),
+        )
+        return server, results
+
+    server, results = asyncio.run(main())
+    assert server.nbatches == 1
+    for ii, result in enumerate(results[:10]):
+        assert np.allclose(np.array(result["matrix"])[:3, 3], [ii, 0.5, 0])
+    assert "Unknown path" in results[10]["error"]
+    assert results[11]["paths"] == ["mb3/bpm"]
+    assert "Unknown op" in results[12]["error"]
+    assert "Invalid request" in results[13]["error"]
+
+
+def test_client_matches_concurrent_replies():
+    async def func(server, port):
+        client = await GeometryClient.connect(port=port)
+        try:
+            paths = [f"mb{ii}" for ii in range(10)] * 3
+            matrices = await asyncio.gather(
+                *[client.world(path) for path in paths]
+            )
+            selected = await client.request("select", layer="instruments")
+        finally:
+            await client.close()
+        return paths, matrices, selected
+
+    paths, matrices, selected = run_with_server(func)
+    for path, matrix in zip(paths, matrices):
+        assert np.allclose(matrix[:3, 3], [int(path[2:]), 0, 0])
+    assert len(selected["paths"]) == 10
+    assert "id" not in selected
+
+
+def test_client_error():
+    async def func(server, port):
+        client = await GeometryClient.connect(port=port)
+        try:
+            with pytest.raises(GeometryError, match="Unknown path 'nope'"):
+                await client.world("nope")
+            # the connection is still usable
+            return await client.request("version")
+        finally:
+            await client.close()
+
+    assert run_with_server(func) == {"version": 0}
+
+
+def test_socket_replies_carry_id():
+    async def func(server, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        requests = [
+            {"op": "world", "path": "mb1", "id": "a"},
+            {"op": "world", "path": "nope", "id": 7},
+            {"op": "version"},
+        ]
+        for req in requests:
+            writer.write(json.dumps(req).encode() + b"\n")
+        writer.write(b"not json\n")
+        await writer.drain()
+        writer.write_eof()
+        replies = [json.loads(line) async for line in reader]
+        writer.close()
+        return replies
+
+    replies = run_with_server(func)
+    assert len(replies) == 4
+    byid = {reply.get("id"): reply for reply in replies}
+    assert "matrix" in byid["a"]
+    assert "Unknown path" in byid[7]["error"]
+    noid = [reply for reply in replies if "id" not in reply]
+    assert {"version": 0} in noid
+    assert any("error" in reply for reply in noid)
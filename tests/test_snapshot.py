@@ -0,0 +1,94 @@
+import threading
+
+import numpy as np
+import pytest
+
+from xpoint import LinearPattern, Point
+from xpoint.cache import FrameCache
+from xpoint.snapshot import Snapshot, SnapshotStore
+
+
+def make_model(nparts=20):
+    root = Point(name="root")
+    for ii in range(nparts):
+        mag = Point(x=ii, name=f"mb{ii}", layer="magnets")
+        mag.add_part("bpm", Point(y=0.5, name="bpm", layer="instruments"))
+        root.add_part(f"mb{ii}", mag)
+    return root
+
+
+def test_paths_and_queries():
+    root = make_model(3)
+    root.add_part("row", LinearPattern(Point(name="bolt"), 2, step=(0, 0, 1)))
+    snap = Snapshot(root)
+    assert snap.paths[:3] == ("", "mb0", "mb0/bpm")
+    assert snap.paths[-3:] == ("row", "row/0", "row/1")
+    assert np.allclose(snap.location("mb2/bpm"), [2, 0.5, 0])
+    assert np.allclose(snap.location("row/1"), [0, 0, 1])
+    assert snap.parents[snap.index["mb2/bpm"]] == snap.index["mb2"]
+    assert [snap.paths[ii] for ii in snap.select("mb1")] == ["mb1", "mb1/bpm"]
+    assert len(snap.select(layer="instruments")) == 3
+    assert snap.near([1, 0.5, 0], 0.6) == ["mb1/bpm", "mb1"]
+    assert snap.point("mb1").name == "mb1"
+
+
+def test_snapshot_is_read_only_and_detached():
+    root = make_model(3)
+    snap = Snapshot(root)
+    with pytest.raises(ValueError):
+        snap.matrices[0, 0, 3] = 1
+    with pytest.raises(ValueError):
+        snap.locations[0, 0] = 1
+    root.parts["mb1"].x = 10
+    assert np.allclose(snap.location("mb1"), [1, 0, 0])
+    point = snap.point("mb1")
+    point.x = 20
+    assert np.allclose(snap.location("mb1"), [1, 0, 0])
+
+
+def test_publish_isolation():
+    root = make_model(3)
+    store = SnapshotStore(root)
+    first = store.current
+    root.parts["mb1"].x = 10
+    assert store.current is first
+    second = store.publish()
+    assert store.current is second
+    assert (first.version, second.version) == (0, 1)
+    assert np.allclose(first.location("mb1"), [1, 0, 0])
+    assert np.allclose(second.location("mb1"), [10, 0, 0])
+    with store.update() as model:
+        model.parts["mb2"].x = 20
+        assert store.current is second
+    assert store.version == 2
+    assert np.allclose(store.current.location("mb2"), [20, 0, 0])
+
+
+def test_concurrent_readers(tmp_path):
+    root = make_model()
+    store = SnapshotStore(root, cache=FrameCache(tmp_path, min_size=5))
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            snap = store.current
+            # all magnets of one version are moved by the same offset
+            offsets = [
+                snap.location(f"mb{ii}")[1] for ii in range(20)
+            ]
+            if len(set(offsets)) != 1 or offsets[0] != snap.version:
+                errors.append(snap.version)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for version in range(1, 30):
+        with store.update() as model:
+            for ii in range(20):
+                model.parts[f"mb{ii}"].y = version
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert store.version == 29
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from xpoint import Point
+from xpoint.framearray import FrameArray
+from xpoint.snapshot import flatten
+from xpoint.table import from_table, to_arrow, to_columns, to_pandas
+
+
+def model():
+    root = Point(x=1, rz=10, name="root")
+    arc = Point(x=5, rx=20, name="arc", layer="magnets")
+    arc.add_part("mb1", Point(z=2, ry=-30, name="mb1", seq="xyz"))
+    arc.add_part("mb2", Point(z=4, rz=45, name="mb2", degrees=False))
+    bpm = Point(y=0.5, name="bpm", layer="instruments")
+    arc.parts["mb2"].add_part("bpm", bpm)
+    root.add_part("arc", arc)
+    root.add_part("stand", Point(y=-1, rx=5, name="stand"))
+    return root
+
+
+def world_matrices(root):
+    paths, parents, matrices, parts = flatten(root)
+    return dict(zip(paths, matrices))
+
+
+def assert_same_tree(rebuilt, root):
+    expected = world_matrices(root)
+    actual = world_matrices(rebuilt)
+    assert actual.keys() == expected.keys()
+    for path, matrix in expected.items():
+        assert np.allclose(actual[path], matrix), path
+
+
+@pytest.mark.parametrize("world", [True, False])
+def test_columns_round_trip(world):
+    root = model()
+    rebuilt = from_table(to_columns(root, world=world), world=world)
+    assert_same_tree(rebuilt, root)
+    arc = rebuilt.parts["arc"]
+    assert arc.layer == "magnets"
+    assert arc.parts["mb1"].seq == "xyz"
+    assert arc.parts["mb2"].degrees is False
+    assert arc.parts["mb2"].parts["bpm"].parent is arc.parts["mb2"]
+
+
+def test_euler_columns():
+    root = model()
+    cols = to_columns(root)
+    for key in ("qx", "qy", "qz", "qw"):
+        del cols[key]
+    assert_same_tree(from_table(cols), root)
+
+
+@pytest.mark.parametrize("world", [True, False])
+def test_arrow_round_trip(world):
+    pytest.importorskip("pyarrow")
+    root = model()
+    assert_same_tree(from_table(to_arrow(root, world=world)), root)
+
+
+@pytest.mark.parametrize("world", [True, False])
+def test_pandas_round_trip(world):
+    pytest.importorskip("pandas")
+    root = model()
+    assert_same_tree(from_table(to_pandas(root, world=world)), root)
+
+
+def test_several_roots():
+    matrices = [Point(x=ii, rz=10 * ii).matrix for ii in range(3)]
+    frames = FrameArray(matrices, names=["a", "b", "c"])
+    root = from_table(to_columns(frames))
+    assert list(root.parts) == ["a", "b", "c"]
+    for key, matrix in zip(root.parts, matrices):
+        assert root.parts[key].parent is root
+        assert np.allclose(root.parts[key].matrix, matrix)
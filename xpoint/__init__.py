@@ -1,3 +1,22 @@
 from .point import Point
-from .primitives import Line, PolyLine, Text
-from .canvas import Canvas2DMPL
\ No newline at end of file
+from .primitives import Box, Cylinder, Line, PolyLine, Rectangle, Text
+from .graph import PointNode
+from .frame import Frame
+from .framearray import FrameArray
+from .curve import Curve
+from .pattern import (
+    FramePattern,
+    GridPattern,
+    HelixPattern,
+    LinearPattern,
+    PolarPattern,
+)
+
+
+def __getattr__(name):
+    # drawing backends import matplotlib on first use
+    if name == "Canvas2DMPL":
+        from .canvas import Canvas2DMPL
+
+        return Canvas2DMPL
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,223 @@
+"""
+Typed batches of drawing primitives.
+
+`collect` walks the hierarchies once and appends every visible primitive
+to the batch of its kind, style and layer: point frames, line endpoints,
+polyline vertices with offsets, shapes with their boxes and text anchors.
+The world coordinates of a batch are computed with vectorized operations
+when it is finalized, so canvases consume whole arrays instead of one
+(primitive, style, matrix) per object.
+"""
+
+import numpy as np
+
+from .bounds import aabb_from_obb, obb_from_matrices
+
+
+def style_key(style):
+    """Hashable key of a flat style dictionary"""
+    return tuple(
+        sorted(
+            (k, tuple(v) if isinstance(v, list) else v)
+            for k, v in style.items()
+        )
+    )
+
+
+class PrimitiveBatch:
+    """Primitives of one kind sharing a style.
+
+    After `finalize`, `matrices` (N,4,4) are the world frames of the
+    primitives and the world vertices of primitive `i` are
+    `vertices[offsets[i]:offsets[i+1]]`.
+    """
+
+    kind = None
+
+    def __init__(self, style, layer=None):
+        self.style = style
+        self.layer = layer
+        self.primitives = []
+        self.matrices = []
+        self.local = []
+        self.vertices = None
+        self.offsets = None
+
+    def __len__(self):
+        return len(self.primitives)
+
+    def append(self, primitive, matrix):
+        self.primitives.append(primitive)
+        self.matrices.append(matrix)
+        self.local.append(primitive.vertices)
+
+    def finalize(self):
+        matrices = np.array(self.matrices, dtype=float).reshape(-1, 4, 4)
+        counts = np.array([len(vv) for vv in self.local], dtype=int)
+        offsets = np.zeros(len(counts) + 1, dtype=int)
+        np.cumsum(counts, out=offsets[1:])
+        if len(counts) == 0:
+            vertices = np.zeros((0, 3))
+        elif (counts == counts[0]).all():
+            local = np.array(self.local, dtype=float)
+            vertices = np.einsum("nij,nkj->nki", matrices[:, :3, :3], local)
+            vertices += matrices[:, None, :3, 3]
+            vertices = vertices.reshape(-1, 3)
+        else:
+            vertices = np.empty((offsets[-1], 3))
+            for ii, local in enumerate(self.local):
+                mat = matrices[ii]
+                vertices[offsets[ii] : offsets[ii + 1]] = (
+                    local @ mat[:3, :3].T + mat[:3, 3]
+                )
+        self.matrices = matrices
+        self.vertices = vertices
+        self.offsets = offsets
+        return self
+
+    def aabb(self):
+        """World axis aligned bounding boxes of the vertices (N,2,3)"""
+        if len(self) == 0:
+            return np.zeros((0, 2, 3))
+        start = self.offsets[:-1]
+        return np.stack(
+            [
+                np.minimum.reduceat(self.vertices, start),
+                np.maximum.reduceat(self.vertices, start),
+            ],
+            axis=1,
+        )
+
+    def split(self):
+        """List of world vertices per primitive"""
+        return np.split(self.vertices, self.offsets[1:-1])
+
+    def separated(self):
+        """World vertices with a row of NaN after each primitive"""
+        nvert = len(self.vertices)
+        out = np.full((nvert + len(self), 3), np.nan)
+        shift = np.repeat(np.arange(len(self)), np.diff(self.offsets))
+        out[np.arange(nvert) + shift] = self.vertices
+        return out
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({len(self)}, style={self.style})"
+
+
+class PointBatch(PrimitiveBatch):
+    """Batch of frames, the vertices are the locations"""
+
+    kind = "points"
+
+    def append(self, primitive, matrix):
+        self.primitives.append(primitive)
+        self.matrices.append(matrix)
+
+    def finalize(self):
+        self.matrices = np.array(self.matrices, dtype=float).reshape(-1, 4, 4)
+        self.vertices = self.matrices[:, :3, 3]
+        self.offsets = np.arange(len(self.matrices) + 1)
+        return self
+
+    @property
+    def locations(self):
+        return self.vertices
+
+
+class LineBatch(PrimitiveBatch):
+    kind = "lines"
+
+    @property
+    def endpoints(self):
+        """World start and end of the lines (N,2,3)"""
+        return self.vertices.reshape(-1, 2, 3)
+
+
+class PolyLineBatch(PrimitiveBatch):
+    kind = "polylines"
+
+
+class ShapeBatch(PrimitiveBatch):
+    """Batch of shapes, drawn as polylines, with oriented boxes"""
+
+    kind = "shapes"
+
+    def finalize(self):
+        super().finalize()
+        self.half_sizes = np.array(
+            [prim.half_sizes for prim in self.primitives], dtype=float
+        ).reshape(-1, 3)
+        return self
+
+    def obb(self):
+        """World oriented boxes: centers, unit axes and half sizes"""
+        return obb_from_matrices(self.matrices, self.half_sizes)
+
+    def aabb(self):
+        return aabb_from_obb(*self.obb())
+
+
+class TextBatch(PointBatch):
+    kind = "texts"
+
+    @property
+    def anchors(self):
+        return self.vertices
+
+    @property
+    def texts(self):
+        return [prim.text for prim in self.primitives]
+
+
+batch_classes = {
+    cls.kind: cls
+    for cls in (PointBatch, LineBatch, PolyLineBatch, ShapeBatch, TextBatch)
+}
+
+
+def collect(parts, resolve=None, matrix=None, visible=None):
+    """Traverse parts and return a dictionary of finalized batches.
+
+    Parameters
+    ----------
+    parts : dict or iterable
+        Parts to traverse, or a dictionary of parts and their styles.
+    resolve : callable, optional
+        `resolve(primitive, style)` returns the flat style of a primitive,
+        or None to skip it. By default the selectors of the style are
+        applied to the primitive.
+    matrix : array_like, optional
+        Matrix applied to the parts, default is the identity.
+    visible : callable, optional
+        `visible(part, layer)` prunes the subtrees for which it returns
+        False, see `Point.iter_primitives`.
+
+    Returns
+    -------
+    dict
+        Batches by (kind, style key, layer).
+    """
+    if not isinstance(parts, dict):
+        parts = {part: None for part in parts}
+    if resolve is None:
+        from .canvas import apply_style
+
+        resolve = apply_style
+    batches = {}
+    for part, partstyle in parts.items():
+        primitives = part.iter_primitives(
+            partstyle, matrix, visible=visible, layers=True
+        )
+        for prim, primstyle, pmatrix, layer in primitives:
+            style = resolve(prim, primstyle)
+            if style is None:
+                continue
+            kind = prim.primitive_kind
+            key = (kind, style_key(style), layer)
+            batch = batches.get(key)
+            if batch is None:
+                batch = batches[key] = batch_classes[kind](style, layer)
+            batch.append(prim, pmatrix)
+    for batch in batches.values():
+        batch.finalize()
+    return batches
@@ -0,0 +1,142 @@
+"""
+Vectorized bounding boxes of oriented boxes.
+
+An oriented box is described by the world matrix of its center frame and
+its half sizes along the local axes. The functions work on (N,...) stacks
+so that thousands of boxes are culled or checked for clashes without
+creating a `Point` per corner:
+
+    centers, axes, half = obb_from_matrices(matrices, half_sizes)
+    pairs = clashes(centers, axes, half)
+"""
+
+import numpy as np
+
+# corners of the unit box, bottom face (z=-1) first, then top face
+unit_corners = np.array(
+    [
+        [-1, -1, -1],
+        [1, -1, -1],
+        [1, 1, -1],
+        [-1, 1, -1],
+        [-1, -1, 1],
+        [1, -1, 1],
+        [1, 1, 1],
+        [-1, 1, 1],
+    ],
+    dtype=float,
+)
+
+unit_edges = np.array(
+    [
+        [0, 1], [1, 2], [2, 3], [3, 0],
+        [4, 5], [5, 6], [6, 7], [7, 4],
+        [0, 4], [1, 5], [2, 6], [3, 7],
+    ]
+)
+
+
+def obb_from_matrices(matrices, half_sizes):
+    """Oriented boxes from (N,4,4) center frames and (N,3) half sizes.
+
+    The scaling of the frames is moved to the half sizes.
+
+    Returns
+    -------
+    centers : (N,3)
+    axes : (N,3,3)
+        Unit axes as columns.
+    half : (N,3)
+    """
+    matrices = np.asarray(matrices, dtype=float).reshape(-1, 4, 4)
+    half_sizes = np.asarray(half_sizes, dtype=float).reshape(-1, 3)
+    rot = matrices[:, :3, :3]
+    scale = np.linalg.norm(rot, axis=1)
+    axes = rot / np.where(scale == 0, 1, scale)[:, None, :]
+    return matrices[:, :3, 3].copy(), axes, half_sizes * scale
+
+
+def aabb_from_obb(centers, axes, half):
+    """Axis aligned boxes (N,2,3) enclosing oriented boxes"""
+    extent = np.einsum("nij,nj->ni", np.abs(axes), half)
+    return np.stack([centers - extent, centers + extent], axis=1)
+
+
+def obb_corners(centers, axes, half):
+    """World corners (N,8,3) of oriented boxes, ordered as `unit_corners`"""
+    local = unit_corners[None] * half[:, None, :]
+    return np.einsum("nij,nkj->nki", axes, local) + centers[:, None, :]
+
+
+def aabb_overlap(aabb1, aabb2):
+    """True where two stacks of (N,2,3) axis aligned boxes intersect"""
+    return np.all(
+        (aabb1[..., 0, :] <= aabb2[..., 1, :])
+        & (aabb2[..., 0, :] <= aabb1[..., 1, :]),
+        axis=-1,
+    )
+
+
+def cull(aabb, lower, upper):
+    """Mask of the boxes intersecting the region [lower, upper]"""
+    region = np.array([lower, upper], dtype=float)
+    return aabb_overlap(aabb, region[None])
+
+
+def aabb_pairs(aabb):
+    """Pairs (K,2) of intersecting boxes, i < j, by sweep and prune.
+
+    Boxes are sorted along x, only the candidates overlapping in x are
+    checked on the other axes.
+    """
+    aabb = np.asarray(aabb, dtype=float).reshape(-1, 2, 3)
+    order = np.argsort(aabb[:, 0, 0], kind="stable")
+    lower = aabb[order, 0, 0]
+    end = np.searchsorted(lower, aabb[order, 1, 0], side="right")
+    counts = np.maximum(end - np.arange(len(order)) - 1, 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    start = np.repeat(np.cumsum(counts) - counts, counts)
+    second = np.arange(counts.sum()) - start + first + 1
+    ii, jj = order[first], order[second]
+    keep = aabb_overlap(aabb[ii], aabb[jj])
+    pairs = np.stack([ii[keep], jj[keep]], axis=1)
+    return np.sort(pairs, axis=1)
+
+
+def obb_overlap(c1, a1, h1, c2, a2, h2, eps=1e-12):
+    """True where two stacks of oriented boxes intersect.
+
+    Separating axis test on the 15 candidate axes of each pair.
+    """
+    rot = np.einsum("nji,njk->nik", a1, a2)  # a2 axes in a1 frame
+    arot = np.abs(rot) + eps
+    dist = np.einsum("nji,nj->ni", a1, c2 - c1)
+    separated = np.zeros(len(rot), dtype=bool)
+    for ii in range(3):
+        ra = h1[:, ii]
+        rb = (h2 * arot[:, ii, :]).sum(-1)
+        separated |= np.abs(dist[:, ii]) > ra + rb
+    for jj in range(3):
+        ra = (h1 * arot[:, :, jj]).sum(-1)
+        rb = h2[:, jj]
+        proj = (dist * rot[:, :, jj]).sum(-1)
+        separated |= np.abs(proj) > ra + rb
+    for ii in range(3):
+        i1, i2 = (ii + 1) % 3, (ii + 2) % 3
+        for jj in range(3):
+            j1, j2 = (jj + 1) % 3, (jj + 2) % 3
+            ra = h1[:, i1] * arot[:, i2, jj] + h1[:, i2] * arot[:, i1, jj]
+            rb = h2[:, j1] * arot[:, ii, j2] + h2[:, j2] * arot[:, ii, j1]
+            proj = dist[:, i2] * rot[:, i1, jj] - dist[:, i1] * rot[:, i2, jj]
+            separated |= np.abs(proj) > ra + rb
+    return ~separated
+
+
+def clashes(centers, axes, half):
+    """Pairs (K,2) of intersecting oriented boxes"""
+    pairs = aabb_pairs(aabb_from_obb(centers, axes, half))
+    ii, jj = pairs.T
+    keep = obb_overlap(
+        centers[ii], axes[ii], half[ii], centers[jj], axes[jj], half[jj]
+    )
+    return pairs[keep]
@@ -0,0 +1,286 @@
+"""
+Persistent cache of world frames keyed by subtree hashes.
+
+`tree_digest` computes a Merkle hash of every subtree of a hierarchy from
+the local matrix, name, layer and class of each part and the hashes of its
+children. The digests are stored on the parts and an edit clears the
+digests of the edited part and of its ancestors only, following the
+parents set by `Point.add_part`, so a new digest only hashes the edited
+branches. A `FrameCache` stores the flattened frames of the large
+subtrees, relative to their parent, in a directory of .npz files named by
+hash. Unchanged subtrees are loaded and moved into place with one matrix
+product, only the edited branches are walked again:
+
+    cache = FrameCache("~/.cache/xpoint")
+    snapshot = cache.snapshot(machine)
+
+The least recently used files are removed when the directory exceeds
+`maxsize` bytes.
+
+Edits are seen when they go through the attributes and methods of the
+points. Writing into the arrays returned by `matrix` or `location`, or
+into the `parts` dictionaries, bypasses them: assign the attribute again
+or use `add_part`. A part shared by several parents invalidates the
+digests of its last parent only.
+"""
+
+import json
+import os
+from hashlib import blake2b
+
+import numpy as np
+
+from .snapshot import Snapshot, flatten
+
+
+def _children(part):
+    """(key, child) pairs of part, the template of a pattern has an empty
+    key"""
+    if part.is_pattern:
+        return [("", part.template)]
+    return list(part.parts.items())
+
+
+def tree_digest(root):
+    """Merkle hash and number of frames of the subtree of root.
+
+    The digest of a part covers its local matrix, class, name, layer, body
+    offset and pattern frames and the keys and digests of its children.
+    It is stored on the part and cleared with the digests of its parents
+    when the part changes, so only the edited parts and their ancestors are
+    hashed again, the clean subtrees are not visited.
+
+    Returns
+    -------
+    tuple
+        (digest, number of frames)
+    """
+    stack = [(root, False)]
+    while stack:
+        part, ready = stack.pop()
+        if part._digest is not None:
+            continue
+        children = _children(part)
+        if not ready:
+            stack.append((part, True))
+            stack.extend((child, False) for _, child in children)
+            continue
+        matrix = np.ascontiguousarray(part._matrix, dtype=float)
+        digest = blake2b(matrix.tobytes(), digest_size=16)
+        meta = f"{part.__class__.__name__}\0{part.name!r}\0{part.layer!r}\0"
+        digest.update(meta.encode())
+        if part._body is not None:
+            body = np.ascontiguousarray(part._body, dtype=float)
+            digest.update(b"body" + body.tobytes())
+        if part.is_pattern:
+            frames = np.ascontiguousarray(part.frames, dtype=float)
+            digest.update(b"frames" + frames.tobytes())
+        digest.update(len(children).to_bytes(8, "little"))
+        size = 0
+        for key, child in children:
+            cdigest, csize = child._digest
+            digest.update(f"{key}\0".encode() + cdigest)
+            size += csize
+        if part.is_pattern:
+            size *= len(part)
+        object.__setattr__(part, "_digest", (digest.digest(), size + 1))
+    return root._digest
+
+
+def _flat_frames(part):
+    paths, parents, matrices, parts = flatten(part)
+    return (
+        paths,
+        parents,
+        matrices,
+        [pp.name for pp in parts],
+        [pp.layer for pp in parts],
+        [pp.__class__.__name__ for pp in parts],
+    )
+
+
+class FrameCache:
+    """Directory of flattened subtree frames.
+
+    Parameters
+    ----------
+    directory : str
+        Created if it does not exist.
+    maxsize : int, optional
+        Maximum size of the directory in bytes.
+    min_size : int, optional
+        Minimum number of frames of the cached subtrees, smaller ones are
+        cheaper to flatten than to load.
+    levels : int, optional
+        Number of levels below the root at which subtrees are cached
+        separately.
+    """
+
+    suffix = ".npz"
+
+    def __init__(self, directory, maxsize=2**30, min_size=1000, levels=4):
+        self.directory = os.path.expanduser(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.maxsize = maxsize
+        self.min_size = min_size
+        self.levels = levels
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def _file(self, digest):
+        return os.path.join(self.directory, digest.hex() + self.suffix)
+
+    def _entries(self):
+        """Return (mtime, size, path) of the cache files"""
+        out = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                out.append((st.st_mtime, st.st_size, entry.path))
+        return out
+
+    @property
+    def size(self):
+        """Total size of the cache files in bytes"""
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        return self._size
+
+    def load(self, digest):
+        """Return the frames stored under digest or None"""
+        filename = self._file(digest)
+        try:
+            with np.load(filename) as data:
+                parents = data["parents"]
+                matrices = data["matrices"]
+                meta = json.loads(data["meta"].tobytes())
+            os.utime(filename)
+        except (OSError, KeyError, ValueError):
+            return None
+        return (
+            meta["paths"],
+            parents,
+            matrices,
+            meta["names"],
+            meta["layers"],
+            meta["classes"],
+        )
+
+    def store(self, digest, frames):
+        """Write frames under digest, skipped if the names or layers are not
+        JSON serializable"""
+        paths, parents, matrices, names, layers, classes = frames
+        try:
+            meta = json.dumps(
+                {
+                    "paths": list(paths),
+                    "names": list(names),
+                    "layers": list(layers),
+                    "classes": list(classes),
+                }
+            )
+        except TypeError:
+            return
+        filename = self._file(digest)
+        size = self.size
+        if os.path.exists(filename):
+            size -= os.path.getsize(filename)
+        tmp = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                parents=np.asarray(parents, dtype=np.int64),
+                matrices=np.asarray(matrices, dtype=float),
+                meta=np.frombuffer(meta.encode(), dtype=np.uint8),
+            )
+        os.replace(tmp, filename)
+        self._size = size + os.path.getsize(filename)
+        if self._size > self.maxsize:
+            self.evict()
+
+    def evict(self, maxsize=None):
+        """Remove the least recently used files down to maxsize bytes"""
+        if maxsize is None:
+            maxsize = self.maxsize
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= maxsize:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._size = total
+
+    def clear(self):
+        self.evict(0)
+        self.hits = 0
+        self.misses = 0
+
+    def _subtree(self, part, level):
+        """Frames of part and its subparts, relative to the parent, the
+        digests are computed by `tree_digest`"""
+        digest, size = part._digest
+        large = size >= self.min_size
+        if large:
+            frames = self.load(digest)
+            if frames is not None:
+                self.hits += 1
+                return frames
+            self.misses += 1
+        if not large or part.is_pattern or level >= self.levels:
+            frames = _flat_frames(part)
+        else:
+            paths, parents, matrices = [""], [np.array([-1])], [part.matrix]
+            names, layers = [part.name], [part.layer]
+            classes = [part.__class__.__name__]
+            body = part.body_matrix
+            offset = 1
+            for key, sub in part.parts.items():
+                spaths, sparents, smatrices, snames, slayers, sclasses = (
+                    self._subtree(sub, level + 1)
+                )
+                paths.extend(f"{key}/{pp}" if pp else key for pp in spaths)
+                sparents = np.asarray(sparents)
+                parents.append(np.where(sparents < 0, 0, sparents + offset))
+                matrices.append(body @ smatrices)
+                names.extend(snames)
+                layers.extend(slayers)
+                classes.extend(sclasses)
+                offset += len(spaths)
+            frames = (
+                paths,
+                np.concatenate(parents),
+                np.concatenate([mm.reshape(-1, 4, 4) for mm in matrices]),
+                names,
+                layers,
+                classes,
+            )
+        if large:
+            self.store(digest, frames)
+        return frames
+
+    def frames(self, root, matrix=None):
+        """Flatten root as `snapshot.flatten`, loading the unchanged
+        subtrees from the cache.
+
+        Returns paths, parent indices, world matrices (N,4,4), names,
+        layers and class names.
+        """
+        tree_digest(root)
+        paths, parents, matrices, names, layers, classes = self._subtree(
+            root, 0
+        )
+        if matrix is not None:
+            matrices = np.asarray(matrix) @ matrices
+        return paths, parents, matrices, names, layers, classes
+
+    def snapshot(self, root, version=0):
+        """Return a `Snapshot` of root"""
+        return Snapshot.from_frames(*self.frames(root), version=version)
@@ -1,9 +1,8 @@
 import re
 
-
-import matplotlib.pyplot as plt
 import numpy as np
 
+from .batch import collect, style_key
 from .point import Point
 
 
@@ -66,6 +65,113 @@ def apply_style(primitive, style):
     return result
 
 
+def resolve_style(canvasstyle, primitive, *styles):
+    """Merge canvas style and styles by increasing priority, then resolve
+    the selectors for primitive."""
+    localstyle = canvasstyle.copy()
+    for st in styles:
+        if st is not None:
+            localstyle.update(st)
+    return apply_style(primitive, localstyle)
+
+
+class LayerFilter:
+    """Visibility of layers, cached by (layer, style version).
+
+    A layer is hidden if it is in `hidden` or if the last of the styles
+    with a ".layer" selector sets "visible" to False. Parts of hidden
+    layers are pruned with their subparts before generating primitives.
+    The walks record in `nesting` the layers in which each layer was
+    found, so that the primitives drawn in a layer can be hidden with the
+    layers enclosing it.
+    """
+
+    def __init__(self):
+        self.hidden = set()
+        self.version = 0
+        self.cache = {}
+        self.nesting = {}  # layer -> enclosing layers, None at the top
+
+    def hide(self, *layers):
+        self.hidden.update(layers)
+        self.version += 1
+
+    def show(self, *layers):
+        self.hidden.difference_update(layers)
+        self.version += 1
+
+    def is_visible(self, layer, *styles):
+        if layer in self.hidden:
+            return False
+        visible = True
+        for style in styles:
+            if style is None:
+                continue
+            selector = style.get("." + layer)
+            if isinstance(selector, dict):
+                visible = selector.get("visible", visible)
+        return visible
+
+    def drawn_visibility(self, layer, *styles, _seen=frozenset()):
+        """Visibility of the primitives of layer drawn by the recorded
+        walks: True or False, or None if they were found both in visible
+        and in hidden enclosing layers"""
+        if layer is None:
+            return True
+        if not self.is_visible(layer, *styles):
+            return False
+        seen = _seen | {layer}
+        states = {
+            self.drawn_visibility(outer, *styles, _seen=seen)
+            for outer in self.nesting.get(layer, (None,))
+            if outer not in seen
+        }
+        if len(states) == 0:
+            return True
+        return states.pop() if len(states) == 1 else None
+
+    @staticmethod
+    def _selectors(styles):
+        """Layer selectors of styles, their changes change the visibility"""
+        return [
+            (key, value)
+            for style in styles
+            if style is not None
+            for key, value in style.items()
+            if isinstance(value, dict) and key[:1] == "."
+        ]
+
+    def predicate(self, *styles):
+        """Return `visible(part, layer)` for `Point.iter_primitives`.
+
+        Layer selectors modified in place are detected by their
+        representation.
+        """
+        selectors = self._selectors(styles)
+        version = (self.version, repr(selectors) if selectors else None)
+        cache = self.cache.get(version)
+        if cache is None:
+            if len(self.cache) > 64:
+                self.cache.clear()
+            cache = self.cache[version] = {}
+
+        def visible(part, layer):
+            if layer is None:
+                return True
+            result = cache.get(layer)
+            if result is None:
+                result = cache[layer] = self.is_visible(layer, *styles)
+            return result
+
+        visible.nesting = self.nesting
+        return visible
+
+
+def world_coordinates(vertices, matrix):
+    """Transform (N,3) local vertices with a 4x4 matrix"""
+    return vertices @ matrix[:3, :3].T + matrix[:3, 3]
+
+
 class OrthoProjection:
     def __init__(self, left, right, bottom, top, near, far):
         """
@@ -171,7 +277,17 @@ class Projection:
         return f"Projection(origin={self.origin}, axes={self.axes!r}, scaling={self.scaling}, angles={self.angles})"
 
 
-class Canvas2DMPL:
+class Canvas2DBase:
+    """Parts, styles and layers of the 2D matplotlib canvases.
+
+    Parameters
+    ----------
+    axes, scaling, origin : optional
+        Specifications of the `Projection`.
+    style : dict, optional
+        Canvas style, default is `defaultstyle`.
+    """
+
     style_keywords = {
         "antialiased",
         "color",
@@ -195,45 +311,106 @@ class Canvas2DMPL:
         "zorder",
     }
 
+    # keywords of text batches, see `labels.LabelCollection`
+    text_keywords = {
+        "alpha",
+        "autoplace",
+        "color",
+        "fontfamily",
+        "fontsize",
+        "visible",
+        "zorder",
+    }
+
     defaultstyle = {
         "Point": {"marker": "o", "color": "k", "markersize": 5},
         "Line": {"color": "k"},
         "PolyLine": {"color": "k"},
+        "Rectangle": {"color": "k"},
+        "Box": {"color": "k"},
+        "Cylinder": {"color": "k"},
         "Text": {"color": "k", "fontsize": 10},
     }
 
-    def __init__(
-        self,
-        axes="xy",
-        scaling=1,
-        origin=(0, 0, 0),
-        xlabel="$x$ [m]",
-        ylabel="$y$ [m]",
-        title="",
-        style=None,
-    ):
+    def __init__(self, axes="xy", scaling=1, origin=(0, 0, 0), style=None):
         self.projection = Projection(origin=origin, axes=axes, scaling=scaling)
         self.origin = origin
         self.parts = {}  # stores parts and style
-        self.artists = {}  # stores artists and reference to part
+        self.layers = LayerFilter()
         if style is None:
-            self.style = self.__class__.defaultstyle
-        self.initialize(xlabel, ylabel, title)
+            style = self.__class__.defaultstyle
+        self.style = style
 
     def project(self, point):
         return self.projection(point)
 
-    def mpl_style_from_dict(self, style):
+    def mpl_style_from_dict(self, style, keywords=None):
+        if keywords is None:
+            keywords = self.__class__.style_keywords
         mpl_style = {}
         for key in style:
-            if key in self.__class__.style_keywords:
+            if key in keywords:
                 mpl_style[key] = style[key]
         return mpl_style
 
+    def style_resolver(self, style=None):
+        """Return a function giving the matplotlib style of a primitive, or
+        None if it is not visible"""
+
+        def resolve(prim, primstyle):
+            localstyle = resolve_style(
+                self.style, prim, style, prim.style, primstyle
+            )
+            if localstyle.get("visible", True):
+                if prim.primitive_kind == "texts":
+                    return self.mpl_style_from_dict(
+                        localstyle, self.text_keywords
+                    )
+                return self.mpl_style_from_dict(localstyle)
+
+        return resolve
+
+    def add(self, *parts, style=None):
+        for part in parts:
+            self.parts[part] = style
+        return self
+
+    def remove(self, part):
+        del self.parts[part]
+
+    def hide_layer(self, *layers):
+        """Hide layers, the parts are pruned from the next draw"""
+        self.layers.hide(*layers)
+        return self
+
+    def show_layer(self, *layers):
+        self.layers.show(*layers)
+        return self
+
+
+class Canvas2DMPL(Canvas2DBase):
+    def __init__(
+        self,
+        axes="xy",
+        scaling=1,
+        origin=(0, 0, 0),
+        xlabel="$x$ [m]",
+        ylabel="$y$ [m]",
+        title="",
+        style=None,
+    ):
+        super().__init__(axes, scaling, origin, style)
+        self.artists = {}  # stores artists and reference to part
+        self.layer_artists = {}  # stores artists by layer
+        self.drawstyle = None  # style given to the last draw
+        self.initialize(xlabel, ylabel, title)
+
     def initialize(self, xlabel, ylabel, title):
         self.xlabel = xlabel
         self.ylabel = ylabel
         self.title = title
+        import matplotlib.pyplot as plt
+
         self.figure = plt.figure(hex(id(self)))
         self.ax = self.figure.add_subplot(111)
         self.ax.set_aspect("equal")
@@ -248,12 +425,8 @@ class Canvas2DMPL:
         for cb in self.callbacks:
             self.figure.canvas.mpl_disconnect(cb)
 
-    def add(self, *parts, style=None):
-        for part in parts:
-            self.parts[part] = style
-
     def remove(self, part):
-        del self.parts[part]
+        super().remove(part)
         for art in self.artists[part]:
             art.remove()
         del self.artists[part]
@@ -271,19 +444,18 @@ class Canvas2DMPL:
         - style given when canvas was initialized
         """
         self.clear()
+        self.drawstyle = style
+        resolve = self.style_resolver(style)
         for part, partstyle in self.parts.items():
-            for prim, primstyle in part.get_primitives(partstyle):
-                localstyle = self.style.copy()
-                for st in style, prim.style, primstyle:
-                    if st is not None:
-                        localstyle.update(st)
-                localstyle = apply_style(prim, localstyle)  # resolve selectors
-                if localstyle.get("visible", True):
-                    fname = "draw_" + prim.__class__.__name__.lower()
-                    draw_func = getattr(self, fname)
-                    artists = draw_func(prim, localstyle)
-                    for art in artists:
-                        self.artists[art] = part
+            visible = self.layers.predicate(self.style, style, partstyle)
+            batches = collect({part: partstyle}, resolve, visible=visible)
+            for batch in batches.values():
+                draw_func = getattr(self, "draw_" + batch.kind)
+                artists = draw_func(batch)
+                for art in artists:
+                    self.artists[art] = part
+                layer = self.layer_artists.setdefault(batch.layer, [])
+                layer.extend(artists)
         self.annotation = self.ax.text(
             0, 0, "", bbox=dict(boxstyle="round", fc="w")
         )
@@ -295,27 +467,29 @@ class Canvas2DMPL:
         self.figure.canvas.draw_idle()
         return self
 
-    def draw_point(self, point, style):
-        x, y = self.project(point.location)
-        style = self.mpl_style_from_dict(style)
-        print(point.location, x,y,style)
-        (art,) = self.ax.plot([x], [y], picker=True, pickradius=3, **style)
-        return [art]
-
-    def draw_line(self, line, style):
-        x = [line.a.location[0], line.b.location[0]]
-        y = [line.a.location[1], line.b.location[1]]
-        style = self.mpl_style_from_dict(style)
+    def draw_points(self, batch):
+        x, y = self.project(batch.locations)
+        style = dict(batch.style, linestyle="none")
         (art,) = self.ax.plot(x, y, picker=True, pickradius=3, **style)
         return [art]
 
-    def draw_polyline(self, polyline, style):
-        x = [p.location[0] for p in polyline.points]
-        y = [p.location[1] for p in polyline.points]
-        style = self.mpl_style_from_dict(style)
-        (art,) = self.ax.plot(x, y, picker=True, pickradius=3, **style)
+    def draw_lines(self, batch):
+        x, y = self.project(batch.separated())
+        (art,) = self.ax.plot(x, y, picker=True, pickradius=3, **batch.style)
         return [art]
 
+    draw_polylines = draw_lines
+    draw_shapes = draw_lines
+
+    def draw_texts(self, batch):
+        from .labels import add_labels
+
+        anchors = self.project(batch.anchors).T
+        labels = add_labels(
+            self.ax, anchors, batch.texts, picker=True, **batch.style
+        )
+        return [labels]
+
     def on_motion_notify(self, event):
         if event.inaxes == self.ax:
             for art in self.artists:
@@ -341,12 +515,125 @@ class Canvas2DMPL:
             bbox=dict(boxstyle="round", fc="w"),
         )
 
+    def hide_layer(self, *layers):
+        """Hide layers, keeping the artists already drawn.
+
+        The artists of the layers drawn inside the hidden layers are hidden
+        too, the parts are pruned from the next `draw`.
+        """
+        super().hide_layer(*layers)
+        return self._update_layers()
+
+    def show_layer(self, *layers):
+        """Show layers, redraw if they were pruned by the last `draw`"""
+        super().show_layer(*layers)
+        if any(layer not in self.layer_artists for layer in layers):
+            return self.draw()
+        return self._update_layers()
+
+    def _update_layers(self):
+        """Set the visibility of the artists of each layer from the layer
+        filter, redraw if some artists mix visible and hidden parts"""
+        for layer, artists in self.layer_artists.items():
+            for art in artists:
+                partstyle = self.parts[self.artists[art]]
+                styles = (self.style, self.drawstyle, partstyle)
+                visible = self.layers.drawn_visibility(layer, *styles)
+                if visible is None:
+                    return self.draw()
+                art.set_visible(visible)
+        self.figure.canvas.draw_idle()
+        return self
+
     def clear(self):
         self.ax.clear()
         self.artists.clear()
+        self.layer_artists.clear()
+        self.layers.nesting.clear()
+
+
+class MeshGroup:
+    """Merged vertex buffer for all primitives sharing a kind and a style.
+
+    `local` holds the vertices in the frame of the part that emitted them,
+    `ranges` maps each part to its contiguous slice of the buffer.
+    """
+
+    def __init__(self, kind, style):
+        self.kind = kind
+        self.style = style
+        self.local = []
+        self.cells = []
+        self.ranges = {}
+        self.npoints = 0
+        self.mesh = None
+
+    def append(self, part, batch):
+        start, _ = self.ranges.get(part, (self.npoints, self.npoints))
+        nv = len(batch.vertices)
+        if self.kind == "lines":
+            # [n0, i0, ..., n1, j0, ...] with one count per polyline
+            counts = np.diff(batch.offsets)
+            cells = np.empty(nv + len(counts), dtype=int)
+            heads = batch.offsets[:-1] + np.arange(len(counts))
+            ids = np.ones(len(cells), dtype=bool)
+            ids[heads] = False
+            cells[heads] = counts
+            cells[ids] = np.arange(self.npoints, self.npoints + nv)
+            self.cells.append(cells)
+        self.local.append(batch.vertices)
+        self.npoints += nv
+        self.ranges[part] = (start, self.npoints)
+
+    def build(self, pv, matrices):
+        local = np.concatenate(self.local) if self.local else np.zeros((0, 3))
+        self.local = local
+        points = np.empty_like(local)
+        for part, (start, stop) in self.ranges.items():
+            points[start:stop] = world_coordinates(
+                local[start:stop], matrices[part]
+            )
+        if self.kind == "lines":
+            self.mesh = pv.PolyData(points, lines=np.concatenate(self.cells))
+        else:
+            self.mesh = pv.PolyData(points)
+        return self.mesh
+
+    def update(self, part, matrix):
+        start, stop = self.ranges[part]
+        self.mesh.points[start:stop] = world_coordinates(
+            self.local[start:stop], matrix
+        )
 
 
 class Canvas3D:
+    style_keywords = {
+        "color",
+        "line_width",
+        "opacity",
+        "point_size",
+        "render_lines_as_tubes",
+        "render_points_as_spheres",
+    }
+
+    defaultstyle = {
+        "Point": {"color": "k", "point_size": 5},
+        "Line": {"color": "k"},
+        "PolyLine": {"color": "k"},
+        "Rectangle": {"color": "k"},
+        "Box": {"color": "k"},
+        "Cylinder": {"color": "k"},
+    }
+
+    # mesh kind of the primitive batches
+    kinds = {
+        "points": "points",
+        "lines": "lines",
+        "polylines": "lines",
+        "shapes": "lines",
+        "texts": "points",
+    }
+
     def __init__(
         self,
         scaling=1,
@@ -355,8 +642,148 @@ class Canvas3D:
         ylabel="y [m]",
         zlabel="z [m]",
         title="",
+        style=None,
+        backend="pyvista",
     ):
-        self.projection = Point().scale(scaling).translate(origin)
+        matrix = np.diag([scaling, scaling, scaling, 1.0])
+        matrix[:3, 3] = -scaling * np.asarray(origin, dtype=float)
+        self.projection = Point(matrix)
+        self.backend = backend
+        self.parts = {}  # stores parts and style
+        self.groups = {}  # stores merged meshes by kind, style and layer
+        self.artists = {}  # stores actors by group
+        self.layers = LayerFilter()
+        self.drawstyle = None  # style given to the last draw
+        if style is None:
+            style = self.__class__.defaultstyle
+        self.style = style
         self.initialize(xlabel, ylabel, zlabel, title)
-        self.primitives = {}
-        self.artists = {}
+
+    def initialize(self, xlabel, ylabel, zlabel, title):
+        if self.backend != "pyvista":
+            raise ValueError(f"Backend {self.backend!r} not supported")
+        import pyvista
+
+        self.pv = pyvista
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.zlabel = zlabel
+        self.title = title
+        self.plotter = pyvista.Plotter(title=title or None)
+        self.shown = False
+
+    def pv_style_from_dict(self, style):
+        return {
+            key: style[key]
+            for key in style
+            if key in self.__class__.style_keywords
+        }
+
+    def style_resolver(self, style=None):
+        def resolve(prim, primstyle):
+            localstyle = resolve_style(
+                self.style, prim, style, prim.style, primstyle
+            )
+            if localstyle.get("visible", True):
+                return self.pv_style_from_dict(localstyle)
+
+        return resolve
+
+    def part_matrix(self, part):
+        """Return the matrix from the part frame to the view frame"""
+        return self.projection.matrix @ part.matrix
+
+    def add(self, *parts, style=None):
+        for part in parts:
+            self.parts[part] = style
+
+    def remove(self, part):
+        del self.parts[part]
+
+    def draw(self, style=None):
+        """
+        Draw parts merging the primitives with the same style in one mesh.
+
+        Priority of styles is the same as for `Canvas2DMPL.draw`.
+        """
+        self.clear()
+        self.drawstyle = style
+        matrices = {}
+        resolve = self.style_resolver(style)
+        for part, partstyle in self.parts.items():
+            # vertices are stored in the part frame for in-place updates
+            inv = np.linalg.inv(part.matrix)
+            matrices[part] = self.part_matrix(part)
+            visible = self.layers.predicate(self.style, style, partstyle)
+            batches = collect(
+                {part: partstyle}, resolve, matrix=inv, visible=visible
+            )
+            for batch in batches.values():
+                kind = self.kinds[batch.kind]
+                key = (kind, style_key(batch.style), batch.layer)
+                group = self.groups.get(key)
+                if group is None:
+                    group = self.groups[key] = MeshGroup(kind, batch.style)
+                group.append(part, batch)
+        for key, group in self.groups.items():
+            mesh = group.build(self.pv, matrices)
+            self.artists[key] = self.plotter.add_mesh(mesh, **group.style)
+        self.plotter.show_grid(
+            xtitle=self.xlabel, ytitle=self.ylabel, ztitle=self.zlabel
+        )
+        self.show()
+        return self
+
+    def update(self, *parts):
+        """Move the vertices of the parts in place after a transformation"""
+        if len(parts) == 0:
+            parts = self.parts
+        for part in parts:
+            matrix = self.part_matrix(part)
+            for group in self.groups.values():
+                if part in group.ranges:
+                    group.update(part, matrix)
+        self.plotter.render()
+        return self
+
+    def hide_layer(self, *layers):
+        """Hide the actors of layers, see `Canvas2DMPL.hide_layer`"""
+        self.layers.hide(*layers)
+        return self._update_layers()
+
+    def show_layer(self, *layers):
+        self.layers.show(*layers)
+        drawn = {key[2] for key in self.artists}
+        if any(layer not in drawn for layer in layers):
+            return self.draw()
+        return self._update_layers()
+
+    def _update_layers(self):
+        """Set the visibility of the actors from the layer filter, redraw
+        if a merged mesh mixes visible and hidden parts"""
+        for key, actor in self.artists.items():
+            states = {
+                self.layers.drawn_visibility(
+                    key[2], self.style, self.drawstyle, self.parts[part]
+                )
+                for part in self.groups[key].ranges
+            }
+            if len(states) != 1 or None in states:
+                return self.draw()
+            actor.SetVisibility(states.pop())
+        self.plotter.render()
+        return self
+
+    def show(self):
+        if self.shown:
+            self.plotter.render()
+        else:
+            self.plotter.show(interactive_update=True, auto_close=False)
+            self.shown = True
+
+    def clear(self):
+        for actor in self.artists.values():
+            self.plotter.remove_actor(actor)
+        self.artists.clear()
+        self.groups.clear()
+        self.layers.nesting.clear()
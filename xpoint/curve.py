@@ -1,9 +1,194 @@
+"""
+Reference curves made of straight and circular segments.
+
+A `Curve` is built by chaining segments as with `Point.moveby` and
+`Point.arcby`, each segment being expressed in the frame reached at the end
+of the previous one. The frames at many curvilinear positions s are then
+evaluated at once, and `place` attaches instances of a template part at
+those positions:
+
+    curve = Curve().straight(dz=2).arc(angle=-45, dz=1.5, axis="y")
+    quads = curve.place(quad, s=np.linspace(0, 3, 1000), tilts=tilts)
+    quads[42]   # quad placed at instance 42, in the curve frame
+
+The instances form a `FramePattern` storing their frames in one array and
+a reference to the template, which is not copied, so a change of the
+template is seen by all of them.
+"""
+
 import numpy as np
 
+from .pattern import FramePattern
 from .point import Point
+from .rotation import rotvec_to_matrix
+
+
+def _sinc(x):
+    return np.sinc(x / np.pi)
+
+
+def arc_matrices(deltas, angles, axes):
+    """Local transformations (N,4,4) of arcs or straight segments.
+
+    Parameters
+    ----------
+    deltas : array_like (N,3)
+        Chords of the arcs unrolled along their tangent, as the dx, dy, dz
+        of `Point.arcby`.
+    angles : array_like (N,)
+        Bending angles in radians, zero for straight segments.
+    axes : array_like (N,3)
+        Unit bending axes.
+    """
+    deltas = np.asarray(deltas, dtype=float).reshape(-1, 3)
+    angles = np.asarray(angles, dtype=float).reshape(-1)
+    axes = np.asarray(axes, dtype=float).reshape(-1, 3)
+    out = np.zeros((len(deltas), 4, 4))
+    out[:, :3, :3] = rotvec_to_matrix(axes * angles[:, None])
+    out[:, 3, 3] = 1
+    # same displacement as arcby, (R - I) @ (delta x axis) / angle
+    along = (deltas * axes).sum(-1)
+    perp = deltas - along[:, None] * axes
+    c1 = _sinc(angles)
+    c2 = angles / 2 * _sinc(angles / 2) ** 2
+    straight = angles == 0
+    disp = c1[:, None] * perp + c2[:, None] * np.cross(axes, perp)
+    out[:, :3, 3] = np.where(straight[:, None], deltas, disp)
+    return out
 
 
 class Curve(Point):
-    def __init__(self, segments=[], *args, **kwargs):
+    """Curve starting at the point frame.
+
+    Parameters
+    ----------
+    segments : list of (delta, angle, axis), optional
+        Chord (3,), bending angle in radians and unit axis (3,) of each
+        segment in the frame of its start.
+    *args, **kwargs
+        Passed to `Point`.
+    """
+
+    def __init__(self, segments=(), *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.segments = segments
+        self.segments = []
+        for delta, angle, axis in segments:
+            self._add_segment(delta, angle, axis)
+
+    def _add_segment(self, delta, angle, axis):
+        delta = np.asarray(delta, dtype=float)
+        axis = np.asarray(axis, dtype=float)
+        axis = axis / np.linalg.norm(axis)
+        self.segments.append((delta, float(angle), axis))
+        self.__dict__.pop("_cache", None)
+        return self
+
+    def straight(self, dx=0, dy=0, dz=0):
+        """Append a straight segment of chord (dx, dy, dz)"""
+        return self._add_segment((dx, dy, dz), 0.0, (0, 0, 1))
+
+    def arc(self, angle, dx=0, dy=0, dz=0, axis="z", degrees=True):
+        """Append an arc with the arguments of `Point.arcby`"""
+        if degrees:
+            angle = np.deg2rad(angle)
+        if isinstance(axis, str):
+            axis = np.eye(3)["xyz".index(axis)]
+        return self._add_segment((dx, dy, dz), angle, axis)
+
+    def _tables(self):
+        cache = self.__dict__.get("_cache")
+        if cache is None:
+            nseg = len(self.segments)
+            deltas = np.array([seg[0] for seg in self.segments]).reshape(-1, 3)
+            angles = np.array([seg[1] for seg in self.segments])
+            axes = np.array([seg[2] for seg in self.segments]).reshape(-1, 3)
+            lengths = np.linalg.norm(deltas, axis=1)
+            edges = np.r_[0, np.cumsum(lengths)]
+            steps = arc_matrices(deltas, angles, axes)
+            starts = np.zeros((nseg + 1, 4, 4))
+            starts[0] = np.eye(4)
+            for ii in range(nseg):
+                starts[ii + 1] = starts[ii] @ steps[ii]
+            cache = deltas, angles, axes, lengths, edges, starts
+            self._cache = cache
+        return cache
+
+    @property
+    def length(self):
+        return self._tables()[4][-1]
+
+    def frames(self, s):
+        """Matrices (N,4,4) at the curvilinear positions s in the frame of
+        the parts, the positions beyond the ends are extrapolated along
+        the first and last segments"""
+        deltas, angles, axes, lengths, edges, starts = self._tables()
+        s = np.asarray(s, dtype=float).reshape(-1)
+        if len(self.segments) == 0:
+            raise ValueError("Curve has no segments")
+        idx = np.searchsorted(edges, s, side="right") - 1
+        idx = np.clip(idx, 0, len(self.segments) - 1)
+        frac = (s - edges[idx]) / np.where(lengths == 0, 1, lengths)[idx]
+        local = arc_matrices(
+            deltas[idx] * frac[:, None], angles[idx] * frac, axes[idx]
+        )
+        return starts[idx] @ local
+
+    def tangents(self, s):
+        """Unit tangents (N,3) in the frame of the segment starts, which is
+        also the local direction of the frames"""
+        deltas, _, _, lengths, edges, _ = self._tables()
+        s = np.asarray(s, dtype=float).reshape(-1)
+        idx = np.searchsorted(edges, s, side="right") - 1
+        idx = np.clip(idx, 0, len(self.segments) - 1)
+        return deltas[idx] / np.where(lengths == 0, 1, lengths)[idx, None]
+
+    def place(self, template, s, offsets=None, tilts=None, name=None,
+              degrees=True):
+        """Attach instances of template at the positions s.
+
+        Parameters
+        ----------
+        template : Point
+            Part placed at each position, it is referenced, not copied.
+        s : array_like (N,)
+            Curvilinear positions.
+        offsets : array_like (N,3) or (3,), optional
+            Displacements in the frame of the curve at s.
+        tilts : array_like (N,) or float, optional
+            Rotations about the tangent, applied after the offsets.
+        name : str, optional
+            Name of the pattern in the parts of the curve, default is the
+            template name followed by the next free index.
+        degrees : bool
+            Unit of the tilts.
+
+        Returns
+        -------
+        FramePattern
+            The instances, added to the parts of the curve.
+        """
+        matrices = self.frames(s)
+        nframes = len(matrices)
+        if offsets is not None:
+            offsets = np.broadcast_to(np.asarray(offsets, float), (nframes, 3))
+            matrices[:, :3, 3] += np.einsum(
+                "nij,nj->ni", matrices[:, :3, :3], offsets
+            )
+        if tilts is not None:
+            tilts = np.broadcast_to(np.asarray(tilts, float), (nframes,))
+            if degrees:
+                tilts = np.deg2rad(tilts)
+            rot = rotvec_to_matrix(self.tangents(s) * tilts[:, None])
+            matrices[:, :3, :3] = matrices[:, :3, :3] @ rot
+        if name is None:
+            key = template.name if template.name else "template"
+            used = [
+                int(part[len(key):]) for part in self.parts
+                if part.startswith(key) and part[len(key):].isdigit()
+            ]
+            name = f"{key}{max(used, default=-1) + 1}"
+        elif name in self.parts:
+            raise ValueError(f"Curve has already a part named {name!r}")
+        pattern = FramePattern(template, matrices, name=name)
+        self.add_part(name, pattern)
+        return pattern
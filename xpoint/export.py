@@ -0,0 +1,149 @@
+"""
+Headless export of Point hierarchies to SVG, PNG, PDF files.
+
+The drawing does not use pyplot nor GUI events: primitives are projected in
+batches and merged in one matplotlib artist per style, then the figure is
+written with the non interactive backend selected by the file extension.
+The functions can run in worker processes to render drawing sets in
+parallel.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.figure import Figure
+
+from .batch import collect, style_key
+from .canvas import Canvas2DBase
+from .labels import add_labels
+
+
+class Canvas2DExport(Canvas2DBase):
+    """Non interactive 2D canvas writing drawings to files.
+
+    Parameters
+    ----------
+    axes, scaling, origin : optional
+        Projection specifications as in `Canvas2DMPL`.
+    xlabel, ylabel, title : str, optional
+        Labels of the drawing.
+    style : dict, optional
+        Canvas style, default is `Canvas2DBase.defaultstyle`.
+    figsize : tuple, optional
+        Size of the figure in inches.
+    dpi : float, optional
+        Resolution for raster formats.
+    """
+
+    def __init__(
+        self,
+        axes="xy",
+        scaling=1,
+        origin=(0, 0, 0),
+        xlabel="$x$ [m]",
+        ylabel="$y$ [m]",
+        title="",
+        style=None,
+        figsize=None,
+        dpi=100,
+    ):
+        super().__init__(axes, scaling, origin, style)
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.title = title
+        self.figsize = figsize
+        self.dpi = dpi
+        self.figure = None
+
+    def collect(self, style=None):
+        """
+        Return projected coordinates grouped by kind and style.
+
+        Points are returned as a (2,N) array, lines and polylines as a (2,N)
+        array with NaN separators between them, texts as a tuple of the
+        (2,N) anchors and the list of strings.
+        """
+        resolve = self.style_resolver(style)
+        batches = []
+        for part, partstyle in self.parts.items():
+            visible = self.layers.predicate(self.style, style, partstyle)
+            batches.extend(
+                collect({part: partstyle}, resolve, visible=visible).values()
+            )
+        groups = {}
+        texts = {}
+        for batch in batches:
+            if batch.kind == "texts":
+                key = ("texts", style_key(batch.style))
+                texts.setdefault(key, []).append(batch)
+                continue
+            if batch.kind in ("lines", "polylines", "shapes"):
+                kind = "lines"
+                coords = batch.separated()
+            else:
+                kind = "points"
+                coords = batch.matrices[:, :3, 3]
+            key = (kind, style_key(batch.style))
+            groups.setdefault(key, []).append(coords)
+        out = {}
+        for key, coords in groups.items():
+            out[key] = self.projection(np.concatenate(coords))
+        for key, batches in texts.items():
+            anchors = np.concatenate([batch.anchors for batch in batches])
+            labels = [text for batch in batches for text in batch.texts]
+            out[key] = (self.projection(anchors), labels)
+        return out
+
+    def draw(self, style=None):
+        """Draw parts on a new figure, priority of styles as in
+        `Canvas2DMPL.draw`."""
+        self.figure = Figure(figsize=self.figsize, dpi=self.dpi)
+        ax = self.figure.add_subplot(111)
+        ax.set_aspect("equal")
+        for (kind, mplstyle), coords in self.collect(style).items():
+            mplstyle = dict(mplstyle)
+            if kind == "texts":
+                anchors, labels = coords
+                add_labels(ax, anchors.T, labels, **mplstyle)
+                continue
+            x, y = coords
+            if kind == "points":
+                mplstyle["linestyle"] = "none"
+            ax.plot(x, y, **mplstyle)
+        ax.set_title(self.title)
+        ax.set_xlabel(self.xlabel)
+        ax.set_ylabel(self.ylabel)
+        self.ax = ax
+        return self
+
+    def save(self, filename, **kwargs):
+        """Write the drawing, the format is deduced from the extension"""
+        if self.figure is None:
+            self.draw()
+        self.figure.savefig(filename, **kwargs)
+        return filename
+
+
+def export(part, filename, style=None, **kwargs):
+    """Render part to filename (svg, png, pdf, ...) without GUI.
+
+    Keyword arguments are passed to `Canvas2DExport`.
+    """
+    canvas = Canvas2DExport(**kwargs)
+    canvas.add(part, style=style)
+    return canvas.draw().save(filename)
+
+
+def _export_job(job):
+    part, filename, kwargs = job
+    return export(part, filename, **kwargs)
+
+
+def export_many(jobs, max_workers=None):
+    """Render a list of (part, filename, kwargs) in parallel processes.
+
+    Returns the list of written filenames.
+    """
+    jobs = [(part, filename, kwargs or {}) for part, filename, kwargs in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_export_job, jobs))
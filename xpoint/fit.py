@@ -0,0 +1,184 @@
+"""
+Batched best-fit of frames from fiducial measurements.
+
+The rigid (Kabsch) or similarity (Umeyama) transformations mapping model
+fiducial coordinates to measured ones are solved at once for a stack of K
+frames with M fiducials each, with optional weights and iterative outlier
+rejection. Missing measurements can be given as NaN.
+"""
+
+import numpy as np
+
+from .point import Point
+
+
+class FrameFit:
+    """Result of `fit_frames`.
+
+    Attributes
+    ----------
+    matrices : ndarray, (K,4,4)
+        Transformations from model to measured coordinates.
+    scale : ndarray, (K,)
+        Scale factors, 1 for rigid fits.
+    residuals : ndarray, (K,M,3)
+        Measured minus fitted fiducial coordinates.
+    inliers : ndarray of bool, (K,M)
+        Fiducials used in the final fit.
+    """
+
+    def __init__(self, matrices, scale, residuals, inliers):
+        self.matrices = matrices
+        self.scale = scale
+        self.residuals = residuals
+        self.inliers = inliers
+
+    def __len__(self):
+        return len(self.matrices)
+
+    @property
+    def distances(self):
+        """Residual distances (K,M)"""
+        return np.linalg.norm(self.residuals, axis=-1)
+
+    @property
+    def rms(self):
+        """RMS residual distance of the inliers (K,)"""
+        dist2 = np.where(self.inliers, self.distances**2, 0)
+        count = np.maximum(self.inliers.sum(axis=-1), 1)
+        return np.sqrt(dist2.sum(axis=-1) / count)
+
+    @property
+    def max(self):
+        """Maximum residual distance of the inliers (K,)"""
+        return np.where(self.inliers, self.distances, 0).max(axis=-1)
+
+    def point(self, idx, **kwargs):
+        return Point(self.matrices[idx].copy(), **kwargs)
+
+    def points(self, names=None):
+        """Return the fitted frames as a list of `Point`"""
+        if names is None:
+            names = [None] * len(self)
+        return [self.point(ii, name=nn) for ii, nn in enumerate(names)]
+
+    def __repr__(self):
+        return (
+            f"FrameFit({len(self)} frames, "
+            f"max rms={self.rms.max(initial=0):.3g})"
+        )
+
+
+def _solve(model, measured, weights, scaling):
+    wsum = weights.sum(axis=-1)[:, None]
+    wn = weights / np.where(wsum > 0, wsum, 1)
+    mu_a = np.einsum("km,kmi->ki", wn, model)
+    mu_b = np.einsum("km,kmi->ki", wn, measured)
+    aa = model - mu_a[:, None]
+    bb = measured - mu_b[:, None]
+    cov = np.einsum("km,kmi,kmj->kij", wn, bb, aa)
+    uu, ss, vt = np.linalg.svd(cov)
+    sign = np.sign(np.linalg.det(uu) * np.linalg.det(vt))
+    sign[sign == 0] = 1
+    dd = np.ones_like(ss)
+    dd[:, 2] = sign
+    rot = np.einsum("kij,kj,kjl->kil", uu, dd, vt)
+    if scaling:
+        var_a = np.einsum("km,kmi,kmi->k", wn, aa, aa)
+        scale = (ss * dd).sum(axis=-1) / np.where(var_a > 0, var_a, 1)
+    else:
+        scale = np.ones(len(model))
+    matrices = np.zeros((len(model), 4, 4))
+    matrices[:, :3, :3] = scale[:, None, None] * rot
+    rot = matrices[:, :3, :3]
+    matrices[:, :3, 3] = mu_b - np.einsum("kij,kj->ki", rot, mu_a)
+    matrices[:, 3, 3] = 1
+    return matrices, scale
+
+
+def _leave_one_out(model, measured, weights, inliers, scaling):
+    """Largest residual (K,M) of the other inliers of each frame when each
+    inlier fiducial is left out of the fit, inf for the outliers"""
+    out = np.full(inliers.shape, np.inf)
+    for mm in range(inliers.shape[1]):
+        others = inliers.copy()
+        others[:, mm] = False
+        matrices, _ = _solve(model, measured, weights * others, scaling)
+        fitted = np.einsum("kij,kmj->kmi", matrices[:, :3, :3], model)
+        fitted += matrices[:, None, :3, 3]
+        dist = np.linalg.norm(measured - fitted, axis=-1)
+        worst = np.where(others, dist, 0).max(axis=-1)
+        out[:, mm] = np.where(inliers[:, mm], worst, np.inf)
+    return out
+
+
+def fit_frames(
+    model, measured, weights=None, scaling=False, reject=None, max_iter=5
+):
+    """Fit the transformations mapping model to measured fiducials.
+
+    Parameters
+    ----------
+    model : array_like, (K,M,3) or (M,3)
+        Fiducial coordinates in the model frames.
+    measured : array_like, (K,M,3) or (M,3)
+        Measured fiducial coordinates, NaN for missing measurements.
+    weights : array_like, (K,M) or (M,), optional
+        Weights of the fiducials.
+    scaling : bool, optional
+        If True fit a similarity transformation, otherwise a rigid one.
+    reject : float, optional
+        Distance tolerance: while a residual of a frame exceeds reject, the
+        fiducial whose removal gives the best fit of the others is rejected
+        and the frame is fitted again, up to max_iter times. Unlike the
+        rejection of the largest residual, an outlier pulling the fit
+        towards itself does not get good fiducials rejected. At least 3
+        fiducials per frame are kept.
+    max_iter : int, optional
+        Maximum number of rejection iterations.
+
+    Returns
+    -------
+    FrameFit
+    """
+    model = np.asarray(model, dtype=float)
+    measured = np.asarray(measured, dtype=float)
+    if measured.ndim == 2:
+        measured = measured[None]
+    if model.ndim == 2:
+        model = model[None]
+    shape = np.broadcast_shapes(model.shape, measured.shape)
+    model = np.broadcast_to(model, shape)
+    measured = np.array(np.broadcast_to(measured, shape))
+    valid = np.isfinite(measured).all(axis=-1)
+    measured[~valid] = 0
+    if weights is None:
+        weights = np.ones(valid.shape)
+    weights = np.where(valid, np.broadcast_to(weights, valid.shape), 0.0)
+    inliers = valid & (weights > 0)
+    niter = 0
+    while True:
+        matrices, scale = _solve(model, measured, weights * inliers, scaling)
+        fitted = np.einsum("kij,kmj->kmi", matrices[:, :3, :3], model)
+        residuals = measured - fitted - matrices[:, None, :3, 3]
+        result = FrameFit(matrices, scale, residuals, inliers)
+        if reject is None or niter == max_iter:
+            break
+        dist = np.where(inliers, result.distances, 0)
+        bad = dist.max(axis=-1) > reject
+        bad &= inliers.sum(axis=-1) > 3
+        if not bad.any():
+            break
+        frames = np.flatnonzero(bad)
+        loo = _leave_one_out(
+            model[frames],
+            measured[frames],
+            weights[frames],
+            inliers[frames],
+            scaling,
+        )
+        inliers = inliers.copy()
+        inliers[frames, loo.argmin(axis=-1)] = False
+        niter += 1
+    residuals[~valid] = np.nan
+    return result
@@ -0,0 +1,147 @@
+"""
+Immutable and hashable frames.
+
+A `Frame` is a read-only 4x4 transformation. Equality and hashing use the
+matrix rounded to the nearest multiple of `rotation_tolerance` and
+`location_tolerance`: two frames are equal when their matrices fall in the
+same cells of this grid, so frames can be used as dictionary keys and
+deduplicated in sets. This is not a comparison within a tolerance, two
+frames closer than the tolerance but on both sides of a cell boundary are
+different, use `Frame.isclose` for that. `Frame.intern` returns a
+canonical instance for each quantized matrix, so repeated placements are
+stored once.
+"""
+
+import weakref
+
+import numpy as np
+
+from .point import Point
+
+rotation_tolerance = 1e-9
+location_tolerance = 1e-9
+
+
+def quantize(matrix):
+    """Return the canonical key of a 4x4 matrix as bytes, the indices of
+    the grid cells of its rotation and location"""
+    matrix = np.asarray(matrix, dtype=float)
+    rot = np.rint(matrix[:3, :3] / rotation_tolerance)
+    loc = np.rint(matrix[:3, 3] / location_tolerance)
+    cells = np.concatenate([rot.ravel(), loc])
+    if not np.all(np.abs(cells) < 2**62):
+        raise ValueError("Matrix is not finite or too large to quantize")
+    return cells.astype(np.int64).tobytes()
+
+
+class Frame:
+    """Immutable frame.
+
+    Parameters
+    ----------
+    matrix : array_like or Point
+        A 4x4 transformation matrix or a point.
+    """
+
+    __slots__ = ("_matrix", "_key", "_hash", "__weakref__")
+
+    _interned = weakref.WeakValueDictionary()
+
+    def __init__(self, matrix=None):
+        if matrix is None:
+            matrix = np.eye(4)
+        elif isinstance(matrix, Frame):
+            matrix = matrix._matrix
+        elif isinstance(matrix, Point):
+            matrix = matrix.matrix
+        matrix = np.array(matrix, dtype=float)
+        if matrix.shape != (4, 4):
+            raise ValueError("Frame needs a 4x4 matrix")
+        if not np.all(np.isfinite(matrix)):
+            raise ValueError("Frame needs a finite matrix")
+        matrix.flags.writeable = False
+        object.__setattr__(self, "_matrix", matrix)
+        object.__setattr__(self, "_key", None)
+        object.__setattr__(self, "_hash", None)
+
+    @classmethod
+    def intern(cls, matrix):
+        """Return the canonical frame equal to matrix"""
+        frame = matrix if isinstance(matrix, Frame) else cls(matrix)
+        return cls._interned.setdefault(frame.key, frame)
+
+    @classmethod
+    def interned_count(cls):
+        return len(cls._interned)
+
+    @property
+    def key(self):
+        if self._key is None:
+            object.__setattr__(self, "_key", quantize(self._matrix))
+        return self._key
+
+    @property
+    def matrix(self):
+        return self._matrix
+
+    @property
+    def location(self):
+        return self._matrix[:3, 3]
+
+    @property
+    def rotation_matrix(self):
+        return self._matrix[:3, :3]
+
+    def to_point(self, **kwargs):
+        return Point(self._matrix.copy(), **kwargs)
+
+    def inverse(self):
+        return Frame(np.linalg.inv(self._matrix))
+
+    def __matmul__(self, other):
+        if isinstance(other, (Frame, Point)):
+            return Frame(self._matrix @ other.matrix)
+        return NotImplemented
+
+    def apply(self, coords):
+        """Transform (N,3) coordinates from the frame to the parent frame"""
+        coords = np.asarray(coords, dtype=float)
+        return coords @ self._matrix[:3, :3].T + self._matrix[:3, 3]
+
+    def isclose(self, other, rot_atol=None, loc_atol=None):
+        """Compare with absolute tolerances on the rotation matrix elements
+        and on the location, without quantization"""
+        if rot_atol is None:
+            rot_atol = rotation_tolerance
+        if loc_atol is None:
+            loc_atol = location_tolerance
+        other = other.matrix
+        return np.allclose(
+            self._matrix[:3, :3], other[:3, :3], rtol=0, atol=rot_atol
+        ) and np.allclose(
+            self._matrix[:3, 3], other[:3, 3], rtol=0, atol=loc_atol
+        )
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Frame):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.key))
+        return self._hash
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Frame is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("Frame is immutable")
+
+    def __reduce__(self):
+        return (Frame, (np.array(self._matrix),))
+
+    def __repr__(self):
+        return f"Frame({self.to_point()!r})"
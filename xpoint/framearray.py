@@ -0,0 +1,270 @@
+"""
+Compact storage of large sets of frames.
+
+A `FrameArray` stores only the 3x4 affine block of each frame. In float32
+mode the locations are stored relative to float64 origin offsets, one per
+block of `block_size` consecutive frames, which preserves sub-millimetre
+precision over kilometre-scale coordinates when consecutive frames are
+close to each other. Selections and concatenations keep the stored rows
+and the offsets of their blocks, with an index of the block of each row,
+so they do not lose precision. Full precision `Point`s and 4x4 matrices
+are returned on access.
+"""
+
+import numpy as np
+
+from .point import Point
+from .rotation import (
+    euler_to_matrix,
+    lookat_matrix,
+    matrix_to_euler,
+    matrix_to_quat,
+    matrix_to_rotvec,
+    rotation_atob,
+)
+
+
+class FrameArray:
+    """Array of frames.
+
+    Parameters
+    ----------
+    matrices : array_like, (N,4,4) or (N,3,4)
+        Transformation matrices.
+    dtype : dtype, optional
+        Storage type, np.float64 (default) or np.float32.
+    block_size : int, optional
+        Number of frames sharing an origin offset in float32 mode.
+    names : list of str, optional
+        Names of the frames.
+    """
+
+    def __init__(self, matrices=(), dtype=np.float64, block_size=256,
+                 names=None):
+        matrices = np.asarray(matrices, dtype=np.float64)
+        if matrices.size == 0:
+            matrices = np.zeros((0, 3, 4))
+        self.dtype = np.dtype(dtype)
+        self.block_size = block_size
+        self.names = names
+        self._blocks = None  # block of each row, None for consecutive rows
+        locations = matrices[:, :3, 3]
+        if self.dtype == np.float64:
+            self._offsets = None
+            affine = matrices[:, :3, :4]
+        else:
+            self._offsets = locations[::block_size].copy()
+            affine = matrices[:, :3, :4].copy()
+            affine[:, :, 3] -= self._block_offsets(len(affine))
+        self._affine = np.ascontiguousarray(affine, dtype=self.dtype)
+
+    @classmethod
+    def from_points(cls, points, **kwargs):
+        points = list(points)
+        kwargs.setdefault("names", [p.name for p in points])
+        return cls([p.matrix for p in points], **kwargs)
+
+    @classmethod
+    def from_euler(cls, locations, angles, seq="zxy", degrees=True, **kwargs):
+        """Build frames from (N,3) locations and (N,3) Euler angles"""
+        locations = np.asarray(locations, dtype=np.float64)
+        matrices = np.zeros((len(locations), 3, 4))
+        matrices[:, :, :3] = euler_to_matrix(seq, angles, degrees=degrees)
+        matrices[:, :, 3] = locations
+        return cls(matrices, **kwargs)
+
+    def _block_ids(self, nframes=None):
+        if self._blocks is not None:
+            return self._blocks
+        if nframes is None:
+            nframes = len(self)
+        return np.arange(nframes) // self.block_size
+
+    def _block_offsets(self, nframes):
+        return self._offsets[self._block_ids(nframes)]
+
+    def __len__(self):
+        return len(self._affine)
+
+    @property
+    def nbytes(self):
+        nbytes = self._affine.nbytes
+        if self._offsets is not None:
+            nbytes += self._offsets.nbytes
+        if self._blocks is not None:
+            nbytes += self._blocks.nbytes
+        return nbytes
+
+    @property
+    def locations(self):
+        """Locations in float64 (N,3)"""
+        loc = self._affine[:, :, 3].astype(np.float64)
+        if self._offsets is not None:
+            loc += self._block_offsets(len(self))
+        return loc
+
+    @property
+    def rotation_matrices(self):
+        """Linear part of the frames in float64 (N,3,3)"""
+        return self._affine[:, :, :3].astype(np.float64)
+
+    def euler_angles(self, seq="zxy", degrees=True):
+        """Euler angles (N,3) of the frames, same convention as Point"""
+        return matrix_to_euler(seq, self.rotation_matrices, degrees=degrees)
+
+    @property
+    def quaternions(self):
+        """Quaternions (N,4), scalar last"""
+        return matrix_to_quat(self.rotation_matrices)
+
+    @property
+    def rotvecs(self):
+        """Rotation vectors (N,3) in radians"""
+        return matrix_to_rotvec(self.rotation_matrices)
+
+    @property
+    def matrices(self):
+        """Full 4x4 matrices in float64 (N,4,4)"""
+        out = np.zeros((len(self), 4, 4))
+        out[:, :3, :3] = self._affine[:, :, :3]
+        out[:, :3, 3] = self.locations
+        out[:, 3, 3] = 1
+        return out
+
+    def _new(self, affine, offsets, names, blocks=None):
+        """FrameArray with the same dtype from its storage"""
+        out = FrameArray.__new__(FrameArray)
+        out.dtype = self.dtype
+        out.block_size = self.block_size
+        out.names = names
+        out._offsets = offsets
+        out._blocks = blocks
+        out._affine = np.ascontiguousarray(affine, dtype=self.dtype)
+        return out
+
+    def astype(self, dtype, block_size=None):
+        if block_size is None:
+            block_size = self.block_size
+        return FrameArray(
+            self.matrices, dtype=dtype, block_size=block_size,
+            names=self.names,
+        )
+
+    def point(self, idx, **kwargs):
+        """Return a full precision point"""
+        matrix = np.eye(4)
+        matrix[:3, :3] = self._affine[idx, :, :3]
+        matrix[:3, 3] = self._affine[idx, :, 3]
+        if self._offsets is not None:
+            if self._blocks is None:
+                matrix[:3, 3] += self._offsets[idx // self.block_size]
+            else:
+                matrix[:3, 3] += self._offsets[self._blocks[idx]]
+        if self.names is not None:
+            kwargs.setdefault("name", self.names[idx])
+        return Point(matrix, **kwargs)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            if idx < 0:
+                idx += len(self)
+            return self.point(idx)
+        names = None
+        if self.names is not None:
+            names = list(np.asarray(self.names, dtype=object)[idx])
+        affine = self._affine[idx]
+        if self._offsets is None:
+            return self._new(affine, None, names)
+        # the rows keep their storage and the offsets of their blocks
+        used, blocks = np.unique(self._block_ids()[idx], return_inverse=True)
+        return self._new(
+            affine, self._offsets[used], names, blocks.ravel().astype(np.intp)
+        )
+
+    @classmethod
+    def concatenate(cls, arrays):
+        """Join frame arrays of the same dtype, the rows keep their storage
+        and the offsets of their blocks"""
+        arrays = list(arrays)
+        if len(arrays) == 0:
+            return cls()
+        first = arrays[0]
+        if any(arr.dtype != first.dtype for arr in arrays):
+            raise ValueError("Cannot concatenate arrays of different dtypes")
+        names = None
+        if all(arr.names is not None for arr in arrays):
+            names = [nn for arr in arrays for nn in arr.names]
+        affine = np.concatenate([arr._affine for arr in arrays])
+        if first._offsets is None:
+            return first._new(affine, None, names)
+        blocks, start = [], 0
+        for arr in arrays:
+            blocks.append(arr._block_ids() + start)
+            start += len(arr._offsets)
+        offsets = np.concatenate([arr._offsets for arr in arrays])
+        return first._new(affine, offsets, names, np.concatenate(blocks))
+
+    def __iter__(self):
+        return (self.point(ii) for ii in range(len(self)))
+
+    def to_points(self):
+        return list(self)
+
+    def transform(self, other, chunk_size=65536):
+        """Return the frames transformed by a point or a 4x4 matrix, the
+        rows are transformed chunk_size at a time and the block offsets
+        separately"""
+        if isinstance(other, Point):
+            other = other.matrix
+        other = np.asarray(other, dtype=np.float64)
+        rot, shift = other[:3, :3], other[:3, 3]
+        affine = np.empty_like(self._affine)
+        for start in range(0, len(self), chunk_size):
+            rows = self._affine[start : start + chunk_size]
+            affine[start : start + chunk_size] = rot @ rows.astype(np.float64)
+        if self._offsets is None:
+            affine[:, :, 3] += shift
+            offsets = None
+        else:
+            offsets = self._offsets @ rot.T + shift
+        return self._new(affine, offsets, self.names, self._blocks)
+
+    def _with_rotations(self, rot):
+        scale = np.linalg.norm(self.rotation_matrices, axis=1)
+        affine = self._affine.copy()
+        affine[:, :, :3] = rot * scale[:, None, :]
+        return self._new(affine, self._offsets, self.names, self._blocks)
+
+    def lookat(self, targets, axis="z", up=None, upaxis=None):
+        """Return the frames rotated such that axis points to the targets.
+
+        Targets are (N,3) or (3,) locations, up and upaxis as in
+        `Point.lookat`, up can also be (N,3).
+        """
+        if upaxis is None:
+            upaxis = "z" if axis == "y" else "y"
+        if isinstance(up, str):
+            up = np.eye(3)["xyz".index(up)]
+        directions = np.asarray(targets, dtype=float) - self.locations
+        current = self.rotation_matrices
+        current /= np.linalg.norm(current, axis=1, keepdims=True)
+        rot = lookat_matrix(
+            directions, up, "xyz".index(axis), "xyz".index(upaxis), current
+        )
+        return self._with_rotations(rot)
+
+    def rotate_atob(self, a, b):
+        """Return the frames rotated about their locations by the minimal
+        rotations taking the directions a to b, (N,3) or (3,)"""
+        current = self.rotation_matrices
+        current /= np.linalg.norm(current, axis=1, keepdims=True)
+        return self._with_rotations(rotation_atob(a, b) @ current)
+
+    def apply(self, coords):
+        """Transform (M,3) local coordinates in all frames, return (N,M,3)"""
+        coords = np.asarray(coords, dtype=np.float64)
+        rot = self.rotation_matrices
+        return np.einsum("nij,mj->nmi", rot, coords) + self.locations[:, None]
+
+    def __repr__(self):
+        return f"FrameArray({len(self)} frames, dtype={self.dtype.name})"
@@ -0,0 +1,335 @@
+"""
+Streaming glTF 2.0 export of Point hierarchies.
+
+The hierarchy is walked once with `Point.iter_primitives`. The geometry of
+the lines, polylines and shapes is written once per distinct primitive, in
+its local frame, and each occurrence only adds a transform. Repeated
+meshes are written as one node with the `EXT_mesh_gpu_instancing`
+translations, rotations and scales, or as one node per instance with
+``instancing=False``. The points are merged in POINTS meshes, the texts
+are skipped.
+
+The binary data is streamed to the .bin file, or to a temporary file
+copied into the .glb, and the pending transforms are flushed every
+`chunk_size` instances, so the memory does not depend on the size of the
+model. The instances are grouped by regions of space, each node carries
+the float64 translation of its first instance and the instances are
+stored relative to it in float32, which keeps the precision on large
+machines. The top level nodes are the layers.
+
+    export_gltf(machine, "machine.glb")
+"""
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+from .rotation import matrix_to_quat
+
+FLOAT = 5126
+ARRAY_BUFFER = 34962
+POINTS = 0
+LINE_STRIP = 3
+
+
+def _rgba(color):
+    if color is None:
+        return [0.5, 0.5, 0.5, 1.0]
+    try:
+        from matplotlib.colors import to_rgba
+
+        return [float(cc) for cc in to_rgba(color)]
+    except (ImportError, ValueError):
+        return [0.5, 0.5, 0.5, 1.0]
+
+
+class GltfWriter:
+    """Incremental writer of a .gltf (with a .bin file) or a .glb file.
+
+    Parameters
+    ----------
+    filename : str
+        Output file, the format is chosen by the extension.
+    instancing : bool, optional
+        Use `EXT_mesh_gpu_instancing` for the repeated meshes.
+    chunk_size : int, optional
+        Number of pending instances and points flushed at once.
+    region : float, optional
+        Size of the cubic regions whose instances share a node, so that
+        their float32 translations relative to the node stay precise.
+    """
+
+    def __init__(self, filename, instancing=True, chunk_size=65536,
+                 region=100.0):
+        self.filename = filename
+        self.binary = filename.lower().endswith(".glb")
+        self.instancing = instancing
+        self.chunk_size = chunk_size
+        self.region = region
+        if self.binary:
+            self.bin = tempfile.TemporaryFile()
+            self.bin_uri = None
+        else:
+            binname = os.path.splitext(filename)[0] + ".bin"
+            self.bin = open(binname, "wb")
+            self.bin_uri = os.path.basename(binname)
+        self.offset = 0
+        self.json = {
+            "asset": {"version": "2.0", "generator": "xpoint"},
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": [],
+            "materials": [],
+            "accessors": [],
+            "bufferViews": [],
+            "buffers": [],
+        }
+        self.extensions = set()
+        self.layer_nodes = {}  # layer -> node index
+        self.materials = {}  # color -> material index
+        self.meshes = {}  # geometry key -> mesh index
+        self.by_id = {}  # (id(primitive), color) -> mesh index
+        self.pending = {}  # (mesh, layer) -> list of matrices
+        self.points = {}  # (material, layer) -> list of locations
+        self.npending = 0
+        self.skipped = 0
+
+    # binary data
+
+    def _write(self, array, target=None):
+        """Write a float32 array, return its buffer view"""
+        data = np.ascontiguousarray(array, dtype=np.float32).tobytes()
+        self.bin.write(data)
+        view = {
+            "buffer": 0,
+            "byteOffset": self.offset,
+            "byteLength": len(data),
+        }
+        if target is not None:
+            view["target"] = target
+        self.offset += len(data)
+        self.json["bufferViews"].append(view)
+        return len(self.json["bufferViews"]) - 1
+
+    def _accessor(self, array, kind, target=None, bounds=False):
+        array = np.asarray(array, dtype=np.float32)
+        accessor = {
+            "bufferView": self._write(array, target),
+            "componentType": FLOAT,
+            "count": len(array),
+            "type": kind,
+        }
+        if bounds:
+            accessor["min"] = array.min(axis=0).tolist()
+            accessor["max"] = array.max(axis=0).tolist()
+        self.json["accessors"].append(accessor)
+        return len(self.json["accessors"]) - 1
+
+    # scene objects
+
+    def _node(self, layer, node):
+        parent = self.layer_nodes.get(layer)
+        if parent is None:
+            name = "default" if layer is None else str(layer)
+            self.json["nodes"].append({"name": name, "children": []})
+            parent = self.layer_nodes[layer] = len(self.json["nodes"]) - 1
+            self.json["scenes"][0]["nodes"].append(parent)
+        self.json["nodes"].append(node)
+        index = len(self.json["nodes"]) - 1
+        self.json["nodes"][parent]["children"].append(index)
+        return index
+
+    def _material(self, color):
+        material = self.materials.get(color)
+        if material is None:
+            self.extensions.add("KHR_materials_unlit")
+            self.json["materials"].append(
+                {
+                    "pbrMetallicRoughness": {"baseColorFactor": _rgba(color)},
+                    "extensions": {"KHR_materials_unlit": {}},
+                }
+            )
+            material = self.materials[color] = len(self.materials)
+        return material
+
+    def _mesh(self, prim, color):
+        """Index of the mesh of prim, written on the first occurrence"""
+        mesh = self.by_id.get((id(prim), color))
+        if mesh is not None:
+            return mesh
+        vertices = np.asarray(prim.vertices, dtype=np.float32).reshape(-1, 3)
+        key = (vertices.tobytes(), color)
+        mesh = self.meshes.get(key)
+        if mesh is None:
+            position = self._accessor(
+                vertices, "VEC3", ARRAY_BUFFER, bounds=True
+            )
+            self.json["meshes"].append(
+                {
+                    "name": prim.__class__.__name__,
+                    "primitives": [
+                        {
+                            "attributes": {"POSITION": position},
+                            "mode": LINE_STRIP,
+                            "material": self._material(color),
+                        }
+                    ],
+                }
+            )
+            mesh = self.meshes[key] = len(self.json["meshes"]) - 1
+        self.by_id[(id(prim), color)] = mesh
+        return mesh
+
+    def add(self, part, style=None, matrix=None):
+        """Add the primitives of part"""
+        for prim, pstyle, pmatrix, layer in part.iter_primitives(
+            style, matrix, layers=True
+        ):
+            kind = prim.primitive_kind
+            color = pstyle.get("color")
+            if color is None and prim.style is not None:
+                color = prim.style.get("color")
+            if isinstance(color, list):
+                color = tuple(color)
+            if kind == "texts":
+                self.skipped += 1
+                continue
+            if kind == "points":
+                key = (self._material(color), layer)
+                self.points.setdefault(key, []).append(pmatrix[:3, 3])
+            else:
+                key = (self._mesh(prim, color), layer)
+                self.pending.setdefault(key, []).append(pmatrix)
+            self.npending += 1
+            if self.npending >= self.chunk_size:
+                self.flush()
+        return self
+
+    def _regions(self, locations):
+        """Yield the indices of the locations in each region"""
+        cells = np.floor(locations / self.region).astype(np.int64)
+        _, inverse = np.unique(cells, axis=0, return_inverse=True)
+        order = np.argsort(inverse.ravel(), kind="stable")
+        bounds = np.flatnonzero(np.diff(inverse.ravel()[order])) + 1
+        yield from np.split(order, bounds)
+
+    def flush(self):
+        """Write the pending instances and points"""
+        for (mesh, layer), matrices in self.pending.items():
+            matrices = np.array(matrices)
+            if not self.instancing:
+                self._instances(mesh, layer, matrices)
+                continue
+            for idx in self._regions(matrices[:, :3, 3]):
+                self._instances(mesh, layer, matrices[idx])
+        for (material, layer), locations in self.points.items():
+            locations = np.array(locations)
+            for idx in self._regions(locations):
+                self._points(material, layer, locations[idx])
+        self.pending.clear()
+        self.points.clear()
+        self.npending = 0
+
+    def _instances(self, mesh, layer, matrices):
+        origin = matrices[0, :3, 3].copy()
+        if not self.instancing or len(matrices) == 1:
+            for matrix in matrices:
+                # glTF matrices are column major
+                self._node(
+                    layer, {"mesh": mesh, "matrix": matrix.T.ravel().tolist()}
+                )
+            return
+        self.extensions.add("EXT_mesh_gpu_instancing")
+        rot = matrices[:, :3, :3]
+        scale = np.linalg.norm(rot, axis=1)
+        quat = matrix_to_quat(rot / np.where(scale == 0, 1, scale)[:, None, :])
+        attributes = {
+            "TRANSLATION": self._accessor(matrices[:, :3, 3] - origin, "VEC3"),
+            "ROTATION": self._accessor(quat, "VEC4"),
+            "SCALE": self._accessor(scale, "VEC3"),
+        }
+        self._node(
+            layer,
+            {
+                "mesh": mesh,
+                "translation": origin.tolist(),
+                "extensions": {
+                    "EXT_mesh_gpu_instancing": {"attributes": attributes}
+                },
+            },
+        )
+
+    def _points(self, material, layer, locations):
+        origin = locations[0].copy()
+        position = self._accessor(
+            locations - origin, "VEC3", ARRAY_BUFFER, bounds=True
+        )
+        self.json["meshes"].append(
+            {
+                "name": "points",
+                "primitives": [
+                    {
+                        "attributes": {"POSITION": position},
+                        "mode": POINTS,
+                        "material": material,
+                    }
+                ],
+            }
+        )
+        mesh = len(self.json["meshes"]) - 1
+        self._node(layer, {"mesh": mesh, "translation": origin.tolist()})
+
+    def close(self):
+        """Flush and write the JSON, return the file name"""
+        self.flush()
+        buffer = {"byteLength": self.offset}
+        if self.bin_uri is not None:
+            buffer["uri"] = self.bin_uri
+        self.json["buffers"].append(buffer)
+        if self.extensions:
+            self.json["extensionsUsed"] = sorted(self.extensions)
+        if self.offset == 0:
+            del self.json["buffers"]
+        for key in ("meshes", "materials", "accessors", "bufferViews"):
+            if not self.json[key]:
+                del self.json[key]
+        text = json.dumps(self.json, separators=(",", ":")).encode()
+        if not self.binary:
+            self.bin.close()
+            with open(self.filename, "wb") as fh:
+                fh.write(text)
+            return self.filename
+        text += b" " * (-len(text) % 4)
+        padding = -self.offset % 4
+        length = 12 + 8 + len(text) + 8 + self.offset + padding
+        with open(self.filename, "wb") as fh:
+            fh.write(struct.pack("<4sII", b"glTF", 2, length))
+            fh.write(struct.pack("<I4s", len(text), b"JSON"))
+            fh.write(text)
+            fh.write(struct.pack("<I4s", self.offset + padding, b"BIN\0"))
+            self.bin.seek(0)
+            shutil.copyfileobj(self.bin, fh)
+            fh.write(b"\0" * padding)
+        self.bin.close()
+        return self.filename
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.bin.close()
+
+
+def export_gltf(part, filename, style=None, **kwargs):
+    """Write part to a .glb or .gltf file, see `GltfWriter`"""
+    writer = GltfWriter(filename, **kwargs)
+    writer.add(part, style=style)
+    return writer.close()
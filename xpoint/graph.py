@@ -0,0 +1,189 @@
+"""
+Lazily evaluated dependency graph of points.
+
+A `PointNode` is either an input point or a point defined as an operation
+(moveby, arcby, rotateby, lookat, ...) applied to a copy of another node.
+Changing an input or the parameters of an operation marks only the
+downstream nodes dirty, they are recomputed when accessed.
+
+    start = PointNode(Point())
+    d1start = start.moveby(dx=2)
+    d1mid = d1start.arcby(angle=-45, dx=1.5, axis="z")
+    d1end = d1mid.arcby(angle=-45, dx=1.5, axis="z")
+    d1mid.update(angle=-40)  # only d1mid and d1end are recomputed
+    d1end.location
+"""
+
+from .point import Point
+
+
+class PointNode:
+    """Node of a dependency graph of points.
+
+    Parameters
+    ----------
+    source : Point or PointNode
+        Input point or node on which the operation is applied.
+    op : str, optional
+        Name of the `Point` method to apply in place on a copy of source.
+        If None the node is an input node wrapping source.
+    *args, **kwargs :
+        Arguments of the operation, `PointNode` arguments are dependencies
+        and are replaced by their point when evaluated.
+    """
+
+    operations = (
+        "moveby",
+        "moveto",
+        "arcby",
+        "rotateby",
+        "rotateto",
+        "rotateabout",
+        "lookat",
+        "transform",
+    )
+
+    def __init__(self, source, op=None, *args, name=None, **kwargs):
+        self.op = op
+        self.args = list(args)
+        self.kwargs = kwargs
+        self.name = name
+        self.children = []
+        self._value = None
+        self._dirty = True
+        if op is None:
+            self.sources = []
+            self._input = source
+        else:
+            self.sources = [source]
+            self._input = None
+        self._link()
+
+    def _link(self):
+        deps = self.sources + [
+            arg
+            for arg in list(self.args) + list(self.kwargs.values())
+            if isinstance(arg, PointNode)
+        ]
+        downstream = {id(node) for node in self.iter_descendants()}
+        downstream.add(id(self))
+        for dep in deps:
+            if id(dep) in downstream:
+                raise ValueError(
+                    f"Dependency cycle: the arguments of {self.op!r} "
+                    "depend on the node"
+                )
+        self.dependencies = []
+        for dep in deps:
+            if dep not in self.dependencies:
+                self.dependencies.append(dep)
+                dep.children.append(self)
+
+    def _unlink(self):
+        for dep in self.dependencies:
+            dep.children.remove(self)
+        self.dependencies = []
+
+    @staticmethod
+    def _resolve(arg):
+        return arg.point if isinstance(arg, PointNode) else arg
+
+    def derive(self, op, *args, **kwargs):
+        """Return a new node applying op(*args, **kwargs) to this node"""
+        if op not in self.operations:
+            raise ValueError(f"Operation {op!r} not supported")
+        return PointNode(self, op, *args, **kwargs)
+
+    def __getattr__(self, key):
+        if key in PointNode.operations:
+            return lambda *args, **kwargs: self.derive(key, *args, **kwargs)
+        if key.startswith("_") or "_dirty" not in self.__dict__:
+            raise AttributeError(f"PointNode has no attribute {key}")
+        return getattr(self.point, key)
+
+    # evaluation
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @property
+    def point(self):
+        """Return the point of the node, recomputing it if needed"""
+        if self._dirty:
+            if self.op is None:
+                self._value = self._input
+            else:
+                self._value = self.sources[0].point.copy(name=self.name)
+                args = [self._resolve(arg) for arg in self.args]
+                kwargs = {k: self._resolve(v) for k, v in self.kwargs.items()}
+                getattr(self._value, self.op)(*args, **kwargs)
+            self._dirty = False
+        return self._value
+
+    def invalidate(self):
+        """Mark the node and the downstream nodes dirty.
+
+        Descendants of a dirty node are always dirty, so the propagation
+        stops at nodes already dirty. To be called after an input point has
+        been modified in place.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._dirty and node is not self:
+                continue
+            node._dirty = True
+            stack.extend(node.children)
+        return self
+
+    # editing
+
+    def set(self, point):
+        """Replace the point of an input node"""
+        if self.op is not None:
+            raise ValueError("Only input nodes can be set")
+        self._input = point
+        return self.invalidate()
+
+    def update(self, *args, **kwargs):
+        """Change the arguments of the operation, raise ValueError if they
+        depend on the node"""
+        if self.op is None:
+            raise ValueError("Input nodes have no operation to update")
+        previous = self.args, dict(self.kwargs)
+        if len(args) > 0:
+            self.args = list(args)
+        self.kwargs.update(kwargs)
+        self._unlink()
+        try:
+            self._link()
+        except ValueError:
+            self.args, self.kwargs = previous
+            self._link()
+            raise
+        return self.invalidate()
+
+    def iter_descendants(self):
+        """Iterate over the downstream nodes, each one once"""
+        seen = set()
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if id(node) not in seen:
+                seen.add(id(node))
+                yield node
+                stack.extend(node.children)
+
+    def __repr__(self):
+        if self.op is None:
+            return f"PointNode({self._input!r})"
+        args = [repr(arg) for arg in self.args]
+        args += [f"{k}={v!r}" for k, v in self.kwargs.items()]
+        return f"PointNode(<{self.op}>, {', '.join(args)})"
+
+    def __hash__(self):
+        return hash(id(self))
+
+    def __eq__(self, other):
+        return self is other
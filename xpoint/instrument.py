@@ -0,0 +1,328 @@
+"""
+Opt-in instrumentation of the xpoint hot paths.
+
+When enabled, the methods listed in `targets` are wrapped to count and time
+Point allocations, matrix compositions, Rotation builds, primitive
+emissions, style resolutions and artist creations, optionally per call
+site. When disabled the original methods are restored, so there is no cost.
+
+    from xpoint import instrument
+
+    with instrument.profiling(callsites=True) as report:
+        canvas.draw()
+    print(report)
+
+The modules of the targets are not imported by `enable`, the ones imported
+later, such as the matplotlib backends, are wrapped when they are loaded.
+The events are added to the report of the current thread or task, so
+concurrent `profiling` scopes keep separate reports.
+"""
+
+import functools
+import importlib
+import importlib.abc
+import inspect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# (module, class or None, attribute, event)
+targets = [
+    ("xpoint.point", "Point", "__init__", "point_alloc"),
+    ("xpoint.point", "Point", "copy", "point_copy"),
+    ("xpoint.point", "Point", "transform", "compose"),
+    ("xpoint.point", "Point", "moveby", "compose"),
+    ("xpoint.point", "Point", "arcby", "compose"),
+    ("xpoint.point", "Point", "rotateby", "compose"),
+    ("xpoint.point", "Point", "rotateabout", "compose"),
+    ("xpoint.point", "Point", "rotation_scipy", "rotation_build"),
+    ("xpoint.point", "Point", "rx", "rotation_build"),
+    ("xpoint.point", "Point", "ry", "rotation_build"),
+    ("xpoint.point", "Point", "rz", "rotation_build"),
+    ("xpoint.point", "Point", "__getitem__", "part_lookup"),
+    ("xpoint.point", "Point", "get_primitives", "primitive_emission"),
+    ("xpoint.point", "Point", "iter_primitives", "primitive_iteration"),
+    ("xpoint.batch", None, "collect", "primitive_emission"),
+    ("xpoint.canvas", None, "collect", "primitive_emission"),
+    ("xpoint.export", None, "collect", "primitive_emission"),
+    ("xpoint.batch", "PrimitiveBatch", "finalize", "batch_finalize"),
+    ("xpoint.canvas", None, "resolve_style", "style_resolution"),
+    ("xpoint.canvas", "Canvas2DMPL", "draw_points", "artist_creation"),
+    ("xpoint.canvas", "Canvas2DMPL", "draw_lines", "artist_creation"),
+    ("xpoint.canvas", "Canvas2DMPL", "draw_polylines", "artist_creation"),
+    ("xpoint.canvas", "Canvas2DMPL", "draw_texts", "artist_creation"),
+    ("xpoint.labels", "LabelCollection", "layout", "label_layout"),
+    ("xpoint.canvas", "Canvas2DMPL", "draw", "draw"),
+    ("xpoint.canvas", "Canvas3D", "draw", "draw"),
+    ("xpoint.export", "Canvas2DExport", "draw", "draw"),
+]
+
+# events for which the number of returned items is recorded, the items of
+# the generators are always counted
+sized_events = {"primitive_emission"}
+
+
+class Report:
+    """Counters and inclusive timings by event and call site"""
+
+    def __init__(self):
+        self.stats = {}  # event -> [calls, time, items]
+        self.sites = {}  # (event, site) -> [calls, time, items]
+
+    def add(self, event, site, dt, items):
+        keys = [(self.stats, event)]
+        if site is not None:
+            keys.append((self.sites, (event, site)))
+        for table, key in keys:
+            st = table.setdefault(key, [0, 0.0, 0])
+            st[0] += 1
+            st[1] += dt
+            st[2] += items
+
+    def clear(self):
+        self.stats.clear()
+        self.sites.clear()
+
+    def summary(self, sites=True, limit=10):
+        """Return a text table sorted by time"""
+        out = [f"{'event':<40} {'calls':>10} {'time [s]':>12} {'items':>10}"]
+        rows = sorted(self.stats.items(), key=lambda kv: -kv[1][1])
+        for event, (calls, dt, items) in rows:
+            out.append(f"{event:<40} {calls:>10} {dt:>12.6f} {items:>10}")
+            if not sites:
+                continue
+            evsites = [
+                (site, st) for (ev, site), st in self.sites.items()
+                if ev == event
+            ]
+            evsites.sort(key=lambda kv: -kv[1][1])
+            for site, (calls, dt, items) in evsites[:limit]:
+                out.append(f"  {site:<38} {calls:>10} {dt:>12.6f} {items:>10}")
+        return "\n".join(out)
+
+    def __repr__(self):
+        return self.summary(sites=False)
+
+    def __str__(self):
+        return self.summary()
+
+
+# default report, `profiling` scopes use their own
+report = Report()
+_report = ContextVar("xpoint_instrument_report", default=report)
+_originals = []
+_lock = threading.RLock()
+_scopes = 0  # number of open profiling scopes
+_pinned = False  # enabled by `enable` rather than by a scope
+# events being timed in the current thread or task, and call site flag
+_active = ContextVar("xpoint_instrument_active", default=frozenset())
+_callsites = ContextVar("xpoint_instrument_callsites", default=False)
+
+
+def get_report():
+    """Report receiving the events of the current thread or task"""
+    return _report.get()
+
+
+def _site(depth=2):
+    frame = sys._getframe(depth)
+    fname = os.path.basename(frame.f_code.co_filename)
+    return f"{fname}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def _size(result):
+    """Number of items of a list or of a dict of batches"""
+    if isinstance(result, dict):
+        return sum(len(batch) for batch in result.values())
+    return len(result)
+
+
+def _wrap(func, event):
+    if inspect.isgeneratorfunction(func):
+        return _wrap_generator(func, event)
+    sized = event in sized_events
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        active = _active.get()
+        site = _site() if _callsites.get() else None
+        if event in active:  # recursive call, timed by the outermost one
+            _report.get().add(event, site, 0.0, 0)
+            return func(*args, **kwargs)
+        token = _active.set(active | {event})
+        t0 = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _active.reset(token)
+        dt = time.perf_counter() - t0
+        _report.get().add(event, site, dt, _size(result) if sized else 0)
+        return result
+
+    wrapper._xpoint_event = event
+    return wrapper
+
+
+def _wrap_generator(func, event):
+    """Count the items of a generator and time the steps producing them,
+    the call is recorded when the generator is exhausted or closed"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        site = _site() if _callsites.get() else None
+        generator = func(*args, **kwargs)
+        items, dt = 0, 0.0
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    dt += time.perf_counter() - t0
+                items += 1
+                yield item
+        finally:
+            generator.close()
+            _report.get().add(event, site, dt, items)
+
+    wrapper._xpoint_event = event
+    return wrapper
+
+
+def _wrap_attr(value, event):
+    if isinstance(value, property):
+        return property(
+            _wrap(value.fget, event) if value.fget else None,
+            _wrap(value.fset, event) if value.fset else None,
+            value.fdel,
+            value.__doc__,
+        )
+    return _wrap(value, event)
+
+
+class _Loader(importlib.abc.Loader):
+    """Loader wrapping the targets of a module once it is executed"""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        with _lock:
+            if is_enabled():
+                _install(module.__name__)
+
+
+class _Finder(importlib.abc.MetaPathFinder):
+    """Defer the wrapping of the target modules not imported yet"""
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in _deferred:
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None:
+                    spec.loader = _Loader(spec.loader)
+                return spec
+        return None
+
+
+_finder = _Finder()
+_deferred = set()
+
+
+def _install(modname):
+    """Wrap the targets of an imported module"""
+    _deferred.discard(modname)
+    module = sys.modules[modname]
+    for tmodname, clsname, attr, event in targets:
+        if tmodname != modname:
+            continue
+        owner = module if clsname is None else getattr(module, clsname)
+        value = owner.__dict__.get(attr)
+        # functions imported from another target module are wrapped once
+        if value is None or hasattr(value, "_xpoint_event"):
+            continue
+        _originals.append((owner, attr, value))
+        setattr(owner, attr, _wrap_attr(value, event))
+
+
+def _install_all():
+    if is_enabled():
+        return
+    for modname in dict.fromkeys(tt[0] for tt in targets):
+        if modname in sys.modules:
+            _install(modname)
+        else:
+            _deferred.add(modname)
+    sys.meta_path.insert(0, _finder)
+
+
+def _uninstall():
+    if _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+    _deferred.clear()
+    while _originals:
+        owner, attr, value = _originals.pop()
+        setattr(owner, attr, value)
+
+
+def is_enabled():
+    return _finder in sys.meta_path
+
+
+def enable(callsites=False):
+    """Install the wrappers, record call sites if callsites is True"""
+    global _pinned
+    _callsites.set(callsites)
+    with _lock:
+        _pinned = True
+        _install_all()
+    return _report.get()
+
+
+def disable():
+    """Restore the original methods, the wrappers stay installed while
+    `profiling` scopes are open"""
+    global _pinned
+    with _lock:
+        _pinned = False
+        if _scopes == 0:
+            _uninstall()
+
+
+def reset():
+    _report.get().clear()
+
+
+@contextmanager
+def profiling(callsites=False):
+    """Enable instrumentation in a scope and yield a fresh report, which
+    receives the events of the current thread or task only"""
+    global _scopes
+    new = Report()
+    token = _report.set(new)
+    ctoken = _callsites.set(callsites)
+    with _lock:
+        _scopes += 1
+        _install_all()
+    try:
+        yield new
+    finally:
+        with _lock:
+            _scopes -= 1
+            if _scopes == 0 and not _pinned:
+                _uninstall()
+        _callsites.reset(ctoken)
+        _report.reset(token)
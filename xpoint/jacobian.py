@@ -0,0 +1,210 @@
+"""
+Forward-mode propagation of frames with analytic Jacobians.
+
+A `DualFrame` carries a 4x4 matrix together with the stack of its
+derivatives with respect to `nparams` parameters. The operations mirror the
+`Point` ones (moveby, rotateby, arcby, transform) and are applied as a right
+multiplication by a local transformation, whose derivatives are analytic.
+Arguments are marked as parameters with `wrt={argument: index}`.
+
+    f = DualFrame(Point(), nparams=3)
+    f.moveby(dx=2, wrt={"dx": 0})
+    f.arcby(angle=-45, dx=1.5, wrt={"angle": 1, "dx": 2})
+    f.location_jacobian  # (3, 3) d location / d (drift, angle, length)
+"""
+
+import numpy as np
+
+from .point import Point
+
+generators = {
+    "x": np.array([[0, 0, 0], [0, 0, -1], [0, 1, 0]], dtype=float),
+    "y": np.array([[0, 0, 1], [0, 0, 0], [-1, 0, 0]], dtype=float),
+    "z": np.array([[0, -1, 0], [1, 0, 0], [0, 0, 0]], dtype=float),
+}
+
+
+def skew(v):
+    """Return the matrix K such that K @ u = v x u"""
+    return np.array(
+        [[0, -v[2], v[1]], [v[2], 0, -v[0]], [-v[1], v[0], 0]], dtype=float
+    )
+
+
+def axis_rotation(kk, angle):
+    """Rotation matrix of angle around the axis with skew matrix kk"""
+    return np.eye(3) + np.sin(angle) * kk + (1 - np.cos(angle)) * kk @ kk
+
+
+def _homogeneous(rot=None, loc=None, w=0):
+    """Return a 4x4 matrix, w=1 for transformations, w=0 for derivatives"""
+    out = np.zeros((4, 4))
+    out[3, 3] = w
+    if rot is not None:
+        out[:3, :3] = rot
+    if loc is not None:
+        out[:3, 3] = loc
+    return out
+
+
+def _arc_functions(angle):
+    """Return sin(a)/a, (1-cos(a))/a and their derivatives"""
+    if abs(angle) < 1e-4:
+        a2 = angle * angle
+        return (
+            1 - a2 / 6,
+            angle / 2 - angle * a2 / 24,
+            -angle / 3,
+            0.5 - a2 / 8,
+        )
+    s, c = np.sin(angle), np.cos(angle)
+    return (
+        s / angle,
+        (1 - c) / angle,
+        (angle * c - s) / angle**2,
+        (angle * s - (1 - c)) / angle**2,
+    )
+
+
+class DualFrame:
+    """Frame with the derivatives of its matrix.
+
+    Parameters
+    ----------
+    point : Point or array_like, optional
+        Initial frame as a `Point` or a 4x4 matrix.
+    nparams : int
+        Number of parameters.
+    tangent : array_like, optional
+        Initial (nparams,4,4) derivatives, default is zero.
+    """
+
+    def __init__(self, point=None, nparams=0, tangent=None):
+        if point is None:
+            self.matrix = np.eye(4)
+        elif isinstance(point, Point):
+            self.matrix = point.matrix.copy()
+        else:
+            self.matrix = np.array(point, dtype=float)
+        if tangent is None:
+            self.tangent = np.zeros((nparams, 4, 4))
+        else:
+            self.tangent = np.array(tangent, dtype=float)
+
+    @property
+    def nparams(self):
+        return len(self.tangent)
+
+    @property
+    def location(self):
+        return self.matrix[:3, 3]
+
+    @property
+    def location_jacobian(self):
+        """Return d location / d params as a (3,nparams) array"""
+        return self.tangent[:, :3, 3].T
+
+    @property
+    def rotation_jacobian(self):
+        """Return d rotation matrix / d params as a (nparams,3,3) array"""
+        return self.tangent[:, :3, :3]
+
+    def to_point(self, **kwargs):
+        return Point(self.matrix.copy(), **kwargs)
+
+    def copy(self):
+        return DualFrame(self.matrix, tangent=self.tangent)
+
+    def apply(self, local, dlocal=None):
+        """Right multiply by local with derivatives dlocal={index: dmatrix}"""
+        tangent = self.tangent @ local
+        if dlocal is not None:
+            for idx, dmat in dlocal.items():
+                tangent[idx] += self.matrix @ dmat
+        self.matrix = self.matrix @ local
+        self.tangent = tangent
+        return self
+
+    # transformations
+
+    def moveby(self, delta=None, dx=0, dy=0, dz=0, wrt=None):
+        """Move by delta or (dx,dy,dz) in the frame.
+
+        wrt keys: "dx", "dy", "dz".
+        """
+        if delta is not None:
+            dx, dy, dz = delta
+        local = np.eye(4)
+        local[:3, 3] = dx, dy, dz
+        dlocal = {}
+        for key, idx in (wrt or {}).items():
+            dlocal[idx] = _homogeneous(loc=np.eye(3)["xyz".index(key[1])])
+        return self.apply(local, dlocal)
+
+    def rotateby(self, rx=0, ry=0, rz=0, seq="zxy", degrees=True, wrt=None):
+        """Rotate by Euler angles in the frame, same convention as
+        `Point.rotateby`.
+
+        wrt keys: "rx", "ry", "rz".
+        """
+        scale = np.pi / 180 if degrees else 1.0
+        values = {"x": rx, "y": ry, "z": rz}
+        order = [(ax, values[ax] * scale) for ax in seq.lower()]
+        if seq.islower():  # extrinsic, applied right to left
+            order = order[::-1]
+        kks = [generators[ax] for ax, _ in order]
+        rots = [axis_rotation(kk, ang) for kk, (_, ang) in zip(kks, order)]
+        rot = np.linalg.multi_dot(rots)
+        dlocal = {}
+        for key, idx in (wrt or {}).items():
+            pos = [ax for ax, _ in order].index(key[1])
+            drot = rots.copy()
+            drot[pos] = kks[pos] @ rots[pos]
+            dlocal[idx] = _homogeneous(rot=scale * np.linalg.multi_dot(drot))
+        return self.apply(_homogeneous(rot, w=1), dlocal)
+
+    def arcby(self, angle, dx=0, dy=0, dz=0, axis="z", degrees=True, wrt=None):
+        """Move along an arc as `Point.arcby`, axis is "x", "y", "z" or a
+        unit vector in the frame.
+
+        wrt keys: "angle", "dx", "dy", "dz".
+        """
+        scale = np.pi / 180 if degrees else 1.0
+        angle = angle * scale
+        if isinstance(axis, str):
+            kk = generators[axis]
+        else:
+            kk = skew(axis)
+        tangent = np.array([dx, dy, dz], dtype=float)
+        chord = -kk @ tangent  # tangent x axis
+        f1, f2, df1, df2 = _arc_functions(angle)
+        rot = axis_rotation(kk, angle)
+        kk2 = kk @ kk
+        local = _homogeneous(rot, (f1 * kk + f2 * kk2) @ chord, w=1)
+        dlocal = {}
+        for key, idx in (wrt or {}).items():
+            if key == "angle":
+                dloc = (df1 * kk + df2 * kk2) @ chord
+                dlocal[idx] = scale * _homogeneous(kk @ rot, dloc)
+            else:
+                dchord = -kk[:, "xyz".index(key[1])]
+                dlocal[idx] = _homogeneous(loc=(f1 * kk + f2 * kk2) @ dchord)
+        return self.apply(local, dlocal)
+
+    def transform(self, other):
+        """Left multiply by other, a Point, matrix or DualFrame with the
+        same parameters"""
+        if isinstance(other, DualFrame):
+            self.tangent = other.tangent @ self.matrix + np.einsum(
+                "ij,pjk->pik", other.matrix, self.tangent
+            )
+            self.matrix = other.matrix @ self.matrix
+        else:
+            if isinstance(other, Point):
+                other = other.matrix
+            self.tangent = np.einsum("ij,pjk->pik", other, self.tangent)
+            self.matrix = other @ self.matrix
+        return self
+
+    def __repr__(self):
+        return f"DualFrame({self.to_point()!r}, nparams={self.nparams})"
@@ -0,0 +1,249 @@
+"""
+Batched text labels for matplotlib.
+
+The labels of a batch are drawn as a single `LabelCollection`: the glyph
+outlines of each string are built once with matplotlib's `TextPath` and
+cached with their extents by (string, font, size), so redraws and zooms
+never measure the text again. Overlaps are avoided by a greedy placement
+of each label on a few candidate positions around its anchor, checked
+against the already placed boxes through a uniform grid. The placement is
+done in display points when the collection is rendered, so it follows the
+zoom level and the resolution of the output.
+"""
+
+import numpy as np
+from matplotlib.collections import PathCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D
+
+# label positions around the anchor: NE, NW, SE, SW, E, W, N, S
+candidates = np.array(
+    [[1, 1], [-1, 1], [1, -1], [-1, -1], [1, 0], [-1, 0], [0, 1], [0, -1]]
+)
+
+
+class TextCache:
+    """Glyph paths and extents in points keyed by (string, family, size).
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of entries, the oldest are dropped first.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self.data = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, text, family="sans-serif", size=10):
+        """Return the path and the extents (x0, y0, x1, y1) of a string"""
+        key = (text, family, size)
+        item = self.data.get(key)
+        if item is None:
+            self.misses += 1
+            item = self.data[key] = self.measure(text, family, size)
+            if len(self.data) > self.maxsize:
+                del self.data[next(iter(self.data))]
+        else:
+            self.hits += 1
+        return item
+
+    @staticmethod
+    def measure(text, family, size):
+        if text == "":
+            return Path(np.zeros((0, 2))), np.zeros(4)
+        prop = FontProperties(family=[family])
+        path = TextPath((0, 0), text, size=size, prop=prop)
+        if len(path.vertices) == 0:
+            return path, np.zeros(4)
+        # box of the control points, slightly larger than the glyphs
+        return path, np.r_[path.vertices.min(0), path.vertices.max(0)]
+
+    def clear(self):
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+text_cache = TextCache()
+
+
+def place_labels(anchors, extents, pad=2.0, cell=None):
+    """Greedy placement of labels without overlaps.
+
+    Labels are placed in order of priority on the first candidate position
+    not overlapping an already placed label, or hidden.
+
+    Parameters
+    ----------
+    anchors : array_like (N,2)
+        Anchor of the labels.
+    extents : array_like (N,4)
+        Boxes (x0, y0, x1, y1) of the labels relative to their origin, in
+        the same units as the anchors.
+    pad : float, optional
+        Distance between the anchor and the box.
+    cell : float, optional
+        Size of the grid cells, default is the median label width.
+
+    Returns
+    -------
+    shifts : ndarray (N,2)
+        Position of the label origins relative to the anchors.
+    visible : ndarray of bool (N,)
+    """
+    anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+    extents = np.asarray(extents, dtype=float).reshape(-1, 4)
+    nlabels = len(anchors)
+    shifts = np.empty((nlabels, len(candidates), 2))
+    for ax in range(2):
+        lo, hi = extents[:, None, ax], extents[:, None, ax + 2]
+        side = candidates[None, :, ax]
+        shifts[..., ax] = np.where(
+            side > 0, pad - lo, np.where(side < 0, -pad - hi, -(lo + hi) / 2)
+        )
+    lower = (anchors[:, None] + shifts + extents[:, None, :2]).tolist()
+    upper = (anchors[:, None] + shifts + extents[:, None, 2:]).tolist()
+    if cell is None:
+        cell = np.median(extents[:, 2] - extents[:, 0]) if nlabels else 1
+    cell = max(float(cell), 1e-12)
+    finite = np.isfinite(anchors).all(axis=1)
+    grid = {}
+    out = np.zeros((nlabels, 2))
+    visible = np.zeros(nlabels, dtype=bool)
+    for ii in range(nlabels):
+        if not finite[ii]:
+            continue
+        for cc, ((x0, y0), (x1, y1)) in enumerate(zip(lower[ii], upper[ii])):
+            cells = [
+                (gi, gj)
+                for gi in range(int(x0 // cell), int(x1 // cell) + 1)
+                for gj in range(int(y0 // cell), int(y1 // cell) + 1)
+            ]
+            overlap = False
+            for key in cells:
+                for bx0, by0, bx1, by1 in grid.get(key, ()):
+                    if x0 < bx1 and bx0 < x1 and y0 < by1 and by0 < y1:
+                        overlap = True
+                        break
+                if overlap:
+                    break
+            if not overlap:
+                box = (x0, y0, x1, y1)
+                for key in cells:
+                    grid.setdefault(key, []).append(box)
+                out[ii] = shifts[ii, cc]
+                visible[ii] = True
+                break
+    return out, visible
+
+
+class LabelCollection(PathCollection):
+    """Labels drawn as one collection of glyph paths.
+
+    Parameters
+    ----------
+    anchors : array_like (N,2)
+        Anchors in data coordinates.
+    texts : list of str
+    fontsize : float, optional
+        Size in points.
+    fontfamily : str, optional
+    autoplace : bool, optional
+        Avoid overlaps, hiding the labels that cannot be placed. Otherwise
+        all labels are drawn at the upper right of the anchor.
+    pad : float, optional
+        Distance in points between the anchor and the label.
+    cache : TextCache, optional
+        Default is the module cache `text_cache`.
+    **kwargs
+        Passed to `PathCollection` (color, alpha, zorder, ...).
+    """
+
+    def __init__(
+        self,
+        anchors,
+        texts,
+        fontsize=10,
+        fontfamily="sans-serif",
+        autoplace=True,
+        pad=2.0,
+        cache=None,
+        **kwargs,
+    ):
+        if cache is None:
+            cache = text_cache
+        self.anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+        self.texts = list(texts)
+        self.autoplace = autoplace
+        self.pad = pad
+        items = [cache.get(tt, fontfamily, fontsize) for tt in self.texts]
+        self.glyphs = [path for path, _ in items]
+        self.extents = np.array([ext for _, ext in items]).reshape(-1, 4)
+        self.placed = np.ones(len(self.texts), dtype=bool)
+        self._layout_key = None
+        color = kwargs.pop("color", "k")
+        kwargs.setdefault("facecolors", color)
+        kwargs.setdefault("edgecolors", "none")
+        super().__init__([], **kwargs)
+
+    def layout(self):
+        """Place the labels for the current view"""
+        axes = self.axes
+        dpi = axes.figure.dpi
+        display = axes.transData.transform(self.anchors) * 72 / dpi
+        key = (display.tobytes(), dpi)
+        if key == self._layout_key:
+            return
+        self._layout_key = key
+        # labels far outside of the axes do not take space
+        x0, y0, x1, y1 = axes.bbox.extents * 72 / dpi
+        margin = np.ptp(self.extents.reshape(-1, 2, 2), axis=1).max(
+            initial=0
+        )
+        margin += 2 * self.pad
+        outside = (
+            (display[:, 0] < x0 - margin)
+            | (display[:, 0] > x1 + margin)
+            | (display[:, 1] < y0 - margin)
+            | (display[:, 1] > y1 + margin)
+        )
+        display[outside] = np.nan
+        if self.autoplace:
+            shifts, visible = place_labels(display, self.extents, self.pad)
+        else:
+            shifts = np.zeros((len(self.anchors), 2)) + self.pad
+            visible = np.isfinite(display).all(axis=1)
+        self.placed = visible
+        self.set_paths(
+            [
+                Path(path.vertices + shift, path.codes)
+                for path, shift, vis in zip(self.glyphs, shifts, visible)
+                if vis
+            ]
+        )
+        self.set_offsets(self.anchors[visible])
+        self.set_offset_transform(axes.transData)
+        self.set_transform(Affine2D().scale(dpi / 72))
+
+    def draw(self, renderer):
+        self.layout()
+        super().draw(renderer)
+
+
+def add_labels(ax, anchors, texts, **kwargs):
+    """Add a `LabelCollection` to ax, the anchors are included in the data
+    limits"""
+    labels = LabelCollection(anchors, texts, **kwargs)
+    ax.add_collection(labels, autolim=False)
+    if len(labels.anchors) > 0:
+        ax.update_datalim(labels.anchors[np.isfinite(labels.anchors).all(1)])
+        ax.autoscale_view()
+    return labels
@@ -0,0 +1,565 @@
+"""
+Import of MAD-X sequence files.
+
+The file is read statement by statement. Variables, element classes and
+sequences are recorded with their expressions, which are evaluated when a
+sequence is built:
+
+    madx = Madx.from_file("lhc.seq")
+    ring = madx.sequence("lhcb1")
+    ring["mq.12r1.b1"].location
+
+A `Sequence` is a `Curve` whose bends follow the geometry of
+`Point.arcby`, with the reference orbit along the local z axis and the
+bending plane x-z as in MAD-X. The frames of the element centres are
+computed for the whole sequence at once. The elements are parts created on
+access, each referencing a template shared by all the elements of the
+same class and length, so building a ring stores arrays only.
+
+Only the subset of the language describing the layout is supported:
+assignments, evaluated when read with "=" and when used with ":=",
+element definitions, sequences (refer, at, from), `call` and the
+comments. The other commands are ignored.
+"""
+
+import ast
+import math
+import operator
+import os
+import re
+from collections.abc import MutableMapping
+
+import numpy as np
+
+from .curve import Curve
+from .point import Point
+from .primitives import Line
+from .rotation import rotvec_to_matrix
+
+element_kinds = {
+    "drift", "sbend", "rbend", "quadrupole", "sextupole", "octupole",
+    "multipole", "solenoid", "hkicker", "vkicker", "kicker", "tkicker",
+    "rfcavity", "crabcavity", "twcavity", "rfmultipole", "elseparator",
+    "monitor", "hmonitor", "vmonitor", "instrument", "placeholder",
+    "marker", "collimator", "rcollimator", "ecollimator", "beambeam",
+    "matrix", "srotation", "xrotation", "yrotation", "translation",
+    "dipedge", "changeref", "nllens",
+}  # fmt: skip
+
+constants = {
+    "pi": math.pi,
+    "twopi": 2 * math.pi,
+    "degrad": 180 / math.pi,
+    "raddeg": math.pi / 180,
+    "e": math.e,
+    "clight": 299792458.0,
+    "true": 1,
+    "false": 0,
+}
+
+functions = {
+    name: getattr(math, name)
+    for name in [
+        "sqrt", "exp", "log", "log10", "sin", "cos", "tan", "asin",
+        "acos", "atan", "sinh", "cosh", "tanh", "floor", "ceil",
+    ]
+}  # fmt: skip
+functions.update(abs=abs, round=round, atan2=math.atan2, min=min, max=max)
+
+_comment = re.compile(r"/\*.*?\*/", re.S)
+_assign = re.compile(
+    r"^(?:(?:real|int|const|shared)\s+)*([\w.$]+)\s*(:?)=\s*(.+)$",
+    re.I | re.S,
+)
+_define = re.compile(r"^([\w.$]+)\s*:\s*([\w.$]+)\s*(?:,(.*))?$", re.S)
+_reference = re.compile(r"^([\w.$]+)\s*(?:,(.*))?$", re.S)
+_name = re.compile(
+    r"(?<![\w.$])([A-Za-z_][\w.$]*)(\s*->\s*[A-Za-z_]\w*)?(\s*\()?"
+)
+_occurrence = re.compile(r"^([\w.$]+)\[\s*(\d+)\s*\]$")
+_quoted = re.compile(r"(\"[^\"]*\"|'[^']*')")
+
+
+_binary = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+_unary = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+
+def _evaluate_node(node, values, expr):
+    """Value of a parsed expression made of numbers, the variables in
+    values, arithmetic operators and calls of `functions` only"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return float(node.value)
+    if isinstance(node, ast.Name) and node.id in values:
+        return values[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _binary:
+        left = _evaluate_node(node.left, values, expr)
+        right = _evaluate_node(node.right, values, expr)
+        return _binary[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _unary:
+        operand = _evaluate_node(node.operand, values, expr)
+        return _unary[type(node.op)](operand)
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in functions
+        and not node.keywords
+    ):
+        args = [_evaluate_node(arg, values, expr) for arg in node.args]
+        return functions[node.func.id](*args)
+    raise ValueError(f"Unsupported expression {expr!r}")
+
+
+def _lower(text):
+    """Lowercase text outside of the quoted strings"""
+    parts = _quoted.split(text)
+    parts[::2] = [part.lower() for part in parts[::2]]
+    return "".join(parts)
+
+
+def statements(lines):
+    """Yield the statements of lines without comments, in lowercase
+    except for the quoted strings"""
+    buffer = []
+    for line in lines:
+        for marker in ("!", "//"):
+            pos = line.find(marker)
+            if pos >= 0:
+                line = line[:pos]
+        buffer.append(line)
+        if ";" not in line:
+            continue
+        text = _comment.sub(" ", "".join(buffer))
+        if text.count("/*") > text.count("*/"):
+            continue  # open block comment
+        *stmts, rest = text.split(";")
+        buffer = [rest]
+        for stmt in stmts:
+            stmt = " ".join(stmt.split())
+            if stmt:
+                yield _lower(stmt)
+
+
+def split_attributes(text):
+    """Split "a=1, b:={1,2}, flag" at the top level commas"""
+    out, depth, quote, start = [], 0, None, 0
+    for ii, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "({":
+            depth += 1
+        elif char in ")}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            out.append(text[start:ii])
+            start = ii + 1
+    out.append(text[start:])
+    attrs = {}
+    for item in out:
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        key = key.rstrip(":").strip()
+        attrs[key] = value.strip() if sep else "true"
+    return attrs
+
+
+class SequenceParts(MutableMapping):
+    """Parts of a `Sequence`, the elements are created on first access"""
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.created = {}  # element index -> part
+        self.extra = {}
+
+    def __getitem__(self, key):
+        if key in self.extra:
+            return self.extra[key]
+        idx = self.sequence.positions[key]
+        part = self.created.get(idx)
+        if part is None:
+            part = self.created[idx] = self.sequence.element(idx)
+        return part
+
+    def __setitem__(self, key, part):
+        idx = self.sequence.positions.get(key)
+        if idx is not None:
+            self.created[idx] = part
+        else:
+            self.extra[key] = part
+
+    def __delitem__(self, key):
+        del self.extra[key]
+
+    def __copy__(self):
+        parts = SequenceParts(self.sequence)
+        parts.created = dict(self.created)
+        parts.extra = dict(self.extra)
+        return parts
+
+    def __iter__(self):
+        yield from self.sequence.keys
+        yield from self.extra
+
+    def __len__(self):
+        return len(self.sequence.keys) + len(self.extra)
+
+    def __contains__(self, key):
+        return key in self.sequence.positions or key in self.extra
+
+
+class Sequence(Curve):
+    """Elements placed along a reference curve.
+
+    Parameters
+    ----------
+    name : str
+    names : list of str
+        Element names in order of position. An element placed once is
+        stored under its name, each occurrence of an element placed
+        several times under ``name[n]`` with n counted from 1 along the
+        sequence, as in MAD-X.
+    centers : array_like (N,)
+        Position of the element centres along the curve.
+    lengths : array_like (N,)
+        Lengths, along the arc for the bends.
+    classes : list of str
+        Class of each element.
+    kinds : list of str
+        MAD-X element type of each element.
+    angles, tilts : array_like (N,), optional
+        Bending angles and tilts in radians.
+    length : float, optional
+        Length of the sequence.
+    """
+
+    def __init__(self, name, names, centers, lengths, classes, kinds,
+                 angles=None, tilts=None, length=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        nelem = len(names)
+        self.names = list(names)
+        self.index = {}  # name -> indices of the occurrences
+        for ii, nn in enumerate(self.names):
+            self.index.setdefault(nn, []).append(ii)
+        self.keys = list(self.names)
+        for nn, occurrences in self.index.items():
+            if len(occurrences) > 1:
+                for nocc, ii in enumerate(occurrences, 1):
+                    self.keys[ii] = f"{nn}[{nocc}]"
+        self.positions = {kk: ii for ii, kk in enumerate(self.keys)}
+        self.centers = np.asarray(centers, dtype=float)
+        self.lengths = np.asarray(lengths, dtype=float)
+        self.classes = list(classes)
+        self.kinds = list(kinds)
+        if angles is None:
+            angles = np.zeros(nelem)
+        if tilts is None:
+            tilts = np.zeros(nelem)
+        self.angles = np.asarray(angles, dtype=float)
+        self.tilts = np.asarray(tilts, dtype=float)
+        self.templates = {}
+        self._frames = None
+        self._build_curve(length)
+        self.parts = SequenceParts(self)
+
+    def _build_curve(self, length):
+        pos = 0.0
+        for ii in np.flatnonzero(self.angles != 0):
+            entry = self.centers[ii] - self.lengths[ii] / 2
+            if entry > pos:
+                self.straight(dz=entry - pos)
+            tilt = self.tilts[ii]
+            # positive angles bend towards -x as in MAD-X
+            self.arc(
+                -self.angles[ii],
+                dz=self.lengths[ii],
+                axis=(-np.sin(tilt), np.cos(tilt), 0),
+                degrees=False,
+            )
+            pos = entry + self.lengths[ii]
+        if length is None:
+            ends = self.centers + self.lengths / 2
+            length = max(ends.max(initial=0), pos)
+        if length > pos or len(self.segments) == 0:
+            self.straight(dz=max(length - pos, 0))
+
+    @property
+    def element_frames(self):
+        """Frames (N,4,4) of the element centres in the frame of the
+        parts, the tilts of the elements are included"""
+        if self._frames is None:
+            frames = self.frames(self.centers)
+            tilted = np.flatnonzero(self.tilts != 0)
+            if len(tilted) > 0:
+                axis = np.zeros((len(tilted), 3))
+                axis[:, 2] = self.tilts[tilted]
+                rot = frames[tilted, :3, :3] @ rotvec_to_matrix(axis)
+                frames[tilted, :3, :3] = rot
+            self._frames = frames
+        return self._frames
+
+    def template(self, idx):
+        """Template shared by the elements of the same class and length"""
+        key = (self.classes[idx], float(self.lengths[idx]))
+        template = self.templates.get(key)
+        if template is None:
+            template = Point(name=key[0], layer=self.kinds[idx])
+            if key[1] > 0:
+                half = key[1] / 2
+                template.add_part("body", Line([0, 0, -half], [0, 0, half]))
+            self.templates[key] = template
+        return template
+
+    def element(self, idx):
+        """Create the part of element idx"""
+        template = self.template(idx)
+        part = Point(
+            self.element_frames[idx],
+            name=self.names[idx],
+            layer=self.kinds[idx],
+            parts={template.name: template},
+        )
+        part.parent = self
+        return part
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            key = self.keys[key]
+        return super().__getitem__(key)
+
+
+class Madx:
+    """Variables, element classes and sequences of MAD-X files"""
+
+    def __init__(self):
+        self.variables = dict(constants)
+        self.elements = {}  # name -> (parent class, attributes)
+        self.sequences = {}  # name -> (attributes, list of (name, attrs))
+        self.built = {}
+        self._values = {}  # expression -> value, reset by any definition
+        self._current = None
+        self._directory = "."
+
+    @classmethod
+    def from_file(cls, filename):
+        madx = cls()
+        madx.call(filename)
+        return madx
+
+    def call(self, filename):
+        """Read a file, relative paths of nested calls are resolved from
+        its directory"""
+        filename = os.path.join(self._directory, filename)
+        previous = self._directory
+        self._directory = os.path.dirname(filename)
+        try:
+            with open(filename) as fh:
+                self.parse(fh)
+        finally:
+            self._directory = previous
+        return self
+
+    def parse(self, lines):
+        """Read statements from an iterable of lines"""
+        for stmt in statements(lines):
+            self.statement(stmt)
+        return self
+
+    def statement(self, stmt):
+        self._values.clear()
+        if stmt == "endsequence":
+            self._current = None
+            return
+        match = _assign.match(stmt)
+        if match:
+            name, deferred, expr = match.groups()
+            expr = expr.strip()
+            if not deferred:
+                # "=" is evaluated once, ":=" on each use
+                value = self.evaluate(expr)
+                if not isinstance(value, str):
+                    expr = value
+            self.variables[name] = expr
+            return
+        match = _define.match(stmt)
+        if match:
+            name, parent, rest = match.groups()
+            attrs = split_attributes(rest or "")
+            if parent == "sequence":
+                self.sequences[name] = (attrs, [])
+                self.built.pop(name, None)
+                self._current = name
+            elif self._current is not None:
+                self.elements[name] = (parent, attrs)
+                self.sequences[self._current][1].append((name, attrs))
+            else:
+                self.elements[name] = (parent, attrs)
+            return
+        match = _reference.match(stmt)
+        if match:
+            name, rest = match.groups()
+            attrs = split_attributes(rest or "")
+            if name == "call" and "file" in attrs:
+                self.call(attrs["file"].strip("\"'"))
+            elif self._current is not None and name in self.elements:
+                self.sequences[self._current][1].append((name, attrs))
+
+    def evaluate(self, expr):
+        """Value of an expression, undefined variables are zero"""
+        if isinstance(expr, (int, float)):
+            return expr
+        value = self._values.get(expr)
+        if value is None:
+            value = self._values[expr] = self._evaluate(expr.strip())
+        return value
+
+    def _evaluate(self, expr):
+        try:
+            return float(expr)
+        except ValueError:
+            pass
+        if expr.startswith("{"):
+            return [self.evaluate(item) for item in expr[1:-1].split(",")]
+        if expr[:1] in "\"'":
+            return expr.strip("\"'")
+
+        values = {}
+
+        def replace(match):
+            name, attr, call = match.groups()
+            if call:
+                return f"{name}("
+            if attr:
+                attr = attr.split(">")[1].strip()
+                value = self.attribute(name, attr, 0)
+            else:
+                value = self.variable(name)
+            key = f"_{len(values)}"
+            values[key] = value
+            return key
+
+        code = _name.sub(replace, expr.replace("^", "**"))
+        try:
+            tree = ast.parse(code, mode="eval")
+        except SyntaxError:
+            raise ValueError(f"Invalid expression {expr!r}") from None
+        return _evaluate_node(tree.body, values, expr)
+
+    def variable(self, name):
+        value = self.variables.get(name, 0)
+        if isinstance(value, str):
+            value = self.evaluate(value)
+        return value
+
+    def kind(self, name):
+        """MAD-X element type of a class or element"""
+        seen = set()
+        while name not in element_kinds and name in self.elements:
+            if name in seen:
+                raise ValueError(f"Circular definition of {name}")
+            seen.add(name)
+            name = self.elements[name][0]
+        return name
+
+    def attribute(self, name, attr, default=None):
+        """Value of an attribute, inherited from the parent classes"""
+        seen = set()
+        while name in self.elements and name not in seen:
+            seen.add(name)
+            parent, attrs = self.elements[name]
+            if attr in attrs:
+                return self.evaluate(attrs[attr])
+            name = parent
+        return default
+
+    def sequence(self, name=None):
+        """Return the `Sequence` name, the last one read by default"""
+        if name is None:
+            name = list(self.sequences)[-1]
+        seq = self.built.get(name)
+        if seq is None:
+            seq = self.built[name] = self._build(name)
+        return seq
+
+    @staticmethod
+    def _reference(ref, occurrences, placed, ats):
+        """Position of the element ref of a from= attribute"""
+        ref = ref.strip("\"'")
+        match = _occurrence.match(ref)
+        if match:
+            name, nocc = match.group(1), int(match.group(2))
+            found = occurrences.get(name, [])
+            if not 1 <= nocc <= len(found):
+                raise ValueError(f"Unknown occurrence {ref}")
+            return ats[found[nocc - 1]]
+        idx = placed.get(ref)
+        if idx is None:
+            found = occurrences.get(ref)
+            if found is None:
+                raise ValueError(f"Unknown element {ref} in from")
+            idx = found[0]
+        return ats[idx]
+
+    def _build(self, name):
+        attrs, items = self.sequences[name]
+        refer = attrs.get("refer", "centre").strip("\"'")
+        length = self.evaluate(attrs.get("l", "0")) or None
+        names, classes, kinds = [], [], []
+        lengths, angles, tilts, ats, froms = [], [], [], [], []
+        for elem, eattrs in items:
+            kind = self.kind(elem)
+            ll = self.attribute(elem, "l", 0.0)
+            angle = self.attribute(elem, "angle", 0.0)
+            if kind == "rbend" and angle != 0:
+                # arc length from the straight length
+                ll = ll * angle / 2 / math.sin(angle / 2)
+            if kind not in ("sbend", "rbend"):
+                angle = 0.0
+            names.append(elem)
+            classes.append(self.elements[elem][0])
+            kinds.append(kind)
+            lengths.append(ll)
+            angles.append(angle)
+            tilts.append(self.attribute(elem, "tilt", 0.0))
+            ats.append(self.evaluate(eattrs.get("at", "0")))
+            froms.append(eattrs.get("from"))
+        lengths = np.array(lengths, dtype=float)
+        ats = np.array(ats, dtype=float)
+        # from= refers to name[n] or to the last occurrence of name read
+        # before, or to the first one
+        occurrences = {}
+        for ii, elem in enumerate(names):
+            occurrences.setdefault(elem, []).append(ii)
+        placed = {}
+        for ii, ref in enumerate(froms):
+            if ref is not None:
+                ats[ii] += self._reference(ref, occurrences, placed, ats)
+            placed[names[ii]] = ii
+        if refer == "entry":
+            centers = ats + lengths / 2
+        elif refer == "exit":
+            centers = ats - lengths / 2
+        else:
+            centers = ats
+        order = np.argsort(centers, kind="stable")
+        pick = order.tolist()
+        return Sequence(
+            name,
+            [names[ii] for ii in pick],
+            centers[order],
+            lengths[order],
+            [classes[ii] for ii in pick],
+            [kinds[ii] for ii in pick],
+            angles=np.array(angles, dtype=float)[order],
+            tilts=np.array(tilts, dtype=float)[order],
+            length=length,
+        )
@@ -0,0 +1,218 @@
+"""
+Virtual arrays of parts laid out on regular patterns.
+
+A pattern stores a template part and the few numbers describing the
+layout, the frames of the instances are generated when needed, as one
+(N,4,4) array. The traversals (`iter_primitives`, `snapshot.flatten`)
+expand the instances on the fly, so a coil of 10^4 turns costs one Point:
+
+    coil = HelixPattern(turn, count=10000, radius=0.05, pitch=0.002)
+    coil.frames        # (10000,4,4) relative to the pattern
+    coil[42]           # turn placed on instance 42, in the parent frame
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .point import Point
+from .rotation import rotvec_to_matrix
+
+
+def _axis(axis):
+    if isinstance(axis, str):
+        return np.eye(3)["xyz".index(axis)]
+    axis = np.asarray(axis, dtype=float)
+    return axis / np.linalg.norm(axis)
+
+
+def _translations(locations):
+    out = np.zeros((len(locations), 4, 4))
+    out[:] = np.eye(4)
+    out[:, :3, 3] = locations
+    return out
+
+
+class Pattern(Point, ABC):
+    """Base class of the patterns, subclasses define `__len__` and
+    `frames`.
+
+    Parameters
+    ----------
+    template : Point
+        Part drawn at each instance, referenced and not copied.
+    *args, **kwargs
+        Passed to `Point` for the frame of the pattern.
+    """
+
+    is_pattern = True
+
+    def __init__(self, template, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.template = template
+        # edits of the template invalidate the digest of the pattern
+        template.parent = self
+
+    @abstractmethod
+    def __len__(self):
+        """Number of instances"""
+
+    @property
+    @abstractmethod
+    def frames(self):
+        """Frames (N,4,4) of the instances in the frame of the pattern"""
+
+    @property
+    def world_frames(self):
+        """Frames (N,4,4) of the instances in the root frame"""
+        return self.world_matrix @ self._frames_body()
+
+    def _frames_body(self):
+        if self._body is None:
+            return self.frames
+        return self._body @ self.frames
+
+    def __getitem__(self, key):
+        """Template of instance key in the parent frame, as the path
+        "pattern/key" of `snapshot.flatten`, or the part named key"""
+        if isinstance(key, str):
+            return super().__getitem__(key)
+        nframes = len(self)
+        if not -nframes <= key < nframes:
+            raise IndexError(f"Pattern index {key} out of range")
+        key = key % nframes
+        # copy sharing the parts of the template, in the parent frame
+        name = (self.name if self.name else "") + f"/{key}"
+        instance = self.template.copy(name=name)
+        frame = self.body_matrix @ self.frames[key]
+        instance._matrix = frame @ self.template._matrix
+        instance.parent = self.__dict__.get("parent")
+        return instance
+
+
+class FramePattern(Pattern):
+    """Instances at explicit frames, as the positions along a `Curve`.
+
+    Parameters
+    ----------
+    matrices : array_like (N,4,4)
+        Frames of the instances in the frame of the pattern.
+    """
+
+    def __init__(self, template, matrices, *args, **kwargs):
+        super().__init__(template, *args, **kwargs)
+        self.matrices = np.asarray(matrices, dtype=float).reshape(-1, 4, 4)
+
+    def __len__(self):
+        return len(self.matrices)
+
+    @property
+    def frames(self):
+        return self.matrices
+
+
+class LinearPattern(Pattern):
+    """Instances at multiples of step, the first at the origin"""
+
+    def __init__(self, template, count, step=(1, 0, 0), *args, **kwargs):
+        super().__init__(template, *args, **kwargs)
+        self.count = count
+        self.step = np.asarray(step, dtype=float)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def frames(self):
+        return _translations(np.arange(self.count)[:, None] * self.step)
+
+
+class GridPattern(Pattern):
+    """Instances on a rectangular grid, the first index varies slowest.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Number of instances along x, y and optionally z.
+    spacing : tuple of float
+        Distance between instances along the same axes.
+    """
+
+    def __init__(self, template, shape, spacing, *args, **kwargs):
+        super().__init__(template, *args, **kwargs)
+        self.shape = tuple(shape)
+        self.spacing = np.asarray(spacing, dtype=float)
+        if len(self.shape) != len(self.spacing) or len(self.shape) > 3:
+            raise ValueError("shape and spacing must have 1 to 3 items")
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def frames(self):
+        index = np.indices(self.shape).reshape(len(self.shape), -1).T
+        locations = np.zeros((len(index), 3))
+        locations[:, : len(self.shape)] = index * self.spacing
+        return _translations(locations)
+
+
+class HelixPattern(Pattern):
+    """Instances on a helix around axis, rotated with it.
+
+    Parameters
+    ----------
+    count : int
+    radius : float
+        Distance from the axis, along the next axis in x, y, z order.
+    pitch : float
+        Advance along the axis per turn.
+    step : float, optional
+        Angle between consecutive instances, default is one turn divided
+        by count.
+    axis : str or array_like
+    degrees : bool
+        Unit of step.
+    """
+
+    def __init__(self, template, count, radius=0, pitch=0, step=None,
+                 axis="z", *args, degrees=True, **kwargs):
+        super().__init__(template, *args, degrees=degrees, **kwargs)
+        self.count = count
+        self.radius = radius
+        self.pitch = pitch
+        if step is None:
+            turn = 360 if degrees else 2 * np.pi
+            step = turn / count if count > 0 else 0
+        self.step = step
+        self.axis = axis
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def frames(self):
+        step = np.deg2rad(self.step) if self.degrees else self.step
+        angles = np.arange(self.count) * step
+        axis = _axis(self.axis)
+        if isinstance(self.axis, str):
+            radial = np.eye(3)[("xyz".index(self.axis) + 1) % 3]
+        else:
+            radial = np.cross(axis, np.eye(3)[np.argmin(np.abs(axis))])
+            radial /= np.linalg.norm(radial)
+        out = _translations(np.zeros((self.count, 3)))
+        rot = rotvec_to_matrix(angles[:, None] * axis)
+        out[:, :3, :3] = rot
+        out[:, :3, 3] = self.radius * (rot @ radial)
+        out[:, :3, 3] += np.outer(angles * self.pitch / (2 * np.pi), axis)
+        return out
+
+
+class PolarPattern(HelixPattern):
+    """Instances on a circle around axis, rotated with it, as in a bolt
+    circle"""
+
+    def __init__(self, template, count, radius=0, step=None, axis="z",
+                 *args, **kwargs):
+        super().__init__(
+            template, count, radius, 0, step, axis, *args, **kwargs
+        )
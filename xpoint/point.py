@@ -8,11 +8,29 @@ A `Point` is a location in space with an associated set of orthogonal axis and
 
 """
 
+import copy
 import re
 from collections.abc import Iterable
 
 import numpy as np
-from scipy.spatial.transform import Rotation
+
+from .rotation import (
+    euler_to_matrix,
+    lookat_matrix,
+    matrix_to_euler,
+    matrix_to_quat,
+    matrix_to_rotvec,
+    normalize_columns,
+    rotation_atob,
+    rotvec_to_matrix,
+    scipy_rotation,
+)
+
+
+def __getattr__(name):
+    if name == "Rotation":
+        return scipy_rotation()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def xyz_to_array(x=0, y=0, z=0):
@@ -80,6 +98,16 @@ class Point:
         If True, Euler angles are in degrees. If False, they are in radians. Default is True.
     """
 
+    # batch in which the point is drawn, primitives are drawn without parts
+    primitive_kind = "points"
+    is_primitive = False
+    # patterns expand a template on generated frames, see pattern.py
+    is_pattern = False
+    # frame of the parts relative to the origin, None for the identity
+    _body = None
+    # (digest, size) of the subtree, None when stale, see cache.tree_digest
+    _digest = None
+
     def __init__(self, *args, **kwargs):
         self._matrix = np.eye(4)
         self.name = kwargs.get("name")
@@ -168,6 +196,21 @@ class Point:
 
 
 
+    def __setattr__(self, key, value):
+        object.__setattr__(self, key, value)
+        # the private attributes are caches, except the frame and body
+        if key[0] != "_" and key != "parent" or key in ("_matrix", "_body"):
+            self._changed()
+
+    def _changed(self):
+        """Mark the subtree digests of the point and of its parents as
+        stale, called on each change of the frame, body, parts or public
+        attributes"""
+        part = self
+        while part is not None and part._digest is not None:
+            object.__setattr__(part, "_digest", None)
+            part = part.__dict__.get("parent")
+
     # getters and setters
     @property
     def matrix(self):
@@ -176,6 +219,26 @@ class Point:
     @matrix.setter
     def matrix(self, value):
         self._matrix[:] = value
+        self._changed()
+
+    @property
+    def world_matrix(self):
+        """Matrix to the root frame, following the parents set by
+        `add_part`"""
+        matrix = self._matrix.copy()
+        parent = self.__dict__.get("parent")
+        while parent is not None:
+            matrix = parent.body_matrix @ matrix
+            parent = parent.__dict__.get("parent")
+        return matrix
+
+    @property
+    def body_matrix(self):
+        """Matrix of the frame in which the parts are expressed, it differs
+        from `matrix` after `set_origin` or `rotate` with keep_origin"""
+        if self._body is None:
+            return self._matrix
+        return self._matrix @ self._body
 
     @property
     def location(self):
@@ -184,6 +247,9 @@ class Point:
     @location.setter
     def location(self, value):
         self._matrix[: len(value), 3] = value
+        self._changed()
+
+    position = location
 
     @property
     def x(self):
@@ -192,6 +258,7 @@ class Point:
     @x.setter
     def x(self, value):
         self._matrix[0, 3] = value
+        self._changed()
 
     @property
     def y(self):
@@ -200,6 +267,7 @@ class Point:
     @y.setter
     def y(self, value):
         self._matrix[1, 3] = value
+        self._changed()
 
     @property
     def z(self):
@@ -208,6 +276,7 @@ class Point:
     @z.setter
     def z(self, value):
         self._matrix[2, 3] = value
+        self._changed()
 
     @property
     def dx(self):
@@ -223,27 +292,28 @@ class Point:
 
     @property
     def rotation_scipy(self):
-        return Rotation.from_matrix(self._matrix[:3, :3])
+        return scipy_rotation().from_matrix(self._matrix[:3, :3])
 
     @property
     def rotation(self):
-        return self.rotation_scipy.as_euler(seq=self.seq, degrees=self.degrees)
+        return matrix_to_euler(self.seq, self._matrix[:3, :3], self.degrees)
 
     @property
     def rotation_axis(self):
-        return self.rotation_scipy.as_rotvec()
+        return matrix_to_rotvec(self._matrix[:3, :3])
 
     @property
     def rotation_matrix(self):
-        return self.rotation_scipy.as_matrix()
+        return normalize_columns(self._matrix[:3, :3])
 
     @rotation_matrix.setter
     def rotation_matrix(self, value):
         self._matrix[:3, :3] = value
+        self._changed()
 
     @property
     def rotation_quat(self):
-        return self.rotation_scipy.as_quat()
+        return matrix_to_quat(self._matrix[:3, :3])
 
     @property
     def rz(self):
@@ -254,11 +324,10 @@ class Point:
 
     @rz.setter
     def rz(self, rz):
-        self._matrix[:3, :3] = Rotation.from_euler(
-            seq=self.seq,
-            angles=self._reorder_rotation(self.rx, self.ry, rz),
-            degrees=self.degrees,
-        ).as_matrix()
+        self._matrix[:3, :3] = euler_to_matrix(
+            self.seq, self._reorder_rotation(self.rx, self.ry, rz), self.degrees
+        )
+        self._changed()
 
     @property
     def rx(self):
@@ -266,11 +335,10 @@ class Point:
 
     @rx.setter
     def rx(self, rx):
-        self._matrix[:3, :3] = Rotation.from_euler(
-            seq=self.seq,
-            angles=self._reorder_rotation(rx, self.ry, self.rz),
-            degrees=self.degrees,
-        ).as_matrix()
+        self._matrix[:3, :3] = euler_to_matrix(
+            self.seq, self._reorder_rotation(rx, self.ry, self.rz), self.degrees
+        )
+        self._changed()
 
     @property
     def ry(self):
@@ -278,11 +346,10 @@ class Point:
 
     @ry.setter
     def ry(self, ry):
-        self._matrix[:3, :3] = Rotation.from_euler(
-            seq=self.seq,
-            angles=self._reorder_rotation(self.rx, ry, self.rz),
-            degrees=self.degrees,
-        ).as_matrix()
+        self._matrix[:3, :3] = euler_to_matrix(
+            self.seq, self._reorder_rotation(self.rx, ry, self.rz), self.degrees
+        )
+        self._changed()
 
     @property
     def sx(self):
@@ -316,12 +383,19 @@ class Point:
     # generic methods
 
     def copy(self,name=None):
-        """Return a copy of the point"""
-        if name is None:
-            name=self.name
-        return Point(
-            matrix=self._matrix, seq=self.seq, degrees=self.degrees, name=name
-        )
+        """Return a copy of the point of the same class, with its own frame
+        and sharing the parts"""
+        point = copy.copy(self)
+        state = point.__dict__
+        state.pop("parent", None)
+        state.pop("_digest", None)
+        state["_matrix"] = self._matrix.copy()
+        if self._body is not None:
+            state["_body"] = self._body.copy()
+        state["parts"] = copy.copy(self.parts)
+        if name is not None:
+            state["name"] = name
+        return point
 
 
     def __repr__(self):
@@ -415,15 +489,25 @@ class Point:
     def dup(self):
         return self.copy()
 
+    @property
+    def new(self):
+        """Return a new point on the same frame, without parts"""
+        return Point(
+            matrix=self._matrix, seq=self.seq, degrees=self.degrees,
+            name=self.name,
+        )
+
     # Part management
 
     def add_part(self, name, part):
         self.parts[name] = part
         part.parent = self
+        self._changed()
 
     def remove_part(self, name):
         self.parts[name].parent = None
         del self.parts[name]
+        self._changed()
 
     def iter_part(self):
         return self.parts.keys()
@@ -435,7 +519,7 @@ class Point:
         Move by delta or (dx,dy,dz) in the point frame
         """
         if location is None:
-            location = np.array(x, y, z)
+            location = np.array((x, y, z))
         self.location = location
 
         return self
@@ -451,40 +535,55 @@ class Point:
 
 
     def rotateabout(self, axis, angle, degrees=True):
-        self.rotation_scipy *= Rotation.from_rotvec(axis*angle, degrees=degrees).as_matrix()
+        """Rotate by angle around axis given in the point frame"""
+        if degrees:
+            angle = np.deg2rad(angle)
+        rot = rotvec_to_matrix(np.asarray(axis) * angle)
+        self._matrix[:3, :3] = self._matrix[:3, :3] @ rot
+        self._changed()
+        return self
 
-    def rotateby(self,rx=0,ry=0,rz=0,seq=None,degrees=True,center=None):
+    def _euler_matrix(self, rx, ry, rz, seq, degrees):
+        """Rotation matrix of the angles about x, y, z composed in the
+        order of seq"""
         if seq is None:
-            seq=self.seq
-        if center is not None:
-            self.location+=center
-        self.rotation_scipy *= Rotation.from_euler(seq,(rx,ry,rz),degrees=degrees).as_matrix()
+            seq = self.seq
+        angles = {"x": rx, "y": ry, "z": rz}
+        return euler_to_matrix(
+            seq, [angles[ll] for ll in seq.lower()], degrees=degrees
+        )
+
+    def rotateby(self,rx=0,ry=0,rz=0,seq=None,degrees=True,center=None):
+        """Rotate by Euler angles in the point frame, about the origin or
+        about center given in the point frame"""
+        rot = np.eye(4)
+        rot[:3, :3] = self._euler_matrix(rx, ry, rz, seq, degrees)
         if center is not None:
-            self.location-=center
+            if isinstance(center, Point):
+                center = center.location
+            pivot = np.eye(4)
+            pivot[:3, 3] = center
+            rot = pivot @ rot @ np.linalg.inv(pivot)
+        self._matrix = self._matrix @ rot
         return self
-    
+
     def rotateto(self,rx=0,ry=0,rz=0,seq=None,degrees=True):
-        if seq is None:
-            seq=self.seq
-        self.rotation_scipy = Rotation.from_euler(seq,(rx,ry,rz),degrees=degrees).as_matrix()
+        self.rotation_matrix = self._euler_matrix(rx, ry, rz, seq, degrees)
         return self
 
-    def rotate_atob(self,a, b):
-        cross = np.cross(a, b)
-        dot = np.dot(a, b)
-        skew_symmetric = np.array([
-            [0, -cross[2], cross[1]],
-            [cross[2], 0, -cross[0]],
-            [-cross[1], cross[0], 0],
-        ])
-        # Compute the rotation matrix using Rodrigues' formula
-        R = np.eye(3) + skew_symmetric + skew_symmetric@skew_symmetric * ((1 - dot) / cross@cross)
-        self._matrix = R@self._matrix
+    def rotate_atob(self, a, b):
+        """Rotate the point about its location by the minimal rotation
+        taking the direction a to b, both given in the parent frame"""
+        rot = rotation_atob(a, b)
+        self._matrix[:3, :3] = rot @ self._matrix[:3, :3]
+        self._changed()
         return self
 
-
     def transform(self, other):
-        self._matrix = other._matrix @ self._matrix
+        """Apply transformation given by a point or a 4x4 matrix"""
+        if isinstance(other, Point):
+            other = other._matrix
+        self._matrix = other @ self._matrix
         return self
 
     def arcby(self, angle, dx=0, dy=0, dz=0, axis="z", degrees=True):
@@ -505,43 +604,168 @@ class Point:
         #    t=1-c
         #    rot = np.array([[t * axis[i] * axis[j] + c * (i == j) - s * axis[i] * axis[j]
         #                              for j in range(3)] for i in range(3)])
-        rot = Rotation.from_rotvec(axis * angle, degrees=False).as_matrix()
-        print(radius, rot @ radius, rot @ radius - radius, self.location)
+        rot = rotvec_to_matrix(axis * angle)
         self.location = self.location + (rot @ radius - radius)
         self.rotation_matrix = rot @ self.rotation_matrix
         return self
 
-    def lookat(self, x_or_location=0, y=0, z=0, axis="z"):
-        """Rotate the point such that axis points to the given location"""
-        if is_iterable(x_or_location):
-            location = np.array(location)
+    def lookat(self, x_or_location=0, y=0, z=0, axis="z", up=None,
+               upaxis=None):
+        """Rotate the point such that axis points to the given location.
+
+        Parameters
+        ----------
+        x_or_location : Point, array_like or float
+            Target point, location or x coordinate in the parent frame.
+        axis : str
+            Local axis, "x", "y" or "z", pointing to the target.
+        up : str or array_like, optional
+            Direction in the parent frame, or name of a parent axis, to
+            which `upaxis` is aligned as much as possible. Without up the
+            minimal rotation is applied.
+        upaxis : str, optional
+            Local axis aligned to up, default is "y" ("z" if axis is "y").
+        """
+        if isinstance(x_or_location, Point):
+            location = x_or_location.location
+        elif is_iterable(x_or_location):
+            location = np.asarray(x_or_location, dtype=float)
         else:
-            location = np.array([x_or_location, y, z])
-        if axis in "xyz":
-            axis = getattr(self, "d" + axis)
+            location = np.array([x_or_location, y, z], dtype=float)
+        if upaxis is None:
+            upaxis = "z" if axis == "y" else "y"
+        if isinstance(up, str):
+            up = np.eye(3)["xyz".index(up)]
+        scale = np.linalg.norm(self._matrix[:3, :3], axis=0)
+        self._matrix[:3, :3] = scale * lookat_matrix(
+            location - self.location,
+            up,
+            "xyz".index(axis),
+            "xyz".index(upaxis),
+            self.rotation_matrix,
+        )
+        self._changed()
+        return self
+
+    def part_matrix(self, path):
+        """Matrix of the part at path ("a/b") relative to the frame of the
+        parts"""
+        matrix = np.eye(4)
+        part = self
+        for ii, key in enumerate(path.split("/")):
+            if ii > 0 and part._body is not None:
+                matrix = matrix @ part._body
+            part = part.parts[key]
+            matrix = matrix @ part._matrix
+        return matrix
+
+    def _frame_matrix(self, frame):
+        if isinstance(frame, str):
+            return self.part_matrix(frame)
+        if isinstance(frame, Point):
+            return frame._matrix.copy()
+        if has_shape(np.asarray(frame), [(4, 4)]):
+            return np.array(frame, dtype=float)
+        matrix = np.eye(4)
+        matrix[:3, 3] = frame
+        return matrix
+
+    def set_origin(self, frame=None):
+        """Make frame the origin of the point without moving the parts.
+
+        Only the point matrix and the offset of the parts are changed, the
+        parts are not visited.
+
+        Parameters
+        ----------
+        frame : Point, str, array_like or None
+            New origin in the frame of the parts: a point, the path of a
+            part, a 4x4 matrix or a location. If None the origin is moved
+            back to the frame of the parts.
+        """
+        body = self.body_matrix
+        if frame is None:
+            self._matrix = body.copy()
+            self._body = None
+            return self
+        offset = self._frame_matrix(frame)
+        self._matrix = body @ offset
+        self._body = np.linalg.inv(offset)
+        return self
+
+    def rotate(self, center=None, xrot=0, yrot=0, zrot=0, degrees=None,
+               keep_origin=False):
+        """Rotate the point and its parts about a pivot.
+
+        Parameters
+        ----------
+        center : Point, str or array_like, optional
+            Pivot in the frame of the parts: a point, whose axes are used,
+            the path of a part or a location. Default is the origin of the
+            parts.
+        xrot, yrot, zrot : float
+            Rotations about the axes of the pivot, applied in this order.
+        degrees : bool, optional
+            Default is `self.degrees`.
+        keep_origin : bool
+            If True the origin stays in place and only the parts move,
+            otherwise the origin moves with them.
+        """
+        if degrees is None:
+            degrees = self.degrees
+        angles = np.array([xrot, yrot, zrot], dtype=float)
+        if degrees:
+            angles = np.deg2rad(angles)
+        rot = np.eye(4)
+        for ii in range(3):
+            axis = np.eye(3)[ii] * angles[ii]
+            rot[:3, :3] = rotvec_to_matrix(axis) @ rot[:3, :3]
+        if center is None:
+            pivot = np.eye(4)
         else:
-            axis = np.array(axis)
-        self.rotation_scipy = Rotation.from_rotvec(
-            axis
-        ) * Rotation.from_rotvec(location - self.location)
+            pivot = self._frame_matrix(center)
+        pivot[:3, :3] = normalize_columns(pivot[:3, :3])
+        # rotation in the frame of the parts
+        move = pivot @ rot @ np.linalg.inv(pivot)
+        if keep_origin:
+            body = move if self._body is None else self._body @ move
+            self._body = body
+        else:
+            body = self.body_matrix
+            self._matrix = body @ move @ np.linalg.inv(body) @ self._matrix
         return self
 
     # parts interface
 
+    @property
+    def body(self):
+        """Point on the frame of the parts, sharing the parts"""
+        return Point(
+            matrix=self.body_matrix,
+            parts=self.parts,
+            seq=self.seq,
+            degrees=self.degrees,
+            name=self.name,
+        )
+
     def __getitem__(self, key):
         name=(self.name if self.name else '')+'/'+key
-        return self.parts[key].copy(name=name).transform(self._matrix)
+        part = self.parts[key].copy(name=name).transform(self.body_matrix)
+        part.parent = self.__dict__.get("parent")
+        return part
     
 
     def __getattr__(self, key):
+        if key.startswith("_") or "parts" not in self.__dict__:
+            raise AttributeError(f"Point has no attribute {key}")
         try:
             return self[key]
         except KeyError:
             raise AttributeError(f"Point has no attribute {key}")
 
     def __setitem__(self, name, part):
-        localpart = part.transform(np.linalg.inv(self._matrix))
-        self.add(name, localpart)
+        localpart = part.transform(np.linalg.inv(self.body_matrix))
+        self.add_part(name, localpart)
 
     def __iter__(self):
         return iter(self.parts)
@@ -586,18 +810,89 @@ class Point:
         canvas.draw()
         return canvas
 
-    def get_primitives(self, style=None):
+    def iter_primitives(self, style=None, matrix=None, visible=None,
+                        layers=False):
         """
-        Return a list of (primitive, style, parent) to be drawn.
+        Yield (primitive, style, matrix) to be drawn, depth first.
+
+        `matrix` is the world matrix of the parent frame, the returned
+        matrices are the world matrices of the primitives' frames. The
+        hierarchy is walked with an explicit stack, so deep trees do not
+        hit the recursion limit.
+
+        `visible(part, layer)` is called before visiting each part with
+        its layer, inherited from the parents when None; the parts for
+        which it returns False are skipped with all their subparts. If
+        `visible.nesting` is a dict, the layers enclosing each layer are
+        added to it. If `layers` is True the layer is yielded as a fourth
+        item.
         """
-        if style is None:
-            style = self.style
-        if style is None:
-            style = {}
-        out = []
-        if len(self.parts)==0 or style.get("draw_locations",False):
-             out.append((self, style)) # primitive, style, reference part
-        if style.get("draw_parts", True):
-            for k, part in self.items():
-                out += part.get_primitives(style)
-        return out
+        nesting = getattr(visible, "nesting", None)
+        stack = [(self, style, matrix, None)]
+        while stack:
+            part, style, matrix, layer = stack.pop()
+            if part.layer is not None and part.layer != layer:
+                if nesting is not None:
+                    nesting.setdefault(part.layer, set()).add(layer)
+                layer = part.layer
+            if visible is not None and not visible(part, layer):
+                continue
+            if style is None:
+                style = part.style
+            if style is None:
+                style = {}
+            if matrix is None:
+                matrix = part._matrix
+            else:
+                matrix = matrix @ part._matrix
+            if part._body is not None:
+                body = matrix @ part._body
+            else:
+                body = matrix
+            if layers:
+                item = (part, style, matrix, layer)
+            else:
+                item = (part, style, matrix)
+            if part.is_primitive:
+                yield item
+                continue
+            if part.is_pattern:
+                if style.get("draw_locations", False):
+                    yield item
+                if not style.get("draw_parts", True):
+                    continue
+                template = part.template
+                frames = body @ part.frames
+                if template.is_pattern or (
+                    len(template.parts) > 0 and not template.is_primitive
+                ):
+                    for frame in frames[::-1]:
+                        stack.append((template, style, frame, layer))
+                    continue
+                # leaf template, the instances share the layer and style
+                if template.layer is not None and template.layer != layer:
+                    if nesting is not None:
+                        nesting.setdefault(template.layer, set()).add(layer)
+                    layer = template.layer
+                if visible is not None and not visible(template, layer):
+                    continue
+                for frame in frames @ template._matrix:
+                    if layers:
+                        yield (template, style, frame, layer)
+                    else:
+                        yield (template, style, frame)
+                continue
+            if len(part.parts) == 0 or style.get("draw_locations", False):
+                yield item
+            if style.get("draw_parts", True):
+                for sub in reversed(list(part.parts.values())):
+                    stack.append((sub, style, body, layer))
+
+    def get_primitives(self, style=None, matrix=None):
+        """Return the list of (primitive, style, matrix) to be drawn"""
+        return list(self.iter_primitives(style, matrix))
+
+    @property
+    def vertices(self):
+        """Coordinates of the primitive in the local frame"""
+        return np.zeros((1, 3))
@@ -1,8 +1,15 @@
+from abc import ABC, abstractmethod
+
 import numpy as np
 
-from .point import Point, Rotation
+from .point import Point
+from .bounds import aabb_from_obb, obb_from_matrices, unit_corners
+from .rotation import rotation_atob
 
 class Line(Point):
+    primitive_kind = "lines"
+    is_primitive = True
+
     def __init__(self, start, end, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._start=np.array(start)
@@ -10,9 +17,14 @@ class Line(Point):
         self._update()
 
     def _update(self):
-        rot=Rotation.from_vectors(self._end-self._start, np.array([0,0,1]))
-        self.parts['start']=Point(self._start,rotation=rot)
-        self.parts['end']=Point(self._end,rotation=rot)
+        rot=rotation_atob([0,0,1], np.subtract(self._end, self._start))
+        self.parts['start']=Point(self._start,rotation_matrix=rot)
+        self.parts['end']=Point(self._end,rotation_matrix=rot)
+        self._changed()
+
+    @property
+    def vertices(self):
+        return np.array([self._start, self._end], dtype=float)
 
     @property
     def start(self):
@@ -37,41 +49,173 @@ class Line(Point):
 
 
 class PolyLine(Point):
+    primitive_kind = "polylines"
+    is_primitive = True
+
     def __init__(self, points, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.points = points
 
     def __getitem__(self, idx):
-        return Point(self.matrix@self.points[:, idx])
+        return Point(self.positions[idx])
+
+    @property
+    def vertices(self):
+        return np.asarray(self.points, dtype=float).reshape(-1, 3)
 
     @property
     def positions(self):
-        return self.matrix@self.points
+        return self.vertices @ self.matrix[:3, :3].T + self.matrix[:3, 3]
 
     def __len__(self):
         return len(self.points)
 
 class Text(Point):
+    primitive_kind = "texts"
+    is_primitive = True
+
     def __init__(self, text, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.text = text
 
 
-    def __str__(self):
-        return f"Text({self.text}, {self.position})"
-
     def __repr__(self):
-        return f"Text({self.text}, {self.position})"
+        return f"Text({self.text!r}, location={self.location})"
+
 
+class Shape(Point, ABC):
+    """Base of the primitives with an oriented bounding box.
+
+    Subclasses define `half_sizes`, the local `corners` and the `vertices`
+    of the outline drawn as a polyline. The frame of the shape is at its
+    center.
+    """
+
+    primitive_kind = "shapes"
+    is_primitive = True
+
+    @property
+    @abstractmethod
+    def half_sizes(self):
+        """Half sizes (3,) of the box along the local axes"""
+
+    @property
+    def corners(self):
+        return unit_corners * self.half_sizes
+
+    def _bounds(self):
+        # keyed on the local matrices of the parent chain, the world
+        # matrix is only composed when one of them changed
+        chain = [self._matrix.tobytes()]
+        parent = self.__dict__.get("parent")
+        while parent is not None:
+            body = b"" if parent._body is None else parent._body.tobytes()
+            chain.append(body + b"|" + parent._matrix.tobytes())
+            parent = parent.__dict__.get("parent")
+        key = (tuple(chain), self.half_sizes.tobytes())
+        cache = self.__dict__.get("_bounds_cache")
+        if cache is None or cache[0] != key:
+            matrix = self.world_matrix
+            centers, axes, half = obb_from_matrices(matrix, self.half_sizes)
+            aabb = aabb_from_obb(centers, axes, half)[0]
+            obb = (centers[0], axes[0], half[0])
+            cache = self._bounds_cache = (key, aabb, obb)
+        return cache
+
+    @property
+    def aabb(self):
+        """World axis aligned bounding box (2,3), cached until the frame
+        or the sizes change"""
+        return self._bounds()[1]
+
+    @property
+    def obb(self):
+        """World oriented bounding box (center, unit axes, half sizes)"""
+        return self._bounds()[2]
+
+
+class Rectangle(Shape):
+    """Rectangle in the local xy plane, centered on the frame"""
 
-class Rectangle(Point):
     def __init__(self, width, height, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.width = width
+        self.height = height
 
+    @property
+    def half_sizes(self):
+        return np.array([self.width / 2, self.height / 2, 0.0])
+
+    @property
+    def corners(self):
+        return unit_corners[4:] * self.half_sizes
+
+    @property
+    def vertices(self):
+        return self.corners[[0, 1, 2, 3, 0]]
+
+    def __repr__(self):
+        return (
+            f"Rectangle({self.width}, {self.height}, location={self.location})"
+        )
+
+
+class Box(Shape):
+    """Box centered on the frame, length along the local z axis"""
+
+    # path through all edges, retracing three of them
+    outline = [0, 1, 2, 3, 0, 4, 5, 1, 5, 6, 2, 6, 7, 3, 7, 4]
+
+    def __init__(self, width, height, length, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         self.width = width
         self.height = height
+        self.length = length
 
+    @property
+    def half_sizes(self):
+        return np.array([self.width, self.height, self.length]) / 2
 
-    def get_primitives(self, style=None, parent=None):
-        points=np.array([self.ur.location, self.ul, self.ll, self.lr])
+    @property
+    def vertices(self):
+        return self.corners[self.outline]
+
+    def __repr__(self):
+        return (
+            f"Box({self.width}, {self.height}, {self.length}, "
+            f"location={self.location})"
+        )
+
+
+class Cylinder(Shape):
+    """Cylinder centered on the frame, axis along the local z axis"""
+
+    def __init__(self, radius, length, *args, nsides=24, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.radius = radius
+        self.length = length
+        self.nsides = nsides
+
+    @property
+    def half_sizes(self):
+        return np.array([self.radius, self.radius, self.length / 2])
 
-        return super().get_primitives(style, parent)
\ No newline at end of file
+    @property
+    def vertices(self):
+        """Both circles joined by two opposite generatrices"""
+        nn = self.nsides
+        angle = np.linspace(0, 2 * np.pi, nn + 1)
+        ring = np.zeros((nn + 1, 3))
+        ring[:, 0] = self.radius * np.cos(angle)
+        ring[:, 1] = self.radius * np.sin(angle)
+        bottom = ring - [0, 0, self.length / 2]
+        top = ring + [0, 0, self.length / 2]
+        half = nn // 2
+        return np.concatenate(
+            [bottom, top, top[: half + 1], bottom[half : half + 1]]
+        )
+
+    def __repr__(self):
+        return (
+            f"Cylinder({self.radius}, {self.length}, location={self.location})"
+        )
@@ -0,0 +1,336 @@
+"""
+Pure NumPy rotation utilities.
+
+Vectorized conversions between rotation matrices, quaternions (scalar last),
+rotation vectors and Euler angles for (...,3,3) stacks, following the
+conventions of `scipy.spatial.transform.Rotation`: lowercase sequences are
+extrinsic, uppercase intrinsic, all 12 sequences are supported and gimbal
+lock sets the third angle to zero. `rotation_atob` and `lookat_matrix`
+solve orientations for whole arrays of directions. scipy is loaded by
+`scipy_rotation` only when needed.
+"""
+
+import re
+import warnings
+
+import numpy as np
+
+
+def scipy_rotation():
+    """Return scipy Rotation class, imported on first use"""
+    from scipy.spatial.transform import Rotation
+
+    return Rotation
+
+
+def rotvec_to_matrix(rotvec):
+    """Rotation matrices from rotation vectors in radians, (...,3) ->
+    (...,3,3)"""
+    rotvec = np.asarray(rotvec, dtype=float)
+    angle = np.linalg.norm(rotvec, axis=-1)[..., None, None]
+    kk = np.zeros(rotvec.shape[:-1] + (3, 3))
+    kk[..., 0, 1] = -rotvec[..., 2]
+    kk[..., 0, 2] = rotvec[..., 1]
+    kk[..., 1, 0] = rotvec[..., 2]
+    kk[..., 1, 2] = -rotvec[..., 0]
+    kk[..., 2, 0] = -rotvec[..., 1]
+    kk[..., 2, 1] = rotvec[..., 0]
+    small = angle < 1e-8
+    safe = np.where(small, 1.0, angle)
+    c1 = np.where(small, 1 - angle**2 / 6, np.sin(angle) / safe)
+    c2 = np.where(small, 0.5 - angle**2 / 24, (1 - np.cos(angle)) / safe**2)
+    return np.eye(3) + c1 * kk + c2 * (kk @ kk)
+
+
+def normalize_columns(matrix):
+    """Remove the scaling from the columns of (...,3,3) matrices"""
+    matrix = np.asarray(matrix, dtype=float)
+    return matrix / np.linalg.norm(matrix, axis=-2, keepdims=True)
+
+
+def _check_seq(seq):
+    if len(seq) != 3:
+        raise ValueError(f"Expected 3 axes, got {seq}.")
+    extrinsic = re.match(r"^[xyz]{3}$", seq) is not None
+    if not extrinsic and re.match(r"^[XYZ]{3}$", seq) is None:
+        raise ValueError(f"Expected axes from 'xyz' or 'XYZ', got {seq}")
+    if seq[0] == seq[1] or seq[1] == seq[2]:
+        raise ValueError(f"Expected consecutive axes to be different, got {seq}")
+    return extrinsic, ["xyz".index(ax) for ax in seq.lower()]
+
+
+def quat_compose(p, q):
+    """Quaternion product p*q, (...,4)"""
+    cross = np.cross(p[..., :3], q[..., :3])
+    out = np.empty(np.broadcast_shapes(p.shape, q.shape))
+    out[..., :3] = p[..., 3:] * q[..., :3] + q[..., 3:] * p[..., :3] + cross
+    out[..., 3] = p[..., 3] * q[..., 3] - (p[..., :3] * q[..., :3]).sum(-1)
+    return out
+
+
+def quat_canonical(quat):
+    """Choose the sign of the quaternions with w >= 0"""
+    quat = np.asarray(quat, dtype=float)
+    w, x, y, z = quat[..., 3], quat[..., 0], quat[..., 1], quat[..., 2]
+    flip = (w < 0) | (w == 0) & (
+        (x < 0) | (x == 0) & ((y < 0) | (y == 0) & (z < 0))
+    )
+    return np.where(flip[..., None], -quat, quat)
+
+
+def matrix_to_quat(matrix):
+    """Quaternions from (...,3,3) matrices, non orthogonal matrices are
+    replaced by the closest rotation"""
+    matrix = np.array(matrix, dtype=float)
+    gram = matrix @ np.swapaxes(matrix, -1, -2)
+    orthogonal = np.isclose(gram, np.eye(3), atol=1e-12).all(axis=(-2, -1))
+    if not orthogonal.all():
+        uu, _, vt = np.linalg.svd(matrix[~orthogonal])
+        matrix[~orthogonal] = uu @ vt
+    trace = matrix[..., 0, 0] + matrix[..., 1, 1] + matrix[..., 2, 2]
+    decision = np.stack(
+        [matrix[..., 0, 0], matrix[..., 1, 1], matrix[..., 2, 2], trace], -1
+    )
+    choice = decision.argmax(axis=-1)
+    quat = np.empty(matrix.shape[:-2] + (4,))
+    for ii in range(3):
+        jj, kk = (ii + 1) % 3, (ii + 2) % 3
+        sel = choice == ii
+        mm = matrix[sel]
+        qq = quat[sel]
+        qq[:, ii] = 1 - trace[sel] + 2 * mm[:, ii, ii]
+        qq[:, jj] = mm[:, jj, ii] + mm[:, ii, jj]
+        qq[:, kk] = mm[:, kk, ii] + mm[:, ii, kk]
+        qq[:, 3] = mm[:, kk, jj] - mm[:, jj, kk]
+        quat[sel] = qq
+    sel = choice == 3
+    mm = matrix[sel]
+    quat[sel] = np.stack(
+        [
+            mm[:, 2, 1] - mm[:, 1, 2],
+            mm[:, 0, 2] - mm[:, 2, 0],
+            mm[:, 1, 0] - mm[:, 0, 1],
+            1 + trace[sel],
+        ],
+        -1,
+    )
+    return quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+
+
+def quat_to_matrix(quat):
+    """Rotation matrices from (...,4) quaternions"""
+    quat = np.asarray(quat, dtype=float)
+    quat = quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+    x, y, z, w = np.moveaxis(quat, -1, 0)
+    out = np.empty(quat.shape[:-1] + (3, 3))
+    out[..., 0, 0] = x * x - y * y - z * z + w * w
+    out[..., 0, 1] = 2 * (x * y - z * w)
+    out[..., 0, 2] = 2 * (x * z + y * w)
+    out[..., 1, 0] = 2 * (x * y + z * w)
+    out[..., 1, 1] = -x * x + y * y - z * z + w * w
+    out[..., 1, 2] = 2 * (y * z - x * w)
+    out[..., 2, 0] = 2 * (x * z - y * w)
+    out[..., 2, 1] = 2 * (y * z + x * w)
+    out[..., 2, 2] = -x * x - y * y + z * z + w * w
+    return out
+
+
+def rotvec_to_quat(rotvec, degrees=False):
+    rotvec = np.asarray(rotvec, dtype=float)
+    if degrees:
+        rotvec = np.deg2rad(rotvec)
+    angle = np.linalg.norm(rotvec, axis=-1, keepdims=True)
+    small = angle <= 1e-3
+    angle2 = angle**2
+    scale = np.where(
+        small,
+        0.5 - angle2 / 48 + angle2**2 / 3840,
+        np.sin(angle / 2) / np.where(small, 1, angle),
+    )
+    return np.concatenate([rotvec * scale, np.cos(angle / 2)], axis=-1)
+
+
+def quat_to_rotvec(quat, degrees=False):
+    quat = quat_canonical(quat)
+    angle = 2 * np.arctan2(
+        np.linalg.norm(quat[..., :3], axis=-1, keepdims=True), quat[..., 3:]
+    )
+    small = angle <= 1e-3
+    angle2 = angle**2
+    scale = np.where(
+        small,
+        2 + angle2 / 12 + 7 * angle2**2 / 2880,
+        angle / np.where(small, 1, np.sin(angle / 2)),
+    )
+    if degrees:
+        scale = np.rad2deg(scale)
+    return scale * quat[..., :3]
+
+
+def matrix_to_rotvec(matrix, degrees=False):
+    return quat_to_rotvec(matrix_to_quat(matrix), degrees=degrees)
+
+
+def euler_to_quat(seq, angles, degrees=False):
+    """Quaternions from (...,3) Euler angles"""
+    extrinsic, axes = _check_seq(seq)
+    angles = np.asarray(angles, dtype=float)
+    if degrees:
+        angles = np.deg2rad(angles)
+    quat = None
+    for ii, axis in enumerate(axes):
+        elem = np.zeros(angles.shape[:-1] + (4,))
+        elem[..., 3] = np.cos(angles[..., ii] / 2)
+        elem[..., axis] = np.sin(angles[..., ii] / 2)
+        if quat is None:
+            quat = elem
+        elif extrinsic:
+            quat = quat_compose(elem, quat)
+        else:
+            quat = quat_compose(quat, elem)
+    return quat
+
+
+def euler_to_matrix(seq, angles, degrees=False):
+    """Rotation matrices from (...,3) Euler angles"""
+    return quat_to_matrix(euler_to_quat(seq, angles, degrees=degrees))
+
+
+def quat_to_euler(seq, quat, degrees=False, suppress_warnings=False):
+    """Euler angles (...,3) from quaternions"""
+    extrinsic, axes = _check_seq(seq)
+    quat = np.asarray(quat, dtype=float)
+    ii, jj, kk = axes if extrinsic else axes[::-1]
+    symmetric = ii == kk
+    if symmetric:
+        kk = 3 - ii - jj
+    sign = (ii - jj) * (jj - kk) * (kk - ii) // 2
+    if symmetric:
+        a, b = quat[..., 3], quat[..., ii]
+        c, d = quat[..., jj], quat[..., kk] * sign
+    else:
+        a = quat[..., 3] - quat[..., jj]
+        b = quat[..., ii] + quat[..., kk] * sign
+        c = quat[..., jj] + quat[..., 3]
+        d = quat[..., kk] * sign - quat[..., ii]
+    half_sum = np.arctan2(b, a)
+    half_diff = np.arctan2(d, c)
+    angles = np.zeros(quat.shape[:-1] + (3,))
+    angles[..., 1] = 2 * np.arctan2(np.hypot(c, d), np.hypot(a, b))
+    first, third = (0, 2) if extrinsic else (2, 0)
+    case1 = np.abs(angles[..., 1]) <= 1e-7
+    case2 = np.abs(angles[..., 1] - np.pi) <= 1e-7
+    case0 = ~(case1 | case2)
+    if not suppress_warnings and not case0.all():
+        warnings.warn(
+            "Gimbal lock detected. Setting third angle to zero since it is "
+            "not possible to uniquely determine all angles.",
+            stacklevel=2,
+        )
+    angles[..., 0] = np.where(
+        case1, 2 * half_sum, 2 * half_diff * (-1 if extrinsic else 1)
+    )
+    angles[..., first] = np.where(
+        case0, half_sum - half_diff, angles[..., first]
+    )
+    a3 = np.where(case0, half_sum + half_diff, angles[..., third])
+    if not symmetric:
+        a3 = a3 * sign
+        angles[..., 1] -= np.pi / 2
+    angles[..., third] = a3
+    angles = np.where(angles < -np.pi, angles + 2 * np.pi, angles)
+    angles = np.where(angles > np.pi, angles - 2 * np.pi, angles)
+    return np.rad2deg(angles) if degrees else angles
+
+
+def matrix_to_euler(seq, matrix, degrees=False, suppress_warnings=False):
+    """Euler angles (...,3) from rotation matrices"""
+    return quat_to_euler(
+        seq, matrix_to_quat(matrix), degrees, suppress_warnings
+    )
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=float)
+    norm = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norm == 0, 1, norm), norm[..., 0]
+
+
+def orthogonal_vector(vectors):
+    """Unit vectors orthogonal to (...,3) vectors"""
+    vectors, _ = _unit(vectors)
+    # cross with the basis vector least aligned with each vector
+    basis = np.eye(3)[np.abs(vectors).argmin(axis=-1)]
+    return _unit(np.cross(vectors, basis))[0]
+
+
+def rotation_atob(a, b, eps=1e-12):
+    """Minimal rotation matrices (...,3,3) taking the directions a to b.
+
+    Parallel vectors give the identity, antiparallel vectors a half turn
+    about an axis orthogonal to a, a zero vector gives the identity.
+    """
+    a, na = _unit(a)
+    b, nb = _unit(b)
+    a, b = np.broadcast_arrays(a, b)
+    cross = np.cross(a, b)
+    dot = (a * b).sum(-1)
+    kk = np.zeros(cross.shape + (3,))
+    kk[..., 0, 1] = -cross[..., 2]
+    kk[..., 0, 2] = cross[..., 1]
+    kk[..., 1, 0] = cross[..., 2]
+    kk[..., 1, 2] = -cross[..., 0]
+    kk[..., 2, 0] = -cross[..., 1]
+    kk[..., 2, 1] = cross[..., 0]
+    opposite = dot < -1 + eps
+    scale = 1 / np.where(opposite, 1, 1 + dot)
+    out = np.eye(3) + kk + (kk @ kk) * scale[..., None, None]
+    if opposite.any():
+        axis = orthogonal_vector(a[opposite])
+        out[opposite] = 2 * axis[:, :, None] * axis[:, None, :] - np.eye(3)
+    degenerate = (na == 0) | (nb == 0)
+    if np.any(degenerate):
+        out[degenerate] = np.eye(3)
+    return out
+
+
+def lookat_matrix(directions, up=None, axis=2, upaxis=1, current=None):
+    """Rotation matrices (...,3,3) with column `axis` along directions.
+
+    Parameters
+    ----------
+    directions : array_like (...,3)
+        Directions to look at.
+    up : array_like (...,3), optional
+        The column `upaxis` is the component of up orthogonal to the
+        direction. Without up, or when up is parallel to the direction,
+        the minimal rotation from `current` is used.
+    axis, upaxis : int
+        Indices of the looking and up columns.
+    current : array_like (...,3,3), optional
+        Current orientations, default is the identity. They are also
+        returned where the direction is zero.
+    """
+    if axis == upaxis:
+        raise ValueError("axis and upaxis must be different")
+    directions, norm = _unit(directions)
+    if current is None:
+        current = np.eye(3)
+    current = np.broadcast_to(current, directions.shape[:-1] + (3, 3))
+    out = rotation_atob(current[..., :, axis], directions) @ current
+    if up is not None:
+        up = np.broadcast_to(np.asarray(up, dtype=float), directions.shape)
+        ortho = up - (up * directions).sum(-1)[..., None] * directions
+        ortho, onorm = _unit(ortho)
+        valid = onorm > 1e-12 * np.maximum(np.linalg.norm(up, axis=-1), 1)
+        third = 3 - axis - upaxis
+        if (upaxis - axis) % 3 == 1:  # (axis, upaxis, third) is cyclic
+            last = np.cross(directions, ortho)
+        else:
+            last = np.cross(ortho, directions)
+        solved = np.empty_like(out)
+        solved[..., :, axis] = directions
+        solved[..., :, upaxis] = ortho
+        solved[..., :, third] = last
+        out = np.where(valid[..., None, None], solved, out)
+    return np.where((norm == 0)[..., None, None], current, out)
@@ -0,0 +1,288 @@
+"""
+Local asyncio server answering geometry queries on a loaded model.
+
+The model is loaded once and flattened in a `SnapshotStore`. Concurrent
+requests are queued and evaluated in batches against the same snapshot,
+so that world frame lookups and spatial queries of many clients share one
+vectorized evaluation. Requests are dictionaries:
+
+    {"op": "world", "path": "arc/mb1"}
+    {"op": "select", "prefix": "arc", "layer": "magnets", "cls": "Point"}
+    {"op": "near", "location": [x, y, z], "radius": 1.0}
+    {"op": "version"}
+
+They can be sent in-process with `GeometryServer.query` or as JSON lines
+over a local unix or TCP socket with `GeometryClient`. The replies to the
+socket requests may come out of order, a request with an "id" key gets a
+reply with the same "id". Run a server with:
+
+    python -m xpoint.server mymodule:model --socket /tmp/xpoint.sock
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+
+import numpy as np
+
+from .snapshot import SnapshotStore
+
+
+class GeometryError(Exception):
+    """Error reply of a `GeometryServer`, with the message of the server"""
+
+
+class GeometryServer:
+    """Batched geometry queries on a model.
+
+    Parameters
+    ----------
+    model : Point or SnapshotStore
+        Root of the model or store of its snapshots.
+    batch_delay : float, optional
+        Time in seconds to wait to collect requests in a batch.
+    max_batch : int, optional
+        Evaluate immediately when this number of requests is pending.
+    """
+
+    def __init__(self, model, batch_delay=0.0, max_batch=4096):
+        if isinstance(model, SnapshotStore):
+            self.store = model
+        else:
+            self.store = SnapshotStore(model)
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self._pending = []
+        self._flush_handle = None
+        self.nbatches = 0
+
+    # in-process interface
+
+    async def query(self, request):
+        """Return the result of a request, batched with concurrent ones"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((request, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if len(pending) == 0:
+            return
+        self.nbatches += 1
+        snapshot = self.store.current
+        groups = {}
+        for request, future in pending:
+            op = request.get("op") if isinstance(request, dict) else None
+            if not isinstance(op, str):
+                if not future.done():
+                    error = f"Invalid request {request!r}"
+                    future.set_result({"error": error})
+                continue
+            groups.setdefault(op, []).append((request, future))
+        for op, items in groups.items():
+            results = self._evaluate(snapshot, op, [req for req, _ in items])
+            for (_, future), result in zip(items, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _evaluate(self, snapshot, op, requests):
+        """Results of a batch of requests, evaluated one by one if the batch
+        fails so that an invalid request does not fail the others"""
+        handler = getattr(self, f"batch_{op}", None)
+        if handler is None:
+            return [{"error": f"Unknown op {op!r}"}] * len(requests)
+        try:
+            return handler(snapshot, requests)
+        except Exception as err:
+            if len(requests) == 1:
+                return [{"error": f"{type(err).__name__}: {err}"}]
+        return [self._evaluate(snapshot, op, [req])[0] for req in requests]
+
+    # batched handlers, return one result per request
+
+    def batch_version(self, snapshot, requests):
+        return [{"version": snapshot.version}] * len(requests)
+
+    def batch_world(self, snapshot, requests):
+        idx = np.array([snapshot.index.get(req["path"], -1) for req in requests])
+        matrices = snapshot.matrices[np.maximum(idx, 0)]
+        results = []
+        for ii, req in enumerate(requests):
+            if idx[ii] < 0:
+                results.append({"error": f"Unknown path {req['path']!r}"})
+            else:
+                results.append(
+                    {"path": req["path"], "matrix": matrices[ii].tolist()}
+                )
+        return results
+
+    def batch_select(self, snapshot, requests):
+        results = []
+        for req in requests:
+            idx = snapshot.select(
+                req.get("prefix", ""), req.get("layer"), req.get("cls")
+            )
+            results.append(
+                {
+                    "paths": [snapshot.paths[ii] for ii in idx],
+                    "locations": snapshot.locations[idx].tolist(),
+                }
+            )
+        return results
+
+    def batch_near(self, snapshot, requests, chunk=256):
+        locations = np.array([req["location"] for req in requests], float)
+        radius = np.array([req["radius"] for req in requests], float)
+        results = []
+        for start in range(0, len(requests), chunk):
+            loc = locations[start : start + chunk, None]
+            dist = np.linalg.norm(snapshot.locations[None] - loc, axis=-1)
+            for dd, rr in zip(dist, radius[start : start + chunk]):
+                idx = np.flatnonzero(dd <= rr)
+                idx = idx[np.argsort(dd[idx])]
+                results.append(
+                    {
+                        "paths": [snapshot.paths[ii] for ii in idx],
+                        "distances": dd[idx].tolist(),
+                    }
+                )
+        return results
+
+    # socket interface
+
+    async def handle(self, reader, writer):
+        """Answer JSON line requests from one connection"""
+        tasks = []
+        lock = asyncio.Lock()
+
+        async def answer(line):
+            rid = None
+            try:
+                request = json.loads(line)
+                if isinstance(request, dict):
+                    rid = request.get("id")
+                result = await self.query(request)
+            except (ValueError, KeyError, TypeError) as err:
+                result = {"error": str(err)}
+            if rid is not None:
+                result = dict(result, id=rid)
+            async with lock:
+                writer.write(json.dumps(result).encode() + b"\n")
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                tasks.append(asyncio.ensure_future(answer(line)))
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, path=None, host="127.0.0.1", port=0):
+        """Start listening on a unix socket path or on a local TCP port"""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+
+class GeometryClient:
+    """Client of a `GeometryServer` socket.
+
+    Each request is sent with an id and its reply is matched by id, so
+    concurrent requests can share one connection.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count()
+        self._pending = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, path=None, host="127.0.0.1", port=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        """Dispatch the replies to the pending requests"""
+        try:
+            while line := await self.reader.readline():
+                result = json.loads(line)
+                future = self._pending.pop(result.pop("id", None), None)
+                if future is not None and not future.done():
+                    future.set_result(result)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed"))
+            self._pending.clear()
+
+    async def request(self, op, **kwargs):
+        """Return the result of a request, raise `GeometryError` with the
+        message of the server if it failed"""
+        rid = next(self._ids)
+        line = json.dumps(dict(kwargs, op=op, id=rid)).encode() + b"\n"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[rid] = future
+        if self._receiver.done():
+            self._pending.pop(rid)
+            raise ConnectionError("Connection closed")
+        self.writer.write(line)
+        await self.writer.drain()
+        result = await future
+        if "error" in result:
+            raise GeometryError(result["error"])
+        return result
+
+    async def world(self, path):
+        return np.array((await self.request("world", path=path))["matrix"])
+
+    async def close(self):
+        self._receiver.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+        await asyncio.gather(self._receiver, return_exceptions=True)
+
+
+def load_model(spec):
+    """Load a model from "module:attribute", call it if callable"""
+    modname, _, attr = spec.partition(":")
+    model = getattr(importlib.import_module(modname), attr or "model")
+    return model() if callable(model) else model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("model", help="module:attribute of the root Point")
+    parser.add_argument("--socket", help="unix socket path")
+    parser.add_argument("--port", type=int, default=0, help="local TCP port")
+    parser.add_argument("--batch-delay", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    server = GeometryServer(load_model(args.model), args.batch_delay)
+
+    async def run():
+        srv = await server.serve(path=args.socket, port=args.port)
+        print("listening on", [s.getsockname() for s in srv.sockets])
+        async with srv:
+            await srv.serve_forever()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
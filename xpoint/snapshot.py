@@ -0,0 +1,183 @@
+"""
+Immutable snapshots of the world frames of a Point hierarchy.
+
+A `Snapshot` holds read-only arrays with the world matrix of every part,
+indexed by path ("a/b/c", the root is ""), so it can be queried from many
+threads without locks. A `SnapshotStore` publishes new versions: a writer
+modifies the model and calls `publish`, readers keep using the snapshot
+they got from `current` until they ask again.
+"""
+
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from .point import Point
+
+
+def flatten(root, matrix=None):
+    """Walk root depth first.
+
+    Returns paths, parent indices (-1 for the root), world matrices (N,4,4)
+    and the list of parts.
+    """
+    if matrix is None:
+        matrix = np.eye(4)
+    paths, parents, matrices, parts = [], [], [], []
+    stack = [("", -1, matrix, root)]
+    while stack:
+        path, parent, pmatrix, part = stack.pop()
+        idx = len(paths)
+        world = pmatrix @ part.matrix
+        paths.append(path)
+        parents.append(parent)
+        matrices.append(world)
+        parts.append(part)
+        if part._body is not None:
+            world = world @ part._body
+        prefix = path + "/" if path else ""
+        if part.is_pattern:
+            frames = world @ part.frames
+            template = part.template
+            for ii in reversed(range(len(frames))):
+                stack.append((prefix + str(ii), idx, frames[ii], template))
+            continue
+        for key in reversed(list(part.parts)):
+            stack.append((prefix + key, idx, world, part.parts[key]))
+    return paths, np.array(parents), np.array(matrices), parts
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+class Snapshot:
+    """Read-only world frames of a hierarchy.
+
+    Parameters
+    ----------
+    root : Point
+        Root of the hierarchy.
+    version : int, optional
+        Version number.
+    """
+
+    def __init__(self, root, version=0):
+        paths, parents, matrices, parts = flatten(root)
+        self._set_frames(
+            version,
+            paths,
+            parents,
+            matrices,
+            [part.name for part in parts],
+            [part.layer for part in parts],
+            [part.__class__.__name__ for part in parts],
+        )
+
+    @classmethod
+    def from_frames(cls, paths, parents, matrices, names, layers, classes,
+                    version=0):
+        """Snapshot of frames computed elsewhere, e.g. by a `FrameCache`"""
+        self = cls.__new__(cls)
+        self._set_frames(
+            version, paths, parents, matrices, names, layers, classes
+        )
+        return self
+
+    def _set_frames(self, version, paths, parents, matrices, names, layers,
+                    classes):
+        matrices = np.asarray(matrices, dtype=float)
+        self.version = version
+        self.paths = tuple(paths)
+        self.index = {path: ii for ii, path in enumerate(self.paths)}
+        self.parents = _readonly(np.asarray(parents))
+        self.matrices = _readonly(matrices)
+        self.locations = _readonly(matrices[:, :3, 3].copy())
+        self.names = tuple(names)
+        self.layers = tuple(layers)
+        self.classes = tuple(classes)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.index
+
+    def matrix(self, path):
+        """Read-only world matrix of path"""
+        return self.matrices[self.index[path]]
+
+    def location(self, path):
+        return self.locations[self.index[path]]
+
+    def point(self, path):
+        """New Point with the world frame of path"""
+        idx = self.index[path]
+        return Point(self.matrices[idx].copy(), name=self.names[idx])
+
+    def select(self, prefix="", layer=None, cls=None):
+        """Return the indices of the paths matching the filters"""
+        out = []
+        for ii, path in enumerate(self.paths):
+            if not path.startswith(prefix):
+                continue
+            if layer is not None and self.layers[ii] != layer:
+                continue
+            if cls is not None and self.classes[ii] != cls:
+                continue
+            out.append(ii)
+        return np.array(out, dtype=int)
+
+    def near(self, location, radius):
+        """Return the paths within radius from location, sorted by
+        distance"""
+        dist = np.linalg.norm(self.locations - np.asarray(location), axis=1)
+        idx = np.flatnonzero(dist <= radius)
+        idx = idx[np.argsort(dist[idx])]
+        return [self.paths[ii] for ii in idx]
+
+    def __repr__(self):
+        return f"Snapshot(version={self.version}, {len(self)} frames)"
+
+
+class SnapshotStore:
+    """Versioned snapshots of a model for concurrent readers.
+
+    Reading `current` is a single attribute access and never blocks,
+    writers are serialized by a lock. With a `FrameCache` the frames of the
+    unchanged subtrees are loaded from disk.
+    """
+
+    def __init__(self, root, cache=None):
+        self.root = root
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.current = self._build(0)
+
+    def _build(self, version):
+        if self.cache is None:
+            return Snapshot(self.root, version=version)
+        return self.cache.snapshot(self.root, version=version)
+
+    @property
+    def version(self):
+        return self.current.version
+
+    def publish(self):
+        """Build a snapshot of the model and make it current"""
+        with self._lock:
+            snapshot = self._build(self.current.version + 1)
+            self.current = snapshot
+        return snapshot
+
+    @contextmanager
+    def update(self):
+        """Modify the model in the scope, publish at the exit.
+
+        Readers see the previous version until the new one is published.
+        """
+        with self._lock:
+            yield self.root
+            self.current = self._build(self.current.version + 1)
@@ -0,0 +1,293 @@
+"""
+Columnar export and import of frame hierarchies.
+
+`to_columns` flattens a Point hierarchy, a `Snapshot` or a `FrameArray`
+into a dictionary of contiguous NumPy columns:
+
+    path, parent, name, layer, class,
+    x, y, z, rx, ry, rz, qx, qy, qz, qw, sx, sy, sz, seq, degrees
+
+Euler angles follow the `seq` and `degrees` of each point and are
+computed with one vectorized call per convention. Quaternions are scalar
+last and the scaling is the norm of the matrix columns. `to_arrow` and
+`to_pandas` wrap the columns in a pyarrow Table or a pandas DataFrame,
+passing the numeric columns without copies where the libraries allow it.
+`from_table` rebuilds the hierarchy and `frames_from_table` a `FrameArray`
+without creating Points. pyarrow and pandas are imported on first use.
+"""
+
+import numpy as np
+
+from .framearray import FrameArray
+from .point import Point
+from .rotation import (
+    euler_to_matrix,
+    matrix_to_euler,
+    matrix_to_quat,
+    quat_to_matrix,
+)
+from .snapshot import Snapshot, flatten
+
+columns = [
+    "path",
+    "parent",
+    "name",
+    "layer",
+    "class",
+    "x",
+    "y",
+    "z",
+    "rx",
+    "ry",
+    "rz",
+    "qx",
+    "qy",
+    "qz",
+    "qw",
+    "sx",
+    "sy",
+    "sz",
+    "seq",
+    "degrees",
+]
+
+
+def _strings(values):
+    out = np.empty(len(values), dtype=object)
+    out[:] = list(values)
+    return out
+
+
+def local_from_world(matrices, parents):
+    """Matrices relative to the parents, the roots have parent -1"""
+    matrices = np.asarray(matrices, dtype=float)
+    parents = np.asarray(parents)
+    inv = np.linalg.inv(matrices)
+    pinv = np.where((parents < 0)[:, None, None], np.eye(4), inv[parents])
+    return pinv @ matrices
+
+
+def world_from_local(matrices, parents):
+    """World matrices from local ones, parents must precede children"""
+    matrices = np.asarray(matrices, dtype=float)
+    parents = np.asarray(parents)
+    depth = np.zeros(len(parents), dtype=int)
+    for ii, parent in enumerate(parents.tolist()):
+        if parent >= 0:
+            depth[ii] = depth[parent] + 1
+    world = matrices.copy()
+    for level in range(1, depth.max(initial=0) + 1):
+        idx = np.flatnonzero(depth == level)
+        world[idx] = world[parents[idx]] @ matrices[idx]
+    return world
+
+
+def to_columns(obj, world=True, seq="zxy", degrees=True):
+    """Return a dictionary of column arrays.
+
+    Parameters
+    ----------
+    obj : Point, Snapshot or FrameArray
+        Hierarchy, snapshot or array of frames.
+    world : bool, optional
+        Export world frames, otherwise the frames relative to the parent.
+    seq, degrees : optional
+        Euler convention used for snapshots and frame arrays, points use
+        their own.
+    """
+    if isinstance(obj, Point):
+        paths, parents, matrices, parts = flatten(obj)
+        if not world:
+            # relative to the parent origins, which differ from the frame
+            # of the parts after set_origin
+            matrices = local_from_world(matrices, parents)
+        names = [part.name for part in parts]
+        layers = [part.layer for part in parts]
+        classes = [part.__class__.__name__ for part in parts]
+        seqs = [part.seq for part in parts]
+        degs = [part.degrees for part in parts]
+    elif isinstance(obj, Snapshot):
+        paths, parents, matrices = obj.paths, obj.parents, obj.matrices
+        if not world:
+            matrices = local_from_world(matrices, parents)
+        names, layers, classes = obj.names, obj.layers, obj.classes
+        seqs, degs = [seq] * len(obj), [degrees] * len(obj)
+    elif isinstance(obj, FrameArray):
+        matrices = obj.matrices
+        nframes = len(matrices)
+        names = obj.names
+        if names is None:
+            names = [None] * nframes
+        paths = [str(ii) if nn is None else nn for ii, nn in enumerate(names)]
+        parents = -np.ones(nframes, dtype=np.int64)
+        layers = [None] * nframes
+        classes = ["Point"] * nframes
+        seqs, degs = [seq] * nframes, [degrees] * nframes
+    else:
+        raise ValueError(f"Cannot export {obj.__class__.__name__}")
+    matrices = np.asarray(matrices, dtype=float)
+    scale = np.linalg.norm(matrices[:, :3, :3], axis=1)
+    rot = matrices[:, :3, :3] / np.where(scale == 0, 1, scale)[:, None, :]
+    quat = matrix_to_quat(rot)
+    euler = np.empty((len(matrices), 3))
+    seqs = np.asarray(seqs, dtype=object)
+    degs = np.asarray(degs, dtype=bool)
+    for sq in set(seqs.tolist()):
+        for dg in (True, False):
+            idx = np.flatnonzero((seqs == sq) & (degs == dg))
+            if len(idx) > 0:
+                euler[idx] = matrix_to_euler(
+                    sq, rot[idx], degrees=dg, suppress_warnings=True
+                )
+    # as for Point, rz, rx, ry are the angles in the order of seq
+    out = {
+        "path": _strings(paths),
+        "parent": np.asarray(parents, dtype=np.int64),
+        "name": _strings(names),
+        "layer": _strings(layers),
+        "class": _strings(classes),
+    }
+    for ii, key in enumerate("xyz"):
+        out[key] = np.ascontiguousarray(matrices[:, ii, 3])
+    for ii, key in enumerate(["rz", "rx", "ry"]):
+        out[key] = np.ascontiguousarray(euler[:, ii])
+    for ii, key in enumerate(["qx", "qy", "qz", "qw"]):
+        out[key] = np.ascontiguousarray(quat[:, ii])
+    for ii, key in enumerate(["sx", "sy", "sz"]):
+        out[key] = np.ascontiguousarray(scale[:, ii])
+    out["seq"] = seqs
+    out["degrees"] = degs
+    return {key: out[key] for key in columns}
+
+
+def to_arrow(obj, world=True, **kwargs):
+    """Return a pyarrow Table of `to_columns`"""
+    import pyarrow as pa
+
+    cols = to_columns(obj, world=world, **kwargs)
+    table = pa.table({key: pa.array(value) for key, value in cols.items()})
+    frames = b"world" if world else b"local"
+    return table.replace_schema_metadata({b"xpoint.frames": frames})
+
+
+def to_pandas(obj, world=True, **kwargs):
+    """Return a pandas DataFrame of `to_columns`"""
+    import pandas as pd
+
+    df = pd.DataFrame(to_columns(obj, world=world, **kwargs), copy=False)
+    df.attrs["xpoint.frames"] = "world" if world else "local"
+    return df
+
+
+def _read_columns(table):
+    """Return the columns of a dictionary, DataFrame or pyarrow Table as
+    arrays and the frame kind stored in its metadata"""
+    frames = None
+    if hasattr(table, "schema") and hasattr(table, "column_names"):
+        metadata = table.schema.metadata or {}
+        frames = metadata.get(b"xpoint.frames", b"").decode() or None
+        cols = {
+            key: table.column(key).to_numpy(zero_copy_only=False)
+            for key in table.column_names
+        }
+    elif hasattr(table, "attrs") and hasattr(table, "columns"):
+        frames = table.attrs.get("xpoint.frames")
+        cols = {key: table[key].to_numpy() for key in table.columns}
+    else:
+        cols = {key: np.asarray(value) for key, value in table.items()}
+    return cols, frames
+
+
+def matrices_from_columns(cols):
+    """4x4 matrices from location, quaternion or Euler, scaling columns"""
+    nrows = len(cols["x"])
+    matrices = np.zeros((nrows, 4, 4))
+    matrices[:, 3, 3] = 1
+    for ii, key in enumerate("xyz"):
+        matrices[:, ii, 3] = cols[key]
+    if "qw" in cols:
+        quat = np.stack([cols[key] for key in ("qx", "qy", "qz", "qw")], -1)
+        rot = quat_to_matrix(quat.astype(float))
+    else:
+        angles = np.stack([cols[key] for key in ("rz", "rx", "ry")], -1)
+        seqs = np.asarray(cols.get("seq", ["zxy"] * nrows), dtype=object)
+        degs = np.asarray(cols.get("degrees", [True] * nrows), dtype=bool)
+        rot = np.empty((nrows, 3, 3))
+        for sq in set(seqs.tolist()):
+            for dg in (True, False):
+                idx = np.flatnonzero((seqs == sq) & (degs == dg))
+                if len(idx) > 0:
+                    rot[idx] = euler_to_matrix(sq, angles[idx], degrees=dg)
+    if "sx" in cols:
+        scale = np.stack([cols[key] for key in ("sx", "sy", "sz")], -1)
+        rot = rot * scale[:, None, :]
+    matrices[:, :3, :3] = rot
+    return matrices
+
+
+def frames_from_table(table, **kwargs):
+    """Return a `FrameArray` of the frames in a table, named by path.
+
+    Keyword arguments are passed to `FrameArray`.
+    """
+    cols, _ = _read_columns(table)
+    kwargs.setdefault("names", list(cols["path"]))
+    return FrameArray(matrices_from_columns(cols), **kwargs)
+
+
+def from_table(table, world=None):
+    """Rebuild a hierarchy of Points from a table.
+
+    Every row becomes a plain `Point` with its frame, name, layer, seq and
+    degrees. The class column is not restored: the table has no column for
+    the geometry of the primitives, lines or shapes are rebuilt as Points
+    on their frames.
+
+    Parameters
+    ----------
+    table : dict, pandas DataFrame or pyarrow Table
+        Columns as produced by `to_columns`.
+    world : bool, optional
+        Whether the table has world frames, by default read from the
+        metadata or True.
+
+    Returns
+    -------
+    Point
+        The root, or a new Point holding the roots if there are several.
+    """
+    cols, frames = _read_columns(table)
+    if world is None:
+        world = frames != "local"
+    parents = np.asarray(cols["parent"], dtype=np.int64)
+    matrices = matrices_from_columns(cols)
+    if world:
+        matrices = local_from_world(matrices, parents)
+    nrows = len(parents)
+    names = cols.get("name", [None] * nrows)
+    layers = cols.get("layer", [None] * nrows)
+    seqs = cols.get("seq", ["zxy"] * nrows)
+    degs = cols.get("degrees", [True] * nrows)
+    points = [
+        Point(
+            matrices[ii],
+            name=names[ii],
+            layer=layers[ii],
+            seq=seqs[ii],
+            degrees=bool(degs[ii]),
+        )
+        for ii in range(nrows)
+    ]
+    roots = {}
+    for ii, (path, parent) in enumerate(zip(cols["path"], parents.tolist())):
+        key = path.rsplit("/", 1)[-1]
+        if parent < 0:
+            roots[key] = points[ii]
+        else:
+            points[parent].add_part(key, points[ii])
+    if len(roots) == 1:
+        return next(iter(roots.values()))
+    root = Point()
+    for key, part in roots.items():
+        root.add_part(key, part)
+    return root